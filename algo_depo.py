@@ -1,207 +1,183 @@
 # algo_depo.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import streamlit as st
+import budget
+import keperluan
+import metrics
+import money
+import group_balance
+import pipeline
+import reporting
+import reference_graph
+import subset_sum
 import utils # Import utils.py
 
 TARGET_BRANCH = "DEPO"
 
-def process_core_depo(df_subset, branch_name):
+# --- SEGMENTASI (default; per run diberikan lewat argumen run_segmented_depo_logic) ---
+# Lebar jendela segmen (hari, per tanggal dalam bulan); None = 3 segmen bawaan (1-10, 11-20, >20)
+SEGMENT_WINDOW_DAYS = None
+# "rolling": segmen berurutan dengan carry over gantung
+# "parallel": tiap jendela dicocokkan mandiri secara paralel, lalu satu pass akhir atas gabungan sisa
+SEGMENT_MODES = ("rolling", "parallel")
+SEGMENT_MODE = "rolling"
+SEGMENT_WORKERS = None  # None = subset_sum.DEFAULT_WORKERS / os.cpu_count()
+
+class SegmentCarry:
+    """
+    State yang dibawa antar segmen rolling Depo (mode inkremental):
+    - token & flag Keperluan dihitung sekali untuk seluruh bulan; tiap segmen tinggal memilih barisnya
+    - sisa RECON yang terbukti tidak punya grup seimbang ditandai 'settled'; di segmen berikutnya
+      solver hanya bekerja pada cluster/sisa yang memuat baris baru (subset dari himpunan tanpa
+      grup juga tanpa grup, jadi hasil sama persis dengan memproses ulang carry over)
+    """
+
+    def __init__(self, df_all):
+        keperluan_col = df_all["Keperluan"].reset_index(drop=True)
+        self.codes = keperluan.extract_reference_codes(keperluan_col)
+        self.flags = keperluan.classify_keperluan(keperluan_col)
+        self.origin = np.empty(0, dtype=np.int64)   # posisi df_all per baris input segmen
+        self.settled = np.empty(0, dtype=bool)      # baris input yang sudah terbukti tanpa grup RECON
+        self.settled_labels = np.empty(0, dtype=np.int64)  # diisi process_core_depo untuk segmen berikutnya
+
+    def start(self, carry_labels, seg_positions):
+        # Input segmen = carry over (label baris input segmen sebelumnya) + baris segmen baru
+        carry_labels = np.asarray(carry_labels, dtype=np.int64)
+        self.settled = np.concatenate([np.isin(carry_labels, self.settled_labels), np.zeros(len(seg_positions), dtype=bool)])
+        self.origin = np.concatenate([self.origin[carry_labels], np.asarray(seg_positions, dtype=np.int64)])
+        self.settled_labels = np.empty(0, dtype=np.int64)
+
+    def input_codes(self):
+        index = pd.RangeIndex(len(self.origin))
+        codes = {key: value.iloc[self.origin].set_axis(index) for key, value in self.codes.items()}
+        return codes, self.flags.iloc[self.origin].set_axis(index)
+
+
+def process_core_depo(df_subset, branch_name, offset_window_days=0, carry=None, recon=None):
     """
     Core Logic KHUSUS DEPO (Mengandung Regex & Filter Spesifik Depo)
+    offset_window_days: toleransi selisih tanggal (hari) untuk tahap OFFSET PAIR
+    carry: SegmentCarry (mode inkremental run_segmented_depo_logic), None = proses biasa
+    recon: argumen tambahan utils.reconcile_global_no_group (mis. time_limit_ms), None = default
     """
-    df_subset = df_subset.reset_index(drop=True)
+    # Satu frame dasar + penanda baris tersisa; tiap tahap hanya mengeluarkan baris yang cocok
+    pipe = pipeline.StagePipeline(df_subset)
+    metrics.start(len(pipe.base))
+    # Tokenisasi kode BKK/BKM/JMU & flag kata kunci sekali di awal; tahap berikutnya tinggal lookup
+    if carry is None:
+        codes = keperluan.extract_reference_codes(pipe.base["Keperluan"])
+        flags = keperluan.classify_keperluan(pipe.base["Keperluan"])
+    else:
+        codes, flags = carry.input_codes()
+    metrics.stage("TOKENISASI", pipe.remaining.sum())
 
     # --- MATCH BS ---
-    balanced_keperluan_bs = (
-        df_subset[df_subset["Jenis Dokumen"]=="BS"]
-        .groupby("Keperluan")[["Debet", "Kredit"]]
-        .sum()
-        .query("Debet == Kredit")
-        .index
-    )
-    df_match_bs = df_subset[
-        (df_subset["Jenis Dokumen"]=="BS") &
-        (df_subset["Keperluan"].isin(balanced_keperluan_bs))
-    ]
-    df_subset = df_subset[~df_subset.index.isin(df_match_bs.index)]
+    # Keperluan difaktorkan sekali; jumlah Net (sen) per grup dipakai ulang oleh MATCH KEPERLUAN.
+    # Debet == Kredit per grup <=> total Net sen == 0
+    kep_groups = group_balance.GroupBalance(pipe.base["Keperluan"], {"Net": money.net_cents(pipe.base)}, active=pipe.remaining)
+    is_bs = (pipe.base["Jenis Dokumen"]=="BS").to_numpy()
+    sums_bs = kep_groups.subset_sums(is_bs)
+    mask_bs = kep_groups.rows_in(sums_bs["Net"] == 0, within=is_bs)
+    df_match_bs = pipe.take(mask_bs[pipe.remaining])
+    df_match_bs[money.GROUP_KEY] = df_match_bs["Keperluan"]
+    kep_groups.remove(df_match_bs.index)
+    metrics.stage("MATCH BS", pipe.remaining.sum())
 
     # --- MATCH KEPERLUAN ---
-    balanced_keperluan = (
-        df_subset
-        .groupby("Keperluan")[["Debet", "Kredit"]]
-        .sum()
-        .query("Debet == Kredit")
-        .index
-    )
-    df_match = df_subset[df_subset["Keperluan"].isin(balanced_keperluan)]
-    df_subset = df_subset[~df_subset.index.isin(df_match.index)]
+    df_match = pipe.take(kep_groups.rows_in(kep_groups.sums["Net"] == 0)[pipe.remaining])
+    df_match[money.GROUP_KEY] = df_match["Keperluan"]
+    metrics.stage("MATCH KEPERLUAN", pipe.remaining.sum())
 
     # --- NOTA ---
-    mask_nota = df_subset["Keperluan"].str.contains("PEMBAYARAN ATAS NOTA", na=False)
-    df_nota = df_subset[mask_nota].copy()
-    df_subset = df_subset[~mask_nota].copy()
+    df_nota = pipe.take(keperluan.has_flag(flags, keperluan.KW_NOTA, pipe.index))
+    metrics.stage("NOTA", pipe.remaining.sum())
 
     # --- PENARIKAN DANA ---
     mask_dana = (
-        df_subset["Keperluan"].str.contains("PENARIKAN DANA VIA ATM", na=False) &
-        df_subset["Keperluan"].str.contains("MANDIRI SMART ACCOUNT", na=False)
+        keperluan.has_flag(flags, keperluan.KW_ATM, pipe.index) &
+        keperluan.has_flag(flags, keperluan.KW_MSA, pipe.index)
     )
-    df_dana = df_subset[mask_dana].copy()
-    df_subset = df_subset[~mask_dana].copy()
+    df_dana = pipe.take(mask_dana)
+    metrics.stage("PENARIKAN DANA", pipe.remaining.sum())
 
     # --- DEPO SPECIAL FILTER ---
-    pola_pengotor = r"IDBKM|NOBKM|IDBKK|NOBKK|CABANG:"
-    mask_kotor = df_subset["Keperluan"].str.contains(pola_pengotor, regex=True, na=False)
+    # Pola pengotor: IDBKM|NOBKM|IDBKK|NOBKK|CABANG:
+    mask_kotor = keperluan.has_flag(flags, keperluan.KW_PENGOTOR, pipe.index)
+    dibayarkan = pipe.column("Dibayarkan (ke/dari)")
     
     mask_cabang_dp = (
-        (df_subset["Keperluan"].str.contains("PEMBAYARAN DPP TUNAI|PEMBAYARAN DPP GIRO") 
-         | (df_subset["Keperluan"].str.contains("KODE LAWAN RO") & ~mask_kotor))
-        & (df_subset["Dibayarkan (ke/dari)"] == "SPIL KARET")
+        (keperluan.has_flag(flags, keperluan.KW_DPP, pipe.index)
+         | (keperluan.has_flag(flags, keperluan.KW_LAWAN_RO, pipe.index) & ~mask_kotor))
+        & (dibayarkan == "SPIL KARET")
     )
     mask_pusat_dp = (
-        ((df_subset["Keperluan"].str.contains("KODE LAWAN RI") & ~mask_kotor)
-         & (df_subset["Dibayarkan (ke/dari)"] == "RELASI"))
-        | (df_subset["Keperluan"].str.contains("PENERIMAAN GIRO DENGAN VA") 
-           & (df_subset["Dibayarkan (ke/dari)"] == "-"))
+        ((keperluan.has_flag(flags, keperluan.KW_LAWAN_RI, pipe.index) & ~mask_kotor)
+         & (dibayarkan == "RELASI"))
+        | (keperluan.has_flag(flags, keperluan.KW_GIRO_VA, pipe.index) 
+           & (dibayarkan == "-"))
     )
-    df_dp = df_subset[mask_cabang_dp | mask_pusat_dp].copy()
-    df_subset = df_subset[~df_subset.index.isin(df_dp.index)].copy()
+    df_dp = pipe.take(mask_cabang_dp | mask_pusat_dp)
+    metrics.stage("DATA VA", pipe.remaining.sum())
 
     # --- JMU ASD/ASK ---
-    REGEX_BKK_BKM_ID = r'(?:ID)?BK[KM]\s*[:\-]?\s*(\d+/\d{4})'
-    mask_keyword = (df_subset["Keperluan"].str.contains("JMU ASD", na=False) | 
-                    df_subset["Keperluan"].str.contains("JMU ASK", na=False))
-    df_asd_temp = df_subset[mask_keyword].copy()
+    mask_keyword = keperluan.has_flag(flags, keperluan.KW_JMU_ASD | keperluan.KW_JMU_ASK, pipe.index)
+    df_asd_temp = pipe.peek(mask_keyword)
     if not df_asd_temp.empty:
-        df_asd_temp["KODE"] = df_asd_temp["Keperluan"].str.extract(REGEX_BKK_BKM_ID)[0]
+        df_asd_temp["KODE"] = keperluan.lookup(codes, "BK_ID_FIRST", df_asd_temp.index)
         replacement_values = df_asd_temp.index.astype(str).values
         df_asd_temp["KODE"] = df_asd_temp["KODE"].fillna(pd.Series(replacement_values, index=df_asd_temp.index))
-        sum_per_kode = df_asd_temp.groupby('KODE')['Net'].transform('sum')
-        mask_balanced = (sum_per_kode.abs() < 1e-9)
+        asd_groups = group_balance.GroupBalance(df_asd_temp["KODE"], {"Net": money.net_cents(df_asd_temp)})
+        mask_balanced = asd_groups.rows_in(asd_groups.sums["Net"] == 0)
         df_asd = df_asd_temp[mask_balanced].copy()
-        df_subset = df_subset[~df_subset.index.isin(df_asd.index)].copy()
+        df_asd[money.GROUP_KEY] = df_asd["KODE"]
+        pipe.discard(df_asd.index)
     else:
-        df_asd = pd.DataFrame(columns=df_subset.columns)
-
-    # --- BKK (ID & NO) ---
-    df_matched_bkk = pd.DataFrame()
-    # (Simplified for brevity - ID)
-    REGEX_BKK_ID = r'(?:ID)?BKK\s*[:\-]?\s*(\d+/\d{4})'
-    try: all_matches_bkk = df_subset["Keperluan"].str.extractall(REGEX_BKK_ID)[0].unstack()
-    except: all_matches_bkk = pd.DataFrame()
-    if not all_matches_bkk.empty:
-        df_subset["ID Dokumen"] = df_subset["ID Dokumen"].astype(str)
-        for layer in all_matches_bkk.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkk[layer])
-            candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(candidates) == 0: continue
-            sum_id = df_subset[df_subset["ID Dokumen"].isin(candidates)].groupby("ID Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(candidates)].groupby("KODE")["Net"].sum()
-            total = sum_id.add(sum_kode, fill_value=0)
-            valid = total[total.abs() <= 1].index.tolist()
-            if not valid: continue
-            mask = (df_subset["ID Dokumen"].isin(valid) | df_subset["KODE"].isin(valid))
-            df_matched_bkk = pd.concat([df_matched_bkk, df_subset[mask]])
-            df_subset = df_subset[~mask].copy()
-
-    # (NO)
-    REGEX_BKK_NO = r'\bNOBKK\s*:\s*([A-Z]{2}\.\d+/\d{2}/\d{4})\b'
-    try: all_matches_bkk_no = df_subset["Keperluan"].str.extractall(REGEX_BKK_NO)[0].unstack()
-    except: all_matches_bkk_no = pd.DataFrame()
-    if not all_matches_bkk_no.empty:
-        df_subset["Nomor Dokumen"] = df_subset["Nomor Dokumen"].astype(str)
-        for layer in all_matches_bkk_no.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkk_no[layer])
-            candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(candidates) == 0: continue
-            sum_id = df_subset[df_subset["Nomor Dokumen"].isin(candidates)].groupby("Nomor Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(candidates)].groupby("KODE")["Net"].sum()
-            if sum_id.empty and sum_kode.empty: continue
-            total = sum_id.add(sum_kode, fill_value=0)
-            valid = total[total.abs() <= 1].index.tolist()
-            if not valid: continue
-            mask = (df_subset["Nomor Dokumen"].isin(valid) | df_subset["KODE"].isin(valid))
-            df_matched_bkk = pd.concat([df_matched_bkk, df_subset[mask]])
-            df_subset = df_subset[~mask].copy()
-    if "KODE" in df_matched_bkk.columns: df_matched_bkk.drop(columns=["KODE"],inplace=True)
-
-    # --- BKM (ID & NO) ---
-    df_matched_bkm = pd.DataFrame()
-    # (ID)
-    REGEX_BKM_ID = r'(?:ID)?BKM\s*[:\-]?\s*(\d+/\d{4})'
-    try: all_matches_bkm = df_subset["Keperluan"].str.extractall(REGEX_BKM_ID)[0].unstack()
-    except: all_matches_bkm = pd.DataFrame()
-    if not all_matches_bkm.empty:
-        df_subset["ID Dokumen"] = df_subset["ID Dokumen"].astype(str)
-        for layer in all_matches_bkm.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkm[layer])
-            candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(candidates) == 0: continue
-            sum_id = df_subset[df_subset["ID Dokumen"].isin(candidates)].groupby("ID Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(candidates)].groupby("KODE")["Net"].sum()
-            total = sum_id.add(sum_kode, fill_value=0)
-            valid = total[total.abs() <= 1].index.tolist()
-            if not valid: continue
-            mask = (df_subset["ID Dokumen"].isin(valid) | df_subset["KODE"].isin(valid))
-            df_matched_bkm = pd.concat([df_matched_bkm, df_subset[mask]])
-            df_subset = df_subset[~mask].copy()
-    
-    # (NO)
-    REGEX_BKM_NO = r'\bNOBKM\s*:\s*([A-Z]{2}\.\d+/\d{2}/\d{4})\b'
-    try: all_matches_bkm_no = df_subset["Keperluan"].str.extractall(REGEX_BKM_NO)[0].unstack()
-    except: all_matches_bkm_no = pd.DataFrame()
-    if not all_matches_bkm_no.empty:
-        df_subset["Nomor Dokumen"] = df_subset["Nomor Dokumen"].astype(str)
-        for layer in all_matches_bkm_no.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkm_no[layer])
-            candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(candidates) == 0: continue
-            sum_id = df_subset[df_subset["Nomor Dokumen"].isin(candidates)].groupby("Nomor Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(candidates)].groupby("KODE")["Net"].sum()
-            if sum_id.empty and sum_kode.empty: continue
-            total = sum_id.add(sum_kode, fill_value=0)
-            valid = total[total.abs() <= 1].index.tolist()
-            if not valid: continue
-            mask = (df_subset["Nomor Dokumen"].isin(valid) | df_subset["KODE"].isin(valid))
-            df_matched_bkm = pd.concat([df_matched_bkm, df_subset[mask]])
-            df_subset = df_subset[~mask].copy()
-    if "KODE" in df_matched_bkm.columns: df_matched_bkm.drop(columns=["KODE"],inplace=True)
+        df_asd = pd.DataFrame(columns=pipe.columns)
+    metrics.stage("JMU ASD/ASK", pipe.remaining.sum())
+
+    # --- BKK & BKM (ID & NO) ---
+    # Graf referensi: baris perujuk + dokumen tujuan, diterima per komponen yang seimbang
+    df_matched_bkk = reference_graph.match_voucher_references(pipe, codes, "BKK")
+    metrics.stage("BKK", pipe.remaining.sum())
+    df_matched_bkm = reference_graph.match_voucher_references(pipe, codes, "BKM")
+    metrics.stage("BKM", pipe.remaining.sum())
 
     # --- SA & JURNAL ---
-    mask_SA = df_subset["Keperluan"].str.contains(r"^(?:MANDIRI SMART ACCOUNT|PENARIKAN DANA VIA)", case=False, na=False)
-    df_SA = df_subset[mask_SA].copy()
-    df_subset = df_subset[~mask_SA].copy()
-
-    df_subset['KODE'] = np.nan
-    df_subset['KODE'] = df_subset['Keperluan'].str.extract(r'^((?:JM[UH]|[A-Z]{2}\.)\d\S*)')[0]
-    df_subset['KODE'] = np.where(df_subset["KODE"].isna(), df_subset["Nomor Dokumen"], df_subset["KODE"])
-    sum_per_kode = df_subset.groupby('KODE')['Net'].transform('sum')
-    mask_jurnal = (df_subset['KODE'].notna()) & (sum_per_kode.abs() < 1e-9)
-    df_jurnal = df_subset[mask_jurnal].copy()
-    df_subset.drop(columns=['KODE'], inplace=True)
-    df_subset = df_subset[~mask_jurnal]
+    df_SA = pipe.take(keperluan.has_flag(flags, keperluan.KW_SA_PREFIX, pipe.index))
+    metrics.stage("MANDIRI SA", pipe.remaining.sum())
+
+    kode = keperluan.lookup(codes, "JURNAL", pipe.index)
+    pipe.set_column('KODE', np.where(kode.isna(), pipe.column("Nomor Dokumen"), kode))
+    jurnal_groups = group_balance.GroupBalance(pipe.column('KODE'), {"Net": pipe.column(money.NET_CENTS)})
+    df_jurnal = pipe.take(jurnal_groups.rows_in(jurnal_groups.sums["Net"] == 0))
+    df_jurnal[money.GROUP_KEY] = df_jurnal["KODE"]
+    pipe.drop_column('KODE')
+    metrics.stage("JURNAL MATCH", pipe.remaining.sum())
 
     # --- ATK ---
-    mask_atk = (df_subset["Sumber Dokumen"].str.contains(r"PO\.", na=False) & (df_subset["Jenis Dokumen"] == "TTT"))
-    df_atk = df_subset[mask_atk].copy()
-    df_subset = df_subset[~mask_atk].copy()
+    mask_atk = (pipe.column("Sumber Dokumen").str.contains(r"PO\.", na=False) & (pipe.column("Jenis Dokumen") == "TTT"))
+    df_atk = pipe.take(mask_atk)
+    metrics.stage("ATK", pipe.remaining.sum())
 
     # --- OFFSET & RECON ---
-    df_result = utils.find_offset_pairs(df_subset.copy())
+    df_result = utils.find_offset_pairs(pipe.frame(), window_days=offset_window_days)
     df_matched_tanggal = df_result[df_result['Is_Matched'] == True].sort_values(by='Match_ID')
-    index_tanggal = df_matched_tanggal.index
-    df_matched_tanggal.drop(columns=["Match_ID", "Is_Matched"], inplace=True)
-    df_subset = df_subset[~df_subset.index.isin(index_tanggal)]
+    pipe.discard(df_matched_tanggal.index)
+    df_matched_tanggal.drop(columns="Is_Matched", inplace=True)
+    df_matched_tanggal.rename(columns={"Match_ID": money.GROUP_KEY}, inplace=True)
+    metrics.stage("OFFSET PAIRS", pipe.remaining.sum())
 
-    df_recon = utils.reconcile_global_no_group(df_subset, net_col='Net', tolerance=1)
+    settled = None if carry is None else carry.settled[pipe.index]
+    df_recon, proven = utils.reconcile_global_no_group(pipe.frame(), net_col='Net', tolerance=1, settled=settled, with_proof=True, **(recon or {}))
     df_recon = df_recon[df_recon["Match_ID"].notna()]
-    df_recon.drop(columns="Match_ID", inplace=True)
-    df_subset = df_subset[~df_subset.index.isin(df_recon.index)]
+    df_recon.rename(columns={"Match_ID": money.GROUP_KEY}, inplace=True)
+    pipe.discard(df_recon.index)
+    df_subset = pipe.frame()
+    if carry is not None and proven: carry.settled_labels = df_subset.index.to_numpy(dtype=np.int64)
+    metrics.stage("RECON OR-TOOLS", pipe.remaining.sum())
 
     df_gantung = pd.concat([df_atk, df_subset], axis=0)
 
@@ -221,64 +197,185 @@ def process_core_depo(df_subset, branch_name):
         ("RECON OR-TOOLS", df_recon)
     ]
 
-def run_segmented_depo_logic(df_all):
+
+def segment_date_column(df_all):
+    # Kolom tanggal untuk segmentasi: 'Tanggal Kasir', atau 'Tanggal'; None jika keduanya tidak ada
+    for col in ('Tanggal Kasir', 'Tanggal'):
+        if col in df_all.columns: return col
+    return None
+
+
+def segment_masks(dates, window_days=None):
+    """
+    Jendela segmen berdasarkan tanggal dalam bulan. window_days None = 3 segmen bawaan,
+    N = jendela N hari (7 = mingguan, 1 = per hari). Return list (nama, mask).
+    """
+    day = dates.dt.day
+    if not window_days:
+        return [
+            ("Segmen 1 (Tgl 1-10)", day <= 10),
+            ("Segmen 2 (Tgl 11-20)", (day > 10) & (day <= 20)),
+            ("Segmen 3 (Tgl > 20)", day > 20),
+        ]
+    segments = []
+    for k, lo in enumerate(range(1, 32, window_days), start=1):
+        hi = min(lo + window_days - 1, 31)
+        label = f"Tgl {lo}" if lo == hi else f"Tgl {lo}-{hi}"
+        segments.append((f"Segmen {k} ({label})", (day >= lo) & (day <= hi)))
+    return segments
+
+
+def segment_label(mode=None):
+    # Akhiran judul sheet Depo sesuai mode segmentasi
+    return " (Paralel)" if (mode or SEGMENT_MODE) == "parallel" else " (Rolling)"
+
+
+def run_segmented_depo_logic(df_all, offset_window_days=0, progress=None, incremental=True,
+                             window_days=None, mode=None, workers=None, recon=None):
     """
     Fungsi Utama Depo (Rolling 10 Hari)
+    progress: callback progress(level, message) untuk pesan per segmen (default: logging)
+    incremental: carry over membawa token Keperluan & bukti RECON dari segmen sebelumnya
+    (lihat SegmentCarry); hasil sama dengan incremental=False
+    window_days / mode / workers: default SEGMENT_WINDOW_DAYS / SEGMENT_MODE / SEGMENT_WORKERS
+    recon: argumen tambahan tahap RECON, lihat process_core_depo
     """
+    progress = reporting.resolve(progress)
+    mode = mode or SEGMENT_MODE
+    if mode not in SEGMENT_MODES:
+        raise ValueError(f"Mode segmen Depo tidak dikenal: {mode}")
     # 1. Konversi Tanggal
-    date_col = 'Tanggal Kasir'
-    if date_col not in df_all.columns:
-        if 'Tanggal' in df_all.columns: date_col = 'Tanggal'
-        else:
-            st.warning("Kolom 'Tanggal Kasir' tidak ditemukan. Mode Segmentasi dimatikan.")
-            return process_core_depo(df_all, TARGET_BRANCH)
+    date_col = segment_date_column(df_all)
+    if date_col is None:
+        progress("warning", "Kolom 'Tanggal Kasir' tidak ditemukan. Mode Segmentasi dimatikan.")
+        return process_core_depo(df_all, TARGET_BRANCH, offset_window_days, recon=recon)
 
     try:
         df_all[date_col] = pd.to_datetime(df_all[date_col], dayfirst=True, errors='coerce')
     except Exception as e:
-        st.error(f"Gagal konversi tanggal: {e}")
-        return process_core_depo(df_all, TARGET_BRANCH)
-
-    # 2. Definisikan Masking untuk 3 Segmen
-    mask_seg1 = (df_all[date_col].dt.day <= 10)
-    mask_seg2 = (df_all[date_col].dt.day > 10) & (df_all[date_col].dt.day <= 20)
-    mask_seg3 = (df_all[date_col].dt.day > 20)
-
-    segments = [
-        ("Segmen 1 (Tgl 1-10)", df_all[mask_seg1].copy()),
-        ("Segmen 2 (Tgl 11-20)", df_all[mask_seg2].copy()),
-        ("Segmen 3 (Tgl > 20)", df_all[mask_seg3].copy())
-    ]
+        progress("error", f"Gagal konversi tanggal: {e}")
+        return process_core_depo(df_all, TARGET_BRANCH, offset_window_days, recon=recon)
+
+    # Nominal sen dihitung sekali; carry over antar segmen membawa kolom yang sama
+    if money.NET_CENTS not in df_all.columns:
+        money.add_net_cents(df_all)
+
+    # 2. Definisikan Masking Segmen
+    segments = segment_masks(df_all[date_col], SEGMENT_WINDOW_DAYS if window_days is None else window_days)
+    if mode == "parallel":
+        final_matches_collection, carry_over_gantung = _run_parallel_windows(df_all, segments, offset_window_days, progress, workers, recon)
+    else:
+        final_matches_collection, carry_over_gantung = _run_rolling(df_all, segments, offset_window_days, progress, incremental, recon)
+    progress("success", f"✅ Selesai Semua Segmen. Total Gantung Akhir: {len(carry_over_gantung)} baris.")
+    return _consolidate(final_matches_collection, carry_over_gantung)
+
 
+def _run_rolling(df_all, segments, offset_window_days, progress, incremental, recon=None):
     # 3. Loop Iterasi
     final_matches_collection = {}
     carry_over_gantung = pd.DataFrame()
+    carry = SegmentCarry(df_all) if incremental else None
 
-    for seg_name, seg_df in segments:
-        st.info(f"🔹 Memproses {seg_name}...")
+    for k, (seg_name, seg_mask) in enumerate(segments):
+        progress("info", f"🔹 Memproses {seg_name}...")
+        metrics.set_segment(seg_name)
+        # Baris segmen berikutnya ikut bobot jatah waktu solver cabang ini
+        budget.set_pending(sum(int(mask.sum()) for _, mask in segments[k + 1:]))
+        seg_df = df_all[seg_mask].copy()
         
         input_df = pd.concat([carry_over_gantung, seg_df], ignore_index=True)
         
         if input_df.empty:
-            st.write("   ↳ Data kosong, skip.")
+            progress("write", "   ↳ Data kosong, skip.")
             continue
             
-        st.write(f"   ↳ Input: {len(input_df)} baris (Carry Over: {len(carry_over_gantung)} + Baru: {len(seg_df)})")
+        progress("write", f"   ↳ Input: {len(input_df)} baris (Carry Over: {len(carry_over_gantung)} + Baru: {len(seg_df)})")
+        if carry is not None: carry.start(carry_over_gantung.index, np.flatnonzero(seg_mask.to_numpy()))
         
         # Call Internal Function
-        results = process_core_depo(input_df, TARGET_BRANCH)
-        
-        for title, df_res in results:
-            if title == "DATA GANTUNG":
-                carry_over_gantung = df_res.copy()
-            else:
-                if not df_res.empty:
-                    if title not in final_matches_collection:
-                        final_matches_collection[title] = []
-                    final_matches_collection[title].append(df_res)
-    
-    st.success(f"✅ Selesai Semua Segmen. Total Gantung Akhir: {len(carry_over_gantung)} baris.")
+        results = process_core_depo(input_df, TARGET_BRANCH, offset_window_days, carry, recon)
+        carry_over_gantung = _collect(results, final_matches_collection, seg_name)
+    return final_matches_collection, carry_over_gantung
+
+
+def _run_parallel_windows(df_all, segments, offset_window_days, progress, workers=None, recon=None):
+    """
+    Mode spekulatif: tiap jendela dicocokkan sendiri (tanpa carry over) di process pool,
+    lalu satu pass akhir process_core_depo atas gabungan sisa semua jendela.
+    """
+    if workers is None: workers = SEGMENT_WORKERS or subset_sum.DEFAULT_WORKERS or os.cpu_count() or 1
+    jobs = [(name, df_all[mask].copy()) for name, mask in segments if mask.any()]
+    t0 = time.time()
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_window_worker,
+                                 initargs=(subset_sum.TIME_BUDGET, subset_sum.CACHE)) as pool:
+            # Catat tahap tiap jendela (tanpa profil; profil cabang hanya di proses ini)
+            options = (None, None) if metrics.active() else None
+            futures = [pool.submit(_process_window, seg_name, seg_df, offset_window_days, options, recon) for seg_name, seg_df in jobs]
+            window_results = []
+            for fut in futures:
+                results, stages = fut.result()
+                metrics.extend(stages)
+                window_results.append(results)
+    else:
+        window_results = []
+        for seg_name, seg_df in jobs:
+            metrics.set_segment(seg_name)
+            window_results.append(process_core_depo(seg_df, TARGET_BRANCH, offset_window_days, recon=recon))
+
+    final_matches_collection = {}
+    leftovers = []
+    for (seg_name, seg_df), results in zip(jobs, window_results):
+        gantung = _collect(results, final_matches_collection, seg_name)
+        progress("write", f"   ↳ {seg_name}: {len(seg_df) - len(gantung)} dari {len(seg_df)} baris cocok")
+        leftovers.append(gantung)
+    progress("info", f"🔹 {len(jobs)} jendela selesai dalam {time.time() - t0:.1f} detik (paralel {min(workers, max(len(jobs), 1))} proses)")
+
+    # Pass akhir: sisa semua jendela digabung, pasangan lintas jendela dicari di sini
+    input_df = pd.concat(leftovers, ignore_index=True) if leftovers else pd.DataFrame()
+    if input_df.empty:
+        return final_matches_collection, input_df
+    progress("info", f"🔹 Pass akhir atas {len(input_df)} baris sisa...")
+    t0 = time.time()
+    metrics.set_segment("Pass Akhir")
+    gantung = _collect(process_core_depo(input_df, TARGET_BRANCH, offset_window_days, recon=recon), final_matches_collection, "Pass Akhir")
+    progress("write", f"   ↳ {len(input_df) - len(gantung)} baris cocok di pass akhir ({time.time() - t0:.1f} detik)")
+    return final_matches_collection, gantung
+
+
+def _process_window(seg_name, seg_df, offset_window_days, options=None, recon=None):
+    # Worker jendela paralel: hasil + catatan tahap (metrics) jendela ini
+    with metrics.recording(TARGET_BRANCH, options) as recorder:
+        metrics.set_segment(seg_name)
+        results = process_core_depo(seg_df, TARGET_BRANCH, offset_window_days, recon=recon)
+    return results, recorder.stages if recorder else []
+
+
+def _init_window_worker(branch_budget=None, solver_cache=None):
+    # Paralelisme sudah di level jendela; solver di dalam worker jalan 1 proses
+    subset_sum.DEFAULT_WORKERS = 1
+    subset_sum.CACHE = solver_cache
+    budget.install(branch_budget)
+
+
+def _collect(results, final_matches_collection, segment):
+    # Kumpulkan hasil cocok per kategori; return DATA GANTUNG.
+    # Key grup diberi awalan nama segmen (nomor Match_ID dll. mulai ulang tiap segmen)
+    gantung = pd.DataFrame()
+    for title, df_res in results:
+        if title == "DATA GANTUNG":
+            gantung = df_res.copy()
+        else:
+            if not df_res.empty:
+                if title not in final_matches_collection:
+                    final_matches_collection[title] = []
+                if money.GROUP_KEY in df_res.columns:
+                    df_res = df_res.assign(**{money.GROUP_KEY: segment + ":" + df_res[money.GROUP_KEY].astype(str)})
+                final_matches_collection[title].append(df_res)
+    return gantung
+
 
+def _consolidate(final_matches_collection, carry_over_gantung):
     # 4. MEMISAHKAN GANTUNG KARET VS CABANG (DEPO)
     if not carry_over_gantung.empty and "Tempat Pembayaran" in carry_over_gantung.columns:
         mask_cabang = carry_over_gantung["Tempat Pembayaran"].astype(str).str.upper().str.contains(TARGET_BRANCH, na=False)
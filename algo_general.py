@@ -1,207 +1,119 @@
 # algo_general.py
 import pandas as pd
 import numpy as np
+import keperluan
+import metrics
+import money
+import group_balance
+import pipeline
+import reference_graph
 import utils  # Import file utils.py
 
-def process_branch_reconciliation(df_subset, branch_name):
+def process_branch_reconciliation(df_subset, branch_name, offset_window_days=0, recon=None):
     """
     Logika Standar untuk Semua Cabang (Kecuali logic khusus Depo)
+    offset_window_days: toleransi selisih tanggal (hari) untuk tahap OFFSET PAIR
+    recon: argumen tambahan utils.reconcile_global_no_group (mis. time_limit_ms), None = default
     """
-    df_subset = df_subset.reset_index(drop=True)
+    # Satu frame dasar + penanda baris tersisa; tiap tahap hanya mengeluarkan baris yang cocok
+    pipe = pipeline.StagePipeline(df_subset)
+    metrics.start(len(pipe.base))
+    # Tokenisasi kode BKK/BKM/JMU & flag kata kunci sekali di awal; tahap berikutnya tinggal lookup
+    codes = keperluan.extract_reference_codes(pipe.base["Keperluan"])
+    flags = keperluan.classify_keperluan(pipe.base["Keperluan"])
+    metrics.stage("TOKENISASI", pipe.remaining.sum())
 
     # --- 2. MATCH BS ---
-    balanced_keperluan_bs = (
-        df_subset[df_subset["Jenis Dokumen"]=="BS"]
-        .groupby("Keperluan")[["Debet", "Kredit"]]
-        .sum()
-        .query("Debet == Kredit")
-        .index
-    )
-    df_match_bs = df_subset[
-        (df_subset["Jenis Dokumen"]=="BS") &
-        (df_subset["Keperluan"].isin(balanced_keperluan_bs))
-    ]
-    df_subset = df_subset[~df_subset.index.isin(df_match_bs.index)]
+    # Keperluan difaktorkan sekali; jumlah Net (sen) per grup dipakai ulang oleh MATCH KEPERLUAN.
+    # Debet == Kredit per grup <=> total Net sen == 0
+    kep_groups = group_balance.GroupBalance(pipe.base["Keperluan"], {"Net": money.net_cents(pipe.base)}, active=pipe.remaining)
+    is_bs = (pipe.base["Jenis Dokumen"]=="BS").to_numpy()
+    sums_bs = kep_groups.subset_sums(is_bs)
+    mask_bs = kep_groups.rows_in(sums_bs["Net"] == 0, within=is_bs)
+    df_match_bs = pipe.take(mask_bs[pipe.remaining])
+    df_match_bs[money.GROUP_KEY] = df_match_bs["Keperluan"]
+    kep_groups.remove(df_match_bs.index)
+    metrics.stage("MATCH BS", pipe.remaining.sum())
 
     # --- 3. MATCH KEPERLUAN ---
-    balanced_keperluan = (
-        df_subset
-        .groupby("Keperluan")[["Debet", "Kredit"]]
-        .sum()
-        .query("Debet == Kredit")
-        .index
-    )
-    df_match = df_subset[df_subset["Keperluan"].isin(balanced_keperluan)]
-    df_subset = df_subset[~df_subset.index.isin(df_match.index)]
+    df_match = pipe.take(kep_groups.rows_in(kep_groups.sums["Net"] == 0)[pipe.remaining])
+    df_match[money.GROUP_KEY] = df_match["Keperluan"]
+    metrics.stage("MATCH KEPERLUAN", pipe.remaining.sum())
 
     # --- 4. PEMBAYARAN ATAS NOTA ---
-    mask_nota = df_subset["Keperluan"].str.contains("PEMBAYARAN ATAS NOTA", na=False)
-    df_nota = df_subset[mask_nota].copy()
-    df_subset = df_subset[~mask_nota].copy()
+    df_nota = pipe.take(keperluan.has_flag(flags, keperluan.KW_NOTA, pipe.index))
+    metrics.stage("NOTA", pipe.remaining.sum())
 
     # --- 5. PENARIKAN DANA ---
     mask_dana = (
-        df_subset["Keperluan"].str.contains("PENARIKAN DANA VIA ATM", na=False) &
-        df_subset["Keperluan"].str.contains("MANDIRI SMART ACCOUNT", na=False)
+        keperluan.has_flag(flags, keperluan.KW_ATM, pipe.index) &
+        keperluan.has_flag(flags, keperluan.KW_MSA, pipe.index)
     )
-    df_dana = df_subset[mask_dana].copy()
-    df_subset = df_subset[~mask_dana].copy()
+    df_dana = pipe.take(mask_dana)
+    metrics.stage("PENARIKAN DANA", pipe.remaining.sum())
 
     # --- 6. JMU ASD_ASK ---
-    REGEX_BKK_BKM_ID = r'(?:ID)?BK[KM]\s*[:\-]?\s*(\d+/\d{4})'
-    mask_keyword = (df_subset["Keperluan"].str.contains("JMU ASD", na=False) | 
-                    df_subset["Keperluan"].str.contains("JMU ASK", na=False))
-    df_asd_temp = df_subset[mask_keyword].copy()
+    mask_keyword = keperluan.has_flag(flags, keperluan.KW_JMU_ASD | keperluan.KW_JMU_ASK, pipe.index)
+    df_asd_temp = pipe.peek(mask_keyword)
 
     if not df_asd_temp.empty:
-        df_asd_temp["KODE"] = df_asd_temp["Keperluan"].str.extract(REGEX_BKK_BKM_ID)[0]
+        df_asd_temp["KODE"] = keperluan.lookup(codes, "BK_ID_FIRST", df_asd_temp.index)
         replacement_values = df_asd_temp.index.astype(str).values
         df_asd_temp["KODE"] = df_asd_temp["KODE"].fillna(pd.Series(replacement_values, index=df_asd_temp.index))
-        sum_per_kode = df_asd_temp.groupby('KODE')['Net'].transform('sum')
-        mask_balanced = (sum_per_kode.abs() < 1e-9)
+        asd_groups = group_balance.GroupBalance(df_asd_temp["KODE"], {"Net": money.net_cents(df_asd_temp)})
+        mask_balanced = asd_groups.rows_in(asd_groups.sums["Net"] == 0)
         df_asd = df_asd_temp[mask_balanced].copy()
-        df_subset = df_subset[~df_subset.index.isin(df_asd.index)].copy()
+        df_asd[money.GROUP_KEY] = df_asd["KODE"]
+        pipe.discard(df_asd.index)
     else:
-        df_asd = pd.DataFrame(columns=df_subset.columns)
-    df_asd = df_asd.drop(columns=["KODE"])
+        df_asd = pd.DataFrame(columns=pipe.columns)
+    df_asd = df_asd.drop(columns=["KODE"], errors="ignore")
+    metrics.stage("JMU ASD/ASK", pipe.remaining.sum())
 
     # --- 7. BKK (ID & NO) ---
-    df_matched_bkk = pd.DataFrame()
-    REGEX_BKK_ID = r'(?:ID)?BKK\s*[:\-]?\s*(\d+/\d{4})'
-    try: all_matches_bkk = df_subset["Keperluan"].str.extractall(REGEX_BKK_ID)[0].unstack()
-    except: all_matches_bkk = pd.DataFrame()
-    
-    if not all_matches_bkk.empty:
-        for layer in all_matches_bkk.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkk[layer])
-            list_candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(list_candidates) == 0: continue
-            
-            # Note: Logic General masih pakai Jenis Dokumen 'VO' sesuai kode asli
-            sum_id = df_subset[(df_subset["ID Dokumen"].isin(list_candidates)) & (df_subset["Jenis Dokumen"]=='VO')].groupby("ID Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(list_candidates)].groupby("KODE")["Net"].sum()
-            
-            total_sum = sum_id.add(sum_kode, fill_value=0)
-            valid_ids = total_sum[total_sum.abs() <= 1].index.tolist()
-            if not valid_ids: continue
-
-            mask_valid_bkk = (df_subset["ID Dokumen"].isin(valid_ids) | df_subset["KODE"].isin(valid_ids))
-            df_current_valid = df_subset[mask_valid_bkk].copy()
-            df_matched_bkk = pd.concat([df_matched_bkk, df_current_valid])
-            df_subset = df_subset[~mask_valid_bkk].copy()
-            
-    # BKK NO (Simpel)
-    REGEX_BKK_NO = r'\bNOBKK\s*:\s*([A-Z]{2}\.\d+/\d{2}/\d{4})\b'
-    try: all_matches_bkk_no = df_subset["Keperluan"].str.extractall(REGEX_BKK_NO)[0].unstack()
-    except: all_matches_bkk_no = pd.DataFrame()
-    
-    if not all_matches_bkk_no.empty:
-        for layer in all_matches_bkk_no.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkk_no[layer])
-            list_candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(list_candidates) == 0: continue
-
-            sum_id = df_subset[(df_subset["ID Dokumen"].isin(list_candidates)) & (df_subset["Jenis Dokumen"]=='VO')].groupby("Nomor Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(list_candidates)].groupby("KODE")["Net"].sum()
-            
-            total_sum = sum_id.add(sum_kode, fill_value=0)
-            valid_ids = total_sum[total_sum.abs() <= 1].index.tolist()
-            if not valid_ids: continue
-
-            mask_valid_bkk = (df_subset["Nomor Dokumen"].isin(valid_ids) | df_subset["KODE"].isin(valid_ids))
-            df_current_valid = df_subset[mask_valid_bkk].copy()
-            df_matched_bkk = pd.concat([df_matched_bkk, df_current_valid])
-            df_subset = df_subset[~mask_valid_bkk].copy()
-            
-    if "KODE" in df_matched_bkk.columns: df_matched_bkk.drop(columns=["KODE"],inplace=True)
+    # Graf referensi: baris perujuk + dokumen tujuan, diterima per komponen yang seimbang
+    # Note: Logic General masih pakai Jenis Dokumen 'VO' sesuai kode asli
+    df_matched_bkk = reference_graph.match_voucher_references(pipe, codes, "BKK", jenis="VO")
+    metrics.stage("BKK", pipe.remaining.sum())
 
     # --- 8. BKM (ID & NO) ---
-    df_matched_bkm = pd.DataFrame()
-    REGEX_BKM_ID = r'(?:ID)?BKM\s*[:\-]?\s*(\d+/\d{4})'
-    try: all_matches_bkm = df_subset["Keperluan"].str.extractall(REGEX_BKM_ID)[0].unstack()
-    except: all_matches_bkm = pd.DataFrame()
-    
-    if not all_matches_bkm.empty:
-        for layer in all_matches_bkm.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkm[layer])
-            list_candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(list_candidates) == 0: continue
-
-            # Note: Logic General masih pakai Jenis Dokumen 'VI'
-            sum_id = df_subset[(df_subset["ID Dokumen"].isin(list_candidates)) & (df_subset["Jenis Dokumen"]=='VI')].groupby("ID Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(list_candidates)].groupby("KODE")["Net"].sum()
-            
-            total_sum = sum_id.add(sum_kode, fill_value=0)
-            valid_ids = total_sum[total_sum.abs() <= 1].index.tolist()
-            if not valid_ids: continue
-
-            mask_valid_bkm = (df_subset["ID Dokumen"].isin(valid_ids) | df_subset["KODE"].isin(valid_ids))
-            df_current_valid = df_subset[mask_valid_bkm].copy()
-            df_matched_bkm = pd.concat([df_matched_bkm, df_current_valid])
-            df_subset = df_subset[~mask_valid_bkm].copy()
-
-    # BKM NO
-    REGEX_BKM_NO = r'\bNOBKM\s*:\s*([A-Z]{2}\.\d+/\d{2}/\d{4})\b'
-    try: all_matches_bkm_no = df_subset["Keperluan"].str.extractall(REGEX_BKM_NO)[0].unstack()
-    except: all_matches_bkm_no = pd.DataFrame()
-    
-    if not all_matches_bkm_no.empty:
-        for layer in all_matches_bkm_no.columns:
-            if df_subset.empty: break
-            df_subset["KODE"] = df_subset.index.map(all_matches_bkm_no[layer])
-            list_candidates = df_subset[df_subset["KODE"].notna()]["KODE"].unique()
-            if len(list_candidates) == 0: continue
-
-            sum_id = df_subset[(df_subset["ID Dokumen"].isin(list_candidates)) & (df_subset["Jenis Dokumen"]=='VI')].groupby("Nomor Dokumen")["Net"].sum()
-            sum_kode = df_subset[df_subset["KODE"].isin(list_candidates)].groupby("KODE")["Net"].sum()
-            
-            total_sum = sum_id.add(sum_kode, fill_value=0)
-            valid_ids = total_sum[total_sum.abs() <= 1].index.tolist()
-            if not valid_ids: continue
-
-            mask_valid_bkm = (df_subset["Nomor Dokumen"].isin(valid_ids) | df_subset["KODE"].isin(valid_ids))
-            df_current_valid = df_subset[mask_valid_bkm].copy()
-            df_matched_bkm = pd.concat([df_matched_bkm, df_current_valid])
-            df_subset = df_subset[~mask_valid_bkm].copy()
-
-    if "KODE" in df_matched_bkm.columns: df_matched_bkm.drop(columns=["KODE"],inplace=True)
+    # Note: Logic General masih pakai Jenis Dokumen 'VI'
+    df_matched_bkm = reference_graph.match_voucher_references(pipe, codes, "BKM", jenis="VI")
+    metrics.stage("BKM", pipe.remaining.sum())
 
     # --- 11. MANDIRI SMART ACCOUNT ---
-    mask_SA = df_subset["Keperluan"].str.contains(r"^(?:MANDIRI SMART ACCOUNT|PENARIKAN DANA VIA)", case=False, na=False)
-    df_SA = df_subset[mask_SA].copy()
-    if "KODE" in df_SA.columns: df_SA.drop(columns="KODE", inplace=True)
-    df_subset = df_subset[~mask_SA].copy()
+    df_SA = pipe.take(keperluan.has_flag(flags, keperluan.KW_SA_PREFIX, pipe.index))
+    metrics.stage("MANDIRI SA", pipe.remaining.sum())
 
     # --- 12. Jurnal MATCH ---
-    df_subset['KODE'] = np.nan
-    df_subset['KODE'] = df_subset['Keperluan'].str.extract(r'^((?:JM[UH]|[A-Z]{2}\.)\d\S*)')[0]
-    df_subset['KODE'] = np.where(df_subset["KODE"].isna(), df_subset["Nomor Dokumen"], df_subset["KODE"])
-    sum_per_kode = df_subset.groupby('KODE')['Net'].transform('sum')
-    mask_jurnal = (df_subset['KODE'].notna()) & (sum_per_kode.abs() < 1e-9)
-    df_jurnal = df_subset[mask_jurnal].copy()
-    df_subset.drop(columns=['KODE'], inplace=True)
-    df_subset = df_subset[~mask_jurnal]
+    kode = keperluan.lookup(codes, "JURNAL", pipe.index)
+    pipe.set_column('KODE', np.where(kode.isna(), pipe.column("Nomor Dokumen"), kode))
+    jurnal_groups = group_balance.GroupBalance(pipe.column('KODE'), {"Net": pipe.column(money.NET_CENTS)})
+    df_jurnal = pipe.take(jurnal_groups.rows_in(jurnal_groups.sums["Net"] == 0))
+    df_jurnal[money.GROUP_KEY] = df_jurnal["KODE"]
+    pipe.drop_column('KODE')
+    metrics.stage("JURNAL MATCH", pipe.remaining.sum())
 
     # --- 13. ATK ---
-    mask_atk = (df_subset["Sumber Dokumen"].str.contains(r"PO\.", na=False) & (df_subset["Jenis Dokumen"] == "TTT"))
-    df_atk = df_subset[mask_atk].copy()
-    df_subset = df_subset[~mask_atk].copy()
+    mask_atk = (pipe.column("Sumber Dokumen").str.contains(r"PO\.", na=False) & (pipe.column("Jenis Dokumen") == "TTT"))
+    df_atk = pipe.take(mask_atk)
+    metrics.stage("ATK", pipe.remaining.sum())
 
     # --- 14. OFFSET PAIR ---
-    df_result = utils.find_offset_pairs(df_subset.copy())
+    df_result = utils.find_offset_pairs(pipe.frame(), window_days=offset_window_days)
     df_matched_tanggal = df_result[df_result['Is_Matched'] == True].sort_values(by='Match_ID')
-    index_tanggal = df_matched_tanggal.index
-    df_matched_tanggal.drop(columns=["Match_ID", "Is_Matched"], inplace=True)
-    df_subset = df_subset[~df_subset.index.isin(index_tanggal)]
+    pipe.discard(df_matched_tanggal.index)
+    df_matched_tanggal.drop(columns="Is_Matched", inplace=True)
+    df_matched_tanggal.rename(columns={"Match_ID": money.GROUP_KEY}, inplace=True)
+    metrics.stage("OFFSET PAIRS", pipe.remaining.sum())
 
     # --- 15. RECON (OR-TOOLS) ---
-    df_recon = utils.reconcile_global_no_group(df_subset, net_col='Net', tolerance=1)
+    df_recon = utils.reconcile_global_no_group(pipe.frame(), net_col='Net', tolerance=1, **(recon or {}))
     df_recon = df_recon[df_recon["Match_ID"].notna()]
-    df_recon.drop(columns="Match_ID", inplace=True)
-    df_subset = df_subset[~df_subset.index.isin(df_recon.index)]
+    df_recon.rename(columns={"Match_ID": money.GROUP_KEY}, inplace=True)
+    pipe.discard(df_recon.index)
+    df_subset = pipe.frame()
+    metrics.stage("RECON OR-TOOLS", pipe.remaining.sum())
 
     # --- 16. GANTUNG (MODIFIED) ---
     df_gantung = pd.concat([df_atk, df_subset], axis=0)
@@ -231,4 +143,4 @@ def process_branch_reconciliation(df_subset, branch_name):
         ("JURNAL MATCH", df_jurnal),
         ("OFFSET PAIRS", df_matched_tanggal),
         ("RECON OR-TOOLS", df_recon)
-    ]
\ No newline at end of file
+    ]
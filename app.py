@@ -1,56 +1,20 @@
 # app.py
 import streamlit as st
-import pandas as pd
 import io
+import os
+import threading
+import time
 import utils
-import algo_general
-import algo_depo
-
-# ==========================================
-# DEFINISI MAPPING CABANG
-# ==========================================
-BRANCH_MAPPING = {
-    "AMBON": "HUTANG/PIUTANG AFILIASI AMBON",
-    "BALIKPAPAN": "HUTANG/PIUTANG AFILIASI BPP",
-    "BANGKA": "HUTANG/PIUTANG AFILIASI BANGKA",
-    "BANJARMASIN": "HUTANG/PIUTANG AFILIASI BMS",
-    "BATAM": "HUTANG/PIUTANG AFILIASI BATAM",
-    "BATULICIN": "HUTANG/PIUTANG AFILIASI BTL",
-    "BAU - BAU": "HUTANG/PIUTANG AFILIASI BAU-BAU",
-    "BERAU": "HUTANG/PIUTANG AFILIASI BERAU",
-    "BIAK": "HUTANG/PIUTANG AFILIASI BIA",
-    "BINTUNI": "HUTANG/PIUTANG AFILIASI BINTUNI",
-    "BITUNG": "HUTANG/PIUTANG AFILIASI BITUNG",
-    "BUNGKU": "HUTANG/PIUTANG AFILIASI BUNGKU",
-    "DEPO": "HUTANG/PIUTANG AFILIASI DEPO",
-    "FAK - FAK": "HUTANG/PIUTANG AFILIASI FAK-FAK",
-    "GORONTALO": "HUTANG/PIUTANG AFILIASI GORONTALO",
-    "JAYAPURA": "HUTANG/PIUTANG AFILIASI JYP",
-    "KAIMANA": "HUTANG/PIUTANG AFILIASI KAIMANA",
-    "KENDARI": "HUTANG/PIUTANG AFILIASI KENDARI",
-    "KETAPANG": "HUTANG/PIUTANG AFILIASI KTG",
-    "LUWUK": "HUTANG/PIUTANG AFILIASI LUWUK",
-    "MAKASSAR": "HUTANG/PIUTANG AFILIASI MAKASSAR",
-    "MANOKWARI": "HUTANG/PIUTANG AFILIASI MRI",
-    "MEDAN": "HUTANG/PIUTANG AFILIASI MDN",
-    "MERAUKE": "HUTANG/PIUTANG AFILIASI MKE",
-    "NABIRE": "HUTANG/PIUTANG AFILIASI NABIRE",
-    "NUNUKAN": "HUTANG/PIUTANG AFILIASI NUNUKAN",
-    "PADANG": "HUTANG/PIUTANG AFILIASI PADANG",
-    "PALEMBANG": "HUTANG/PIUTANG AFILIASI PALEMBANG",
-    "PALU": "HUTANG/PIUTANG AFILIASI PALU",
-    "PEKANBARU": "HUTANG/PIUTANG AFILIASI PEKAN BARU",
-    "PONTIANAK": "HUTANG/PIUTANG AFILIASI PONTIANAK",
-    "SAMARINDA": "HUTANG/PIUTANG AFILIASI SMD",
-    "SAMPIT": "HUTANG/PIUTANG AFILIASI SAMPIT",
-    "SEMARANG": "HUTANG/PIUTANG AFILIASI SEMARANG",
-    "SERUI": "HUTANG/PIUTANG AFILIASI SERUI",
-    "SORONG": "HUTANG/PIUTANG AFILIASI SRG",
-    "TARAKAN": "HUTANG/PIUTANG AFILIASI TRK",
-    "TERNATE": "HUTANG/PIUTANG AFILIASI TERNATE",
-    "TIMIKA": "HUTANG/PIUTANG AFILIASI TIMIKA",
-    "TUAL": "HUTANG/PIUTANG AFILIASI TUAL"
-}
+import ledger
+import metrics
+import reporting
+import runner
+import upload_cache
+import writer
+
+BRANCH_MAPPING = runner.BRANCH_MAPPING
+# Jeda antar rerun saat menunggu thread proses (detik)
+POLL_SECONDS = 1
 
 st.set_page_config(page_title="Multi-Branch Auto RK", layout="wide")
 st.title("Cocokan Hutang/Piutang Afiliasi Cabang")
@@ -77,116 +41,165 @@ if select_all:
 else:
     selected_branches = st.sidebar.multiselect("Pilih Cabang:", options=available_branches)
 
-if uploaded_file and st.button("Mulai Proses"):
+st.sidebar.header("Opsi Pencocokan")
+offset_window_days = st.sidebar.number_input("Toleransi Tanggal Offset Pair (hari)", min_value=0, max_value=31, value=0, step=1,
+                                             help="0 = hanya tanggal yang sama. >0 = pasangkan nominal berlawanan dengan selisih tanggal maksimal N hari.")
+branch_workers = st.sidebar.number_input("Jumlah Proses Paralel", min_value=1, max_value=64, value=os.cpu_count() or 1, step=1,
+                                         help="Jumlah cabang yang diproses bersamaan.")
+only_used_columns = st.sidebar.checkbox("Baca Kolom yang Dipakai Saja", value=False,
+                                        help="Lebih cepat & hemat memori untuk file besar. Kolom lain tidak ikut ditampilkan di hasil.")
+RECON_MODE_OPTIONS = {"Grup satu per satu": "loop", "Satu model semua grup (joint)": "joint"}
+recon_mode = RECON_MODE_OPTIONS[st.sidebar.selectbox("Mode RECON", options=list(RECON_MODE_OPTIONS),
+                                                     help="Joint: hasil satu per satu dijadikan solusi awal satu model SCIP semua grup; dipakai jika memasang lebih banyak baris. Lebih lambat.")]
+recon_cluster_days = st.sidebar.number_input("Cluster Tanggal RECON (hari)", min_value=0, max_value=31, value=0, step=1,
+                                             help="0 = sisa RECON diselesaikan sebagai satu masalah (paling lengkap). >0 = dipecah per jendela N hari agar paralel; grup yang melintasi lebih dari 2 jendela bisa tidak ditemukan.")
+
+st.sidebar.header("Segmentasi Depo")
+DEPO_WINDOW_OPTIONS = {"Bawaan (1-10, 11-20, >20)": None, "Mingguan (7 hari)": 7, "5 hari": 5, "Per hari": 1}
+depo_window_days = DEPO_WINDOW_OPTIONS[st.sidebar.selectbox("Jendela Segmen", options=list(DEPO_WINDOW_OPTIONS))]
+DEPO_MODE_OPTIONS = {"Rolling (berurutan, carry over)": "rolling", "Paralel + pass akhir": "parallel"}
+depo_mode = DEPO_MODE_OPTIONS[st.sidebar.selectbox("Mode Segmen", options=list(DEPO_MODE_OPTIONS),
+                                                   help="Paralel: tiap jendela dicocokkan bersamaan di semua core, lalu sisa semua jendela dicocokkan sekali lagi.")]
+
+st.sidebar.header("Export Tambahan")
+EXPORT_OPTIONS = {"Tidak ada": None, "CSV per cabang (.zip)": "csv", "Parquet per cabang (.zip)": "parquet", "Excel per cabang (.zip)": "xlsx"}
+extra_export = EXPORT_OPTIONS[st.sidebar.selectbox("Format Export Tambahan", options=list(EXPORT_OPTIONS),
+                                                   help="Untuk tools audit/olah data massal: satu file per cabang dengan kolom Kategori, tanpa membuka workbook besar.")]
+skip_main_workbook = bool(extra_export) and st.sidebar.checkbox("Hanya Export Tambahan", value=False,
+                                                               help="Tidak membuat Output_RK.xlsx (lebih cepat untuk data besar).")
+
+st.sidebar.header("Proses Inkremental")
+ledger_path = st.sidebar.text_input("File State (SQLite)", value="",
+                                    help="Kosong = proses penuh. Diisi = hasil disimpan; run berikutnya hanya memproses baris baru & GANTUNG terbuka.").strip()
+solver_cache_path = st.sidebar.text_input("File Cache Solver (SQLite)", value="",
+                                          help="Kosong = cache di memori saja. Diisi = hasil solver dipakai ulang antar run untuk residu nominal yang sama.").strip()
+
+st.sidebar.header("Anggaran Waktu Solver")
+time_budget_minutes = st.sidebar.number_input("Total Waktu Solver (menit)", min_value=0.0, max_value=600.0, value=0.0, step=1.0,
+                                              help="0 = tanpa batas. >0 = waktu solver RECON dibagi antar cabang sesuai jumlah baris belum cocok.")
+
+st.sidebar.header("Metrik Per Tahap")
+record_metrics = st.sidebar.checkbox("Catat Metrik", value=False,
+                                     help="Waktu, baris masuk/keluar, peak RSS & panggilan solver per tahap tiap cabang (download JSON).")
+metrics_sheet = record_metrics and not skip_main_workbook and st.sidebar.checkbox("Tambahkan Sheet METRICS", value=False)
+
+
+def cancel_run():
+    # Pembatalan kooperatif: panggilan solver berikutnya di semua proses dilewati,
+    # cabang diselesaikan dengan hasil sejauh ini (thread latar tetap jalan sampai selesai)
+    job = st.session_state.get("job")
+    if job is None: return
+    job["cancelled"] = True
+    if job["run_budget"] is not None: job["run_budget"].cancel()
+
+
+def run_job(job, file_data, options):
+    """
+    Seluruh proses (baca, cocokkan, tulis) di thread latar. Progress & hasil hanya ditulis
+    ke dict job (disimpan di session_state), jadi rerun Streamlit (mis. tombol Batalkan)
+    tidak menghentikan proses maupun membuang hasilnya.
+    """
+    progress = job["log"]
+    try:
+        run_metrics = metrics.RunMetrics() if options["record_metrics"] else None
+        job["status"] = "Membaca data..."
+        with metrics.phase(run_metrics, "BACA DATA"):
+            df_pusat_global, df_cabang_global = upload_cache.load_excel_sheets_cached(file_data, (0, 1), columns=utils.USED_COLUMNS if options["only_used_columns"] else None, progress=progress)
+        if df_pusat_global is None or df_cabang_global is None or job["cancelled"]: return
+
+        state = ledger.Ledger(options["ledger_path"]) if options["ledger_path"] else None
+        output = None if options["skip_main_workbook"] else writer.StreamingWorkbook()
+        bundle = writer.BundleExport(options["extra_export"]) if options["extra_export"] else None
+
+        # --- FILTER DATA ---
+        with metrics.phase(run_metrics, "FILTER CABANG", len(df_pusat_global) + len(df_cabang_global)):
+            jobs = runner.prepare_jobs(df_pusat_global, df_cabang_global, options["selected_branches"], progress=progress)
+
+        def report_progress(branch_name, done, total):
+            job["status"] = f"Selesai: {branch_name} ({done}/{total})"
+            job["progress"] = int((done / total) * 90)
+
+        # Cache solver per job, diteruskan ke worker (tidak dipasang global di proses server)
+        solver_cache = runner.make_solver_cache(options["solver_cache_path"] or None)
+
+        # --- ANGGARAN WAKTU & PEMBATALAN ---
+        run_budget = runner.make_run_budget(jobs, options["time_budget_minutes"] * 60 or None, options["branch_workers"])
+        job["run_budget"] = run_budget
+        if job["cancelled"]: run_budget.cancel()
+
+        # --- PROSES CABANG (PARALEL) & TULIS SESUAI URUTAN ---
+        job["status"] = f"Memproses {len(jobs)} cabang..."
+        for branch_name, results_list, sheet_label_suffix in runner.run_branches(jobs, workers=options["branch_workers"], offset_window_days=options["offset_window_days"], on_complete=report_progress, progress=progress, recon=options["recon"], ledger=state, depo_segments=options["depo_segments"], run_budget=run_budget, run_metrics=run_metrics, solver_cache=solver_cache):
+            # --- WRITE OUTPUT (streaming, constant memory) ---
+            with metrics.phase(run_metrics, "TULIS OUTPUT", sum(len(df) for _, df in results_list), branch_name):
+                if output: output.write_branch(branch_name, results_list, sheet_label_suffix)
+                if bundle: bundle.write_branch(branch_name, results_list, sheet_label_suffix)
+
+        if state: state.close()
+        if output and options["metrics_sheet"]: output.write_table("METRICS", run_metrics.frame())
+        if output:
+            output.close()
+            job["processed_data"] = output.read_and_remove()
+        if bundle:
+            bundle.close()
+            job["bundle_data"] = bundle.read_and_remove()
+        job["budget_report"] = run_budget.report()
+        job["run_metrics"] = run_metrics
+        job["progress"] = 100
+        job["status"] = "Dibatalkan, hasil sejauh ini:" if run_budget.cancelled else "Selesai!"
+    except Exception as e:
+        job["error"] = f"Runtime Error: {e}"
+    finally:
+        job["done"] = True
+
+
+def show_job(job):
+    # Tampilkan state job dari session_state; selama thread jalan, script dijalankan ulang berkala
+    st.progress(job["progress"])
+    job["log"].replay(reporting.streamlit_progress)
+    if not job["done"]:
+        st.text(job["status"])
+        st.button("Batalkan", on_click=cancel_run, disabled=job["cancelled"],
+                  help="Hentikan solver; cabang diselesaikan dengan hasil sejauh ini.")
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+    if job["error"]:
+        st.error(job["error"])
+        return
+    if "budget_report" not in job: return
+    st.success(job["status"])
+    with st.expander("Pemakaian Waktu Solver per Cabang"):
+        st.dataframe(job["budget_report"], hide_index=True)
+    run_metrics = job["run_metrics"]
+    if run_metrics is not None:
+        with st.expander("Metrik Per Tahap"):
+            st.dataframe(run_metrics.frame(), hide_index=True)
+        st.download_button(label="Download Metrik (.json)", data=run_metrics.to_json(), file_name="Output_RK_metrics.json", mime="application/json")
+    if "processed_data" in job:
+        st.download_button(label="Download Hasil (.xlsx)", data=job["processed_data"], file_name="Output_RK.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    if "bundle_data" in job:
+        extra_export = job["extra_export"]
+        st.download_button(label=f"Download Export {extra_export.upper()} (.zip)", data=job["bundle_data"], file_name=f"Output_RK_{extra_export}.zip", mime="application/zip")
+
+
+job = st.session_state.get("job")
+running = job is not None and not job["done"]
+if uploaded_file and st.button("Mulai Proses", disabled=running):
     if not selected_branches:
         st.error("Mohon pilih cabang.")
         st.stop()
 
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    try:
-        status_text.text("Membaca data...")
-        df_pusat_global = utils.load_excel_with_header_detection(uploaded_file, 0)
-        df_cabang_global = utils.load_excel_with_header_detection(uploaded_file, 1)
-
-        if df_pusat_global is None or df_cabang_global is None: st.stop()
-        
-        output = io.BytesIO()
-        writer = pd.ExcelWriter(output, engine='xlsxwriter')
-        workbook = writer.book
-
-        total_branches = len(selected_branches)
-
-        for i, branch_name in enumerate(selected_branches):
-            status_text.text(f"Memproses: {branch_name} ({i+1}/{total_branches})")
-            progress_bar.progress(int((i / total_branches) * 90))
-
-            # --- FILTER DATA ---
-            target_kode = BRANCH_MAPPING.get(branch_name, "")
-            
-            # Filter Pusat
-            if "Nama Kode" in df_pusat_global.columns:
-                df_pusat_filter = df_pusat_global[df_pusat_global["Nama Kode"] == target_kode].copy()
-            else:
-                df_pusat_filter = df_pusat_global.copy()
-
-            # Filter Cabang
-            if "Tempat Pembayaran" in df_cabang_global.columns:
-                # Use strict equality inside mask loop if standard, or specific if depo
-                mask_cabang = df_cabang_global["Tempat Pembayaran"].astype(str).str.upper() == branch_name
-                df_cabang_filter = df_cabang_global[mask_cabang].copy()
-            else:
-                df_cabang_filter = df_cabang_global.copy()
-
-            if df_pusat_filter.empty and df_cabang_filter.empty:
-                continue
-            
-            df_all = pd.concat([df_pusat_filter, df_cabang_filter]).copy()
-            df_all.reset_index(inplace=True, drop=False)
-
-            # --- CLEAN NUMBERS ---
-            cols_num = ['Debet', 'Kredit']
-            for col in cols_num:
-                if col in df_all.columns:
-                    df_all[col] = pd.to_numeric(df_all[col], errors='coerce').fillna(0)
-            if "Debet" in df_all.columns and "Kredit" in df_all.columns:
-                df_all["Net"] = df_all["Debet"] - df_all["Kredit"]
-            else:
-                st.error(f"Kolom Net Error di {branch_name}")
-                continue
-
-            # --- SWITCH LOGIC: DEPO VS GENERAL ---
-            if branch_name == "DEPO":
-                # Panggil Modul Khusus Depo
-                results_list = algo_depo.run_segmented_depo_logic(df_all)
-                sheet_label_suffix = " (Rolling)"
-            else:
-                # Panggil Modul General
-                results_list = algo_general.process_branch_reconciliation(df_all, branch_name)
-                sheet_label_suffix = ""
-
-            # --- WRITE OUTPUT ---
-            sheet_title = branch_name[:30]
-            worksheet = workbook.add_worksheet(sheet_title)
-            writer.sheets[sheet_title] = worksheet
-            
-            row_pointer = 0
-            worksheet.write_string(row_pointer, 0, f"Cabang: {branch_name}{sheet_label_suffix}")
-            row_pointer += 2
-
-            for title, df in results_list:
-                if not df.empty:
-                    df_sorted = utils.sort_by_tempat(df)
-                    
-                    # Total Row
-                    total_row = pd.DataFrame(columns=df_sorted.columns)
-                    total_row.loc[0] = None 
-                    if 'Debet' in df_sorted.columns: total_row.loc[0, 'Debet'] = df_sorted['Debet'].sum()
-                    if 'Kredit' in df_sorted.columns: total_row.loc[0, 'Kredit'] = df_sorted['Kredit'].sum()
-                    if 'Net' in df_sorted.columns: total_row.loc[0, 'Net'] = df_sorted['Net'].sum()
-                    col_label = 'Keperluan' if 'Keperluan' in df_sorted.columns else df_sorted.columns[0]
-                    total_row.loc[0, col_label] = 'TOTAL'
-                    
-                    df_to_write = pd.concat([df_sorted, total_row], ignore_index=True)
-
-                    worksheet.write_string(row_pointer, 0, title)
-                    row_pointer += 1
-
-                    # Style Yellow untuk Data Gantung
-                    if "GANTUNG" in title.upper():
-                        styler = df_to_write.style.set_properties(**{'background-color': '#FFFF00', 'color': 'black', 'border-color': 'black'})
-                        styler.to_excel(writer, sheet_name=sheet_title, startrow=row_pointer, index=False)
-                    else:
-                        df_to_write.to_excel(writer, sheet_name=sheet_title, startrow=row_pointer, index=False)
-                    
-                    row_pointer += len(df_to_write) + 3
-
-        writer.close()
-        processed_data = output.getvalue()
-        progress_bar.progress(100)
-        st.success("Selesai!")
-        st.download_button(label="Download Hasil (.xlsx)", data=processed_data, file_name="Output_RK.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    except Exception as e:
-        st.error(f"Runtime Error: {e}")
\ No newline at end of file
+    options = {"selected_branches": selected_branches, "offset_window_days": offset_window_days,
+               "branch_workers": branch_workers, "only_used_columns": only_used_columns,
+               "depo_segments": (depo_window_days, depo_mode), "extra_export": extra_export,
+               "skip_main_workbook": skip_main_workbook, "ledger_path": ledger_path,
+               "solver_cache_path": solver_cache_path, "time_budget_minutes": time_budget_minutes,
+               "record_metrics": record_metrics, "metrics_sheet": metrics_sheet,
+               "recon": runner.recon_options(cluster_days=recon_cluster_days, mode=recon_mode)}
+    job = {"done": False, "cancelled": False, "error": None, "progress": 0, "status": "Memulai...",
+           "log": reporting.ProgressLog(), "run_budget": None, "extra_export": extra_export}
+    st.session_state["job"] = job
+    threading.Thread(target=run_job, args=(job, io.BytesIO(uploaded_file.getvalue()), options), daemon=True).start()
+
+if job is not None:
+    show_job(job)
@@ -0,0 +1,153 @@
+# batch.py
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+import money
+import reporting
+import runner
+import upload_cache
+import writer
+
+SUMMARY_FILE = "RINGKASAN_BATCH.csv"
+
+
+def resolve_inputs(patterns):
+    """
+    Daftar workbook dari argumen: file, folder (semua .xlsx di dalamnya) atau pola glob.
+    File kunci Excel (~$...) dilewati. Urutan: sesuai argumen, nama file terurut.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found = sorted(glob.glob(os.path.join(pattern, "*.xlsx")))
+        elif any(ch in pattern for ch in "*?["):
+            found = sorted(glob.glob(pattern))
+        else:
+            found = [pattern]
+        for path in found:
+            if os.path.basename(path).startswith("~$") or path in paths: continue
+            paths.append(path)
+    return paths
+
+
+def output_names(paths, output_dir, suffix="_Output_RK.xlsx"):
+    # Nama hasil per input: <nama file><suffix>, diberi nomor jika nama file kembar
+    names, used = [], set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem + suffix, 1
+        while name in used:
+            n += 1
+            name = f"{stem}_{n}{suffix}"
+        used.add(name)
+        names.append(os.path.join(output_dir, name))
+    return names
+
+
+def summarize_branch(file_label, branch_name, results_list):
+    """
+    Ringkasan satu cabang: jumlah baris & total Net gantung (karet / cabang) dan baris cocok.
+    """
+    row = {"File": file_label, "Cabang": branch_name,
+           "Baris Gantung Karet": 0, "Net Gantung Karet": 0.0,
+           "Baris Gantung Cabang": 0, "Net Gantung Cabang": 0.0, "Baris Cocok": 0}
+    for title, df in results_list:
+        if title.startswith("DATA GANTUNG"):
+            side = "Karet" if "KARET" in title else "Cabang"
+            row[f"Baris Gantung {side}"] += len(df)
+            if len(df): row[f"Net Gantung {side}"] += money.net_cents(df).sum() / 100
+        else:
+            row["Baris Cocok"] += len(df)
+    return row
+
+
+class _FileState:
+    # Output satu workbook input: cabang ditulis sesuai urutan job begitu tersedia
+    def __init__(self, path, output_path, branch_names, export):
+        self.path = path
+        self.branch_names = branch_names
+        self.output = writer.StreamingWorkbook(output_path)
+        self.bundle = writer.BundleExport(export, os.path.splitext(output_path)[0] + f"_{export}.zip") if export else None
+        self.finished = {}
+        self.next_idx = 0
+        self.summary = []
+
+    def add(self, idx, result):
+        self.finished[idx] = result
+        while self.next_idx in self.finished:
+            results_list, suffix, _ = self.finished.pop(self.next_idx)
+            branch_name = self.branch_names[self.next_idx]
+            self.output.write_branch(branch_name, results_list, suffix)
+            if self.bundle: self.bundle.write_branch(branch_name, results_list, suffix)
+            self.summary.append(summarize_branch(os.path.basename(self.path), branch_name, results_list))
+            self.next_idx += 1
+        return self.next_idx == len(self.branch_names)
+
+    def close(self):
+        self.output.close()
+        if self.bundle: self.bundle.close()
+
+
+def run_batch(paths, output_dir, branch_names, workers=None, offset_window_days=0, columns=None,
+              export=None, recon=None, progress=None, depo_segments=None, run_budget=None, solver_cache=None):
+    """
+    Proses banyak workbook dengan satu process pool bersama: semua job (file x cabang)
+    dijadwalkan ke pool yang sama, jadi solver tetap sibuk lintas file. File berikutnya
+    dibaca sementara job file sebelumnya berjalan. Hasil ditulis per file input
+    (<output_dir>/<nama>_Output_RK.xlsx) + RINGKASAN_BATCH.csv.
+    run_budget (budget.RunBudget, dari runner.make_batch_budget): jatah waktu solver total &
+    pembatalan untuk semua file; slot per (path, cabang), bobot diisi saat file dibaca.
+    recon / solver_cache: lihat runner.run_branches.
+    Return DataFrame ringkasan (per file & cabang).
+    """
+    progress = reporting.resolve(progress)
+    if workers is None: workers = os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    states = {}
+
+    def load(i, path):
+        progress("info", f"[{i + 1}/{len(paths)}] Membaca {path}...")
+        df_pusat, df_cabang = upload_cache.load_excel_sheets_cached(path, (0, 1), columns=columns, progress=progress)
+        if df_pusat is None or df_cabang is None:
+            progress("error", f"Lewati {path}: gagal dibaca")
+            return []
+        jobs = runner.prepare_jobs(df_pusat, df_cabang, branch_names, progress=progress)
+        if run_budget is not None:
+            for branch_name, df_all in jobs:
+                if (path, branch_name) in run_budget.labels: run_budget.set_rows((path, branch_name), len(df_all))
+        return jobs
+
+    def finish(i, idx, result):
+        if states[i].add(idx, result):
+            states[i].close()
+            progress("success", f"Selesai: {paths[i]} -> {states[i].output.path}")
+
+    names = output_names(paths, output_dir)
+    if solver_cache is None: solver_cache = runner.make_solver_cache()
+    # Seperti runner.run_branches, cabang selalu diproses di worker (juga untuk workers=1)
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=runner._init_branch_worker,
+                             initargs=(run_budget, solver_cache or None)) as pool:
+        pending = {}
+
+        def drain(timeout):
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, idx = pending.pop(fut)
+                finish(i, idx, fut.result())
+
+        for i, path in enumerate(paths):
+            jobs = load(i, path)
+            states[i] = _FileState(path, names[i], [b for b, _ in jobs], export)
+            if not jobs: states[i].close(); continue
+            for idx, (branch_name, df_all) in enumerate(jobs):
+                pending[pool.submit(runner.run_branch, branch_name, df_all, offset_window_days, None, None, recon,
+                                    depo_segments, (path, branch_name))] = (i, idx)
+            if pending: drain(0)
+        while pending:
+            drain(None)
+
+    summary = [row for i in sorted(states) for row in states[i].summary]
+    df_summary = pd.DataFrame(summary, columns=list(summarize_branch("", "", []).keys()))
+    df_summary.to_csv(os.path.join(output_dir, SUMMARY_FILE), index=False)
+    return df_summary
@@ -0,0 +1,174 @@
+# budget.py
+import math
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+import pandas as pd
+import subset_sum
+
+# Perkiraan awal porsi baris yang sampai ke tahap RECON (bobot cabang sebelum RECON-nya dimulai)
+ESTIMATED_RECON_SHARE = 0.1
+# Panggilan SCIP berturut-turut yang habis waktu tanpa grup sebelum tahap RECON berhenti (hanya jika ada batas total)
+PATIENCE = 2
+# Jatah di bawah ini tidak dipakai untuk memanggil SCIP
+MIN_SCIP_MS = 100
+
+_RUN = None       # RunBudget untuk proses ini (hanya diset di initializer worker, lihat runner._init_branch_worker)
+
+
+class RunBudget:
+    """
+    Anggaran waktu solver untuk satu run (semua cabang & segmen Depo), dibagi lintas proses
+    lewat shared memory multiprocessing.
+    - total_seconds: batas wall-clock seluruh run; None = tanpa batas (hanya pembatalan)
+    - tiap tahap RECON mendapat jatah = sisa waktu x paralelisme x bobot cabang / total bobot
+      cabang yang belum selesai; bobot = baris belum cocok (perkiraan sampai RECON-nya dimulai)
+    - berhenti dini: setelah PATIENCE panggilan SCIP habis waktu tanpa grup, sisa tahap dilewati
+    - cancel(): pembatalan kooperatif, SCIP berikutnya dilewati di semua proses
+    labels: satu slot per job; nama cabang, atau (file, cabang) di mode batch
+    """
+
+    def __init__(self, total_seconds, labels, rows, workers=1):
+        ctx = multiprocessing.get_context()
+        self.total_seconds = total_seconds
+        self.labels = list(labels)
+        self.workers = max(1, int(workers))
+        self.started = time.time()
+        self.deadline = self.started + total_seconds if total_seconds else math.inf
+        self.cancel_event = ctx.Event()
+        self.weights = ctx.Array('d', [float(r) * ESTIMATED_RECON_SHARE for r in rows])
+        self.allocated = ctx.Array('d', len(self.labels))
+        self.used = ctx.Array('d', len(self.labels))
+        self.calls = ctx.Array('i', len(self.labels))
+        self.skipped = ctx.Array('i', len(self.labels))
+
+    @property
+    def limited(self):
+        return self.deadline != math.inf
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def set_rows(self, label, rows):
+        # Ganti bobot awal cabang (mis. hanya baris pending ledger yang diproses)
+        slot = self.labels.index(label)
+        with self.weights.get_lock(): self.weights[slot] = float(rows) * ESTIMATED_RECON_SHARE
+
+    def branch(self, label):
+        return BranchBudget(self, self.labels.index(label))
+
+    def report(self):
+        # Pemakaian per cabang: jatah RECON yang diberikan vs detik solver yang terpakai
+        allocated = list(self.allocated)
+        per_file = {}
+        if self.labels and all(isinstance(label, tuple) for label in self.labels):
+            per_file = {"File": [os.path.basename(f) for f, _ in self.labels]}
+        return pd.DataFrame({
+            **per_file,
+            "Cabang": [label[-1] if isinstance(label, tuple) else label for label in self.labels],
+            "Jatah (detik)": [round(a, 1) if self.limited else None for a in allocated],
+            "Terpakai (detik)": [round(u, 1) for u in self.used],
+            "Panggilan SCIP": list(self.calls),
+            "SCIP Dilewati": list(self.skipped),
+        })
+
+
+class BranchBudget:
+    # Jatah satu cabang; dipasang ke subset_sum.TIME_BUDGET selama cabang diproses
+    def __init__(self, run, slot):
+        self.run = run
+        self.slot = slot
+        self.pending_rows = 0      # baris segmen Depo berikutnya (ikut bobot, belum dapat jatah)
+        self.stage_end = math.inf
+        self.misses = 0
+
+    def open_stage(self, unmatched):
+        """
+        Awal tahap RECON dengan `unmatched` baris. Return jatah (detik) tahap ini.
+        """
+        run, slot = self.run, self.slot
+        now = time.time()
+        weight = float(unmatched + self.pending_rows)
+        with run.weights.get_lock():
+            run.weights[slot] = weight
+            active = [w for w in run.weights if w > 0]
+        remaining = max(0.0, run.deadline - now)
+        if remaining == math.inf or not active:
+            share = remaining
+        else:
+            concurrency = min(run.workers, len(active))
+            share = min(remaining, remaining * concurrency * weight / sum(active))
+            share *= unmatched / weight if weight else 1.0
+        self.stage_end = now + share
+        self.misses = 0
+        if share != math.inf:
+            with run.allocated.get_lock(): run.allocated[slot] += share
+        return share
+
+    def scip_time_ms(self, requested_ms):
+        # Batas waktu untuk satu panggilan SCIP; 0 = lewati SCIP
+        run = self.run
+        if run.cancelled or (run.limited and self.misses >= PATIENCE):
+            limit = 0
+        else:
+            limit = min(float(requested_ms), (min(self.stage_end, run.deadline) - time.time()) * 1000)
+        if limit < MIN_SCIP_MS:
+            with run.skipped.get_lock(): run.skipped[self.slot] += 1
+            return 0
+        return int(limit)
+
+    @property
+    def full_limits(self):
+        # True jika batas per panggilan tidak pernah dipotong (tanpa batas total & tidak dibatalkan)
+        return not self.run.limited and not self.run.cancelled
+
+    def spent(self, seconds, gained=None):
+        # gained: True = grup ditemukan, False = habis waktu tanpa grup, None = netral (terbukti kosong)
+        run = self.run
+        with run.used.get_lock(): run.used[self.slot] += seconds
+        with run.calls.get_lock(): run.calls[self.slot] += 1
+        if gained is False: self.misses += 1
+        elif gained: self.misses = 0
+
+    def finish(self):
+        with self.run.weights.get_lock(): self.run.weights[self.slot] = 0.0
+
+
+def set_run(run):
+    global _RUN
+    _RUN = run
+
+
+@contextmanager
+def branch_scope(label):
+    # Pasang jatah cabang selama blok berjalan (tanpa RunBudget: tidak melakukan apa-apa)
+    if _RUN is None or label not in _RUN.labels:
+        yield None
+        return
+    previous = subset_sum.TIME_BUDGET
+    subset_sum.TIME_BUDGET = _RUN.branch(label)
+    try:
+        yield subset_sum.TIME_BUDGET
+    finally:
+        subset_sum.TIME_BUDGET.finish()
+        subset_sum.TIME_BUDGET = previous
+
+
+def install(branch_budget):
+    # Untuk worker turunan (mis. jendela paralel Depo): pakai slot jatah cabang induk tanpa menutupnya
+    if branch_budget is None: return
+    set_run(branch_budget.run)
+    subset_sum.TIME_BUDGET = BranchBudget(branch_budget.run, branch_budget.slot)
+
+
+def open_stage(unmatched):
+    return None if subset_sum.TIME_BUDGET is None else subset_sum.TIME_BUDGET.open_stage(unmatched)
+
+
+def set_pending(rows):
+    if subset_sum.TIME_BUDGET is not None: subset_sum.TIME_BUDGET.pending_rows = int(rows)
@@ -0,0 +1,184 @@
+# cli.py
+"""
+Jalankan rekonsiliasi tanpa Streamlit (batch / cron).
+
+Contoh:
+    python cli.py data.xlsx -o Output_RK.xlsx --branches all
+    python cli.py data.xlsx -o Output_RK.xlsx --branches AMBON,DEPO --workers 4 --solver-time-limit 3
+    python cli.py exports/ --output-dir hasil/          # batch: semua .xlsx di folder
+    python cli.py "2024-0*.xlsx" --output-dir hasil/     # batch: pola glob
+    python cli.py data.xlsx --time-budget 600            # total waktu solver 10 menit untuk semua cabang
+    python cli.py data.xlsx --metrics-json metrik.json --metrics-sheet --profile cprofile
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+import algo_depo
+import batch
+import ledger
+import metrics
+import reporting
+import runner
+import subset_sum
+import upload_cache
+import utils
+import writer
+
+
+def parse_branches(value):
+    # "all" = semua cabang di BRANCH_MAPPING; selain itu daftar dipisah koma
+    if value.strip().lower() == "all":
+        return list(runner.BRANCH_MAPPING)
+    branches = [b.strip().upper() for b in value.split(",") if b.strip()]
+    unknown = [b for b in branches if b not in runner.BRANCH_MAPPING]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Cabang tidak dikenal: {', '.join(unknown)}")
+    return branches
+
+
+def install_cancel(run_budget, progress):
+    # Ctrl+C pertama: solver berhenti, cabang diselesaikan dengan hasil sejauh ini; Ctrl+C kedua: keluar
+    def cancel(signum, frame):
+        progress("warning", "Dibatalkan: sisa solver dilewati, hasil sejauh ini tetap ditulis")
+        run_budget.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, cancel)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Auto RK: cocokkan Hutang/Piutang Afiliasi cabang tanpa UI.")
+    parser.add_argument("input", nargs="+",
+                        help="Workbook input (.xlsx) dengan 2 sheet (Pusat, Cabang); bisa beberapa file, folder atau pola glob")
+    parser.add_argument("-o", "--output", default="Output_RK.xlsx", help="Path workbook hasil (default: Output_RK.xlsx)")
+    parser.add_argument("--output-dir", default=None,
+                        help="Mode batch: folder hasil per file input + RINGKASAN_BATCH.csv (default: folder Output_RK)")
+    parser.add_argument("-b", "--branches", type=parse_branches, default="all",
+                        help='Daftar cabang dipisah koma, atau "all" (default)')
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Jumlah cabang yang diproses bersamaan")
+    parser.add_argument("--solver-time-limit", type=float, default=None,
+                        help=f"Batas waktu per panggilan solver RECON dalam detik (default {utils.RECON_TIME_LIMIT_MS / 1000:g})")
+    parser.add_argument("--recon-cluster-days", type=int, default=None,
+                        help="Pecah tahap RECON per jendela N hari agar paralel (default 0 = satu masalah global; "
+                             "grup lintas >2 jendela bisa tidak ditemukan)")
+    parser.add_argument("--recon-mode", choices=subset_sum.RECON_MODES, default="loop",
+                        help="loop: grup RECON satu per satu; joint: + satu model SCIP semua grup sekaligus "
+                             "(dipakai jika memasang lebih banyak baris, lebih lambat)")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Total waktu solver RECON seluruh run dalam detik, dibagi antar cabang (default tanpa batas)")
+    parser.add_argument("--offset-window-days", type=int, default=0, help="Toleransi tanggal OFFSET PAIR (hari)")
+    parser.add_argument("--depo-window-days", type=int, default=None,
+                        help="Lebar jendela segmen Depo dalam hari (7 = mingguan, 1 = per hari; default 3 segmen 1-10/11-20/>20)")
+    parser.add_argument("--depo-mode", choices=algo_depo.SEGMENT_MODES, default="rolling",
+                        help="rolling: segmen berurutan dengan carry over; parallel: tiap jendela paralel + pass akhir atas sisa")
+    parser.add_argument("--used-columns-only", action="store_true", help="Baca kolom yang dipakai saja")
+    parser.add_argument("--export", choices=writer.EXPORT_FORMATS, default=None,
+                        help="Export tambahan per cabang (zip) di samping workbook hasil")
+    parser.add_argument("--export-only", action="store_true", help="Tidak menulis workbook hasil, hanya export tambahan")
+    parser.add_argument("--ledger", default=None,
+                        help="File SQLite state rekonsiliasi: run berikutnya hanya memproses baris baru & GANTUNG terbuka")
+    parser.add_argument("--solver-cache", default=None,
+                        help="File SQLite cache hasil solver: residu nominal yang sama tidak diselesaikan ulang antar run")
+    parser.add_argument("--no-solver-cache", action="store_true", help="Matikan cache hasil solver (juga cache memori)")
+    parser.add_argument("--metrics-json", default=None, help="Tulis metrik per tahap (waktu, baris, RSS, solver) ke file JSON")
+    parser.add_argument("--metrics-sheet", action="store_true", help="Tambahkan sheet METRICS di workbook hasil")
+    parser.add_argument("--profile", choices=metrics.PROFILE_MODES, default=None,
+                        help="Profil per cabang: cprofile (<cabang>.prof) atau tracemalloc (<cabang>_tracemalloc.txt)")
+    parser.add_argument("--profile-dir", default="profil", help="Folder hasil --profile (default: profil)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Hanya tampilkan peringatan & error")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if isinstance(args.branches, str): args.branches = parse_branches(args.branches)
+    if args.depo_window_days is not None and args.depo_window_days < 1:
+        print("--depo-window-days minimal 1", file=sys.stderr)
+        return 2
+    if args.recon_cluster_days is not None and args.recon_cluster_days < 0:
+        print("--recon-cluster-days minimal 0", file=sys.stderr)
+        return 2
+    if args.time_budget is not None and args.time_budget <= 0:
+        print("--time-budget harus lebih dari 0", file=sys.stderr)
+        return 2
+    if args.export_only and not args.export:
+        print("--export-only membutuhkan --export", file=sys.stderr)
+        return 2
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    progress = reporting.log_progress
+    t0 = time.time()
+    columns = utils.USED_COLUMNS if args.used_columns_only else None
+    time_limit_ms = None if args.solver_time_limit is None else int(args.solver_time_limit * 1000)
+    depo_segments = (args.depo_window_days, args.depo_mode)
+    recon = runner.recon_options(time_limit_ms, args.recon_cluster_days, args.recon_mode)
+    solver_cache = runner.make_solver_cache(args.solver_cache, enabled=not args.no_solver_cache)
+
+    # Mode batch: lebih dari satu workbook, folder, atau --output-dir diisi
+    paths = batch.resolve_inputs(args.input)
+    if not paths:
+        print("Tidak ada workbook input yang ditemukan", file=sys.stderr)
+        return 1
+    if len(paths) > 1 or os.path.isdir(args.input[0]) or args.output_dir:
+        if args.export_only or args.ledger or args.metrics_json or args.metrics_sheet or args.profile:
+            print("--export-only / --ledger / --metrics-* / --profile tidak didukung di mode batch", file=sys.stderr)
+            return 2
+        run_budget = runner.make_batch_budget(paths, args.branches, args.time_budget, args.workers)
+        install_cancel(run_budget, progress)
+        df_summary = batch.run_batch(
+            paths, args.output_dir or "Output_RK", args.branches, workers=args.workers,
+            offset_window_days=args.offset_window_days, columns=columns, export=args.export,
+            recon=recon, progress=progress, depo_segments=depo_segments, run_budget=run_budget, solver_cache=solver_cache)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        if not args.quiet and not df_summary.empty: print(df_summary.to_string(index=False))
+        if not args.quiet: print(run_budget.report().to_string(index=False))
+        progress("info", f"Selesai {len(paths)} file dalam {time.time() - t0:.1f} detik")
+        return 0
+
+    run_metrics = metrics.RunMetrics(args.profile, args.profile_dir) \
+        if args.metrics_json or args.metrics_sheet or args.profile else None
+    progress("info", f"Membaca {paths[0]}...")
+    with metrics.phase(run_metrics, "BACA DATA"):
+        df_pusat_global, df_cabang_global = upload_cache.load_excel_sheets_cached(
+            paths[0], (0, 1), columns=columns, progress=progress)
+    if df_pusat_global is None or df_cabang_global is None:
+        return 1
+
+    with metrics.phase(run_metrics, "FILTER CABANG", len(df_pusat_global) + len(df_cabang_global)):
+        jobs = runner.prepare_jobs(df_pusat_global, df_cabang_global, args.branches, progress=progress)
+    progress("info", f"Memproses {len(jobs)} cabang...")
+
+    def report_progress(branch_name, done, total):
+        progress("info", f"Selesai: {branch_name} ({done}/{total})")
+
+    run_budget = runner.make_run_budget(jobs, args.time_budget, args.workers)
+    install_cancel(run_budget, progress)
+    state = ledger.Ledger(args.ledger) if args.ledger else None
+    output = None if args.export_only else writer.StreamingWorkbook(args.output)
+    bundle = writer.BundleExport(args.export, os.path.splitext(args.output)[0] + f"_{args.export}.zip") if args.export else None
+    for branch_name, results_list, sheet_label_suffix in runner.run_branches(
+            jobs, workers=args.workers, offset_window_days=args.offset_window_days,
+            on_complete=report_progress, progress=progress, recon=recon, ledger=state,
+            depo_segments=depo_segments, run_budget=run_budget, run_metrics=run_metrics, solver_cache=solver_cache):
+        with metrics.phase(run_metrics, "TULIS OUTPUT", sum(len(df) for _, df in results_list), branch_name):
+            if output: output.write_branch(branch_name, results_list, sheet_label_suffix)
+            if bundle: bundle.write_branch(branch_name, results_list, sheet_label_suffix)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    if state: state.close()
+    if not args.quiet: print(run_budget.report().to_string(index=False))
+    if run_metrics is not None:
+        if output and args.metrics_sheet: output.write_table("METRICS", run_metrics.frame())
+        if args.metrics_json:
+            run_metrics.to_json(args.metrics_json)
+            progress("success", f"Metrik: {args.metrics_json}")
+        if args.profile: progress("info", f"Profil per cabang: {args.profile_dir}")
+    if output: progress("success", f"Hasil: {output.close()}")
+    if bundle: progress("success", f"Export: {bundle.close()}")
+    progress("info", f"Selesai dalam {time.time() - t0:.1f} detik")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# conftest.py
+# Modul aplikasi ada di root repo (tanpa package); file ini membuat pytest menaruh root di sys.path
@@ -0,0 +1,50 @@
+# group_balance.py
+import numpy as np
+import pandas as pd
+
+
+class GroupBalance:
+    """
+    Kernel grup-seimbang: key difaktorkan sekali ke kode integer, jumlah per grup dihitung
+    dengan akumulator int64 (sen, jadi perbandingan eksak) dan diperbarui saat baris
+    dikeluarkan tanpa groupby ulang. Semua posisi relatif terhadap urutan keys.
+    Key kosong (NaN) tidak masuk grup mana pun, sama seperti groupby.
+    """
+
+    def __init__(self, keys, amounts, active=None):
+        self.codes, self.uniques = pd.factorize(keys)
+        self.amounts = {name: np.asarray(values, dtype=np.int64) for name, values in amounts.items()}
+        n = len(self.codes)
+        self.active = np.ones(n, dtype=bool) if active is None else np.array(active, dtype=bool)
+        self.sums = {name: self._group_sums(values, self.active) for name, values in self.amounts.items()}
+
+    def _group_sums(self, values, mask):
+        # Akumulasi int64 (bincount berbobot selalu float64, eksak hanya di bawah 2^53 sen)
+        mask = mask & (self.codes >= 0)
+        sums = np.zeros(len(self.uniques), dtype=np.int64)
+        np.add.at(sums, self.codes[mask], values[mask])
+        return sums
+
+    def subset_sums(self, mask):
+        # Jumlah per grup hanya untuk baris aktif yang mask-nya True
+        mask = self.active & np.asarray(mask, dtype=bool)
+        return {name: self._group_sums(values, mask) for name, values in self.amounts.items()}
+
+    def rows_in(self, groups, within=None):
+        """
+        Mask baris aktif yang grupnya True di groups (bool per grup).
+        within: batasi ke baris tertentu (bool per baris).
+        """
+        groups = np.append(np.asarray(groups, dtype=bool), False)   # kode -1 -> False
+        mask = self.active & groups[self.codes]
+        if within is not None: mask &= np.asarray(within, dtype=bool)
+        return mask
+
+    def remove(self, positions):
+        # Keluarkan baris & kurangi jumlah grupnya (tanpa menghitung ulang grup lain)
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        positions = positions[self.active[positions]]
+        self.active[positions] = False
+        positions = positions[self.codes[positions] >= 0]
+        for name, values in self.amounts.items():
+            np.subtract.at(self.sums[name], self.codes[positions], values[positions])
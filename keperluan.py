@@ -0,0 +1,141 @@
+# keperluan.py
+import re
+import numpy as np
+import pandas as pd
+
+# --- POLA KODE REFERENSI DI KOLOM KEPERLUAN ---
+REGEX_BKK_BKM_ID = r'(?:ID)?BK[KM]\s*[:\-]?\s*(\d+/\d{4})'
+REGEX_BKK_ID = r'(?:ID)?BKK\s*[:\-]?\s*(\d+/\d{4})'
+REGEX_BKM_ID = r'(?:ID)?BKM\s*[:\-]?\s*(\d+/\d{4})'
+REGEX_BKK_NO = r'\bNOBKK\s*:\s*([A-Z]{2}\.\d+/\d{2}/\d{4})\b'
+REGEX_BKM_NO = r'\bNOBKM\s*:\s*([A-Z]{2}\.\d+/\d{2}/\d{4})\b'
+REGEX_JURNAL = r'^((?:JM[UH]|[A-Z]{2}\.)\d\S*)'
+
+# Satu regex gabungan untuk semua ID & NO BKK/BKM. Match ID dan NO tidak pernah
+# tumpang tindih, jadi hasil finditer sama dengan extractall per pola.
+_TOKEN_RE = re.compile(
+    r'(?:ID)?BK(?P<id_kind>[KM])\s*[:\-]?\s*(?P<id>\d+/\d{4})'
+    r'|\bNOBK(?P<no_kind>[KM])\s*:\s*(?P<no>[A-Z]{2}\.\d+/\d{2}/\d{4})\b'
+)
+_JURNAL_RE = re.compile(REGEX_JURNAL)
+
+REFERENCE_KINDS = ("BKK_ID", "BKM_ID", "BKK_NO", "BKM_NO")
+
+# --- FLAG KATA KUNCI KEPERLUAN (bitmask) ---
+KW_NOTA = 1 << 0        # PEMBAYARAN ATAS NOTA
+KW_ATM = 1 << 1         # PENARIKAN DANA VIA ATM
+KW_MSA = 1 << 2         # MANDIRI SMART ACCOUNT
+KW_SA_PREFIX = 1 << 3   # diawali MANDIRI SMART ACCOUNT / PENARIKAN DANA VIA (tanpa beda huruf besar/kecil)
+KW_JMU_ASD = 1 << 4     # JMU ASD
+KW_JMU_ASK = 1 << 5     # JMU ASK
+KW_PENGOTOR = 1 << 6    # IDBKM | NOBKM | IDBKK | NOBKK | CABANG:  (Depo)
+KW_DPP = 1 << 7         # PEMBAYARAN DPP TUNAI | PEMBAYARAN DPP GIRO  (Depo)
+KW_LAWAN_RO = 1 << 8    # KODE LAWAN RO  (Depo)
+KW_LAWAN_RI = 1 << 9    # KODE LAWAN RI  (Depo)
+KW_GIRO_VA = 1 << 10    # PENERIMAAN GIRO DENGAN VA  (Depo)
+
+_KEYWORD_FLAGS = {
+    "PEMBAYARAN ATAS NOTA": KW_NOTA,
+    "PENARIKAN DANA VIA ATM": KW_ATM,
+    "MANDIRI SMART ACCOUNT": KW_MSA,
+    "JMU ASD": KW_JMU_ASD,
+    "JMU ASK": KW_JMU_ASK,
+    "IDBKM": KW_PENGOTOR, "NOBKM": KW_PENGOTOR, "IDBKK": KW_PENGOTOR, "NOBKK": KW_PENGOTOR, "CABANG:": KW_PENGOTOR,
+    "PEMBAYARAN DPP TUNAI": KW_DPP, "PEMBAYARAN DPP GIRO": KW_DPP,
+    "KODE LAWAN RO": KW_LAWAN_RO,
+    "KODE LAWAN RI": KW_LAWAN_RI,
+    "PENERIMAAN GIRO DENGAN VA": KW_GIRO_VA,
+}
+# Lookahead agar kata kunci yang tumpang tindih tetap terdeteksi semua (tidak ada
+# kata kunci yang merupakan awalan kata kunci lain, jadi satu posisi = satu kata kunci)
+_KEYWORD_RE = re.compile("(?=(" + "|".join(re.escape(k) for k in _KEYWORD_FLAGS) + "))")
+_SA_PREFIX_RE = re.compile(r"(?:MANDIRI SMART ACCOUNT|PENARIKAN DANA VIA)", re.IGNORECASE)
+
+
+def extract_reference_codes(keperluan):
+    """
+    Tokenisasi kolom Keperluan sekali jalan (per nilai unik).
+    Return dict:
+      'BKK_ID', 'BKM_ID', 'BKK_NO', 'BKM_NO' -> DataFrame kategori (kolom = layer 0..n,
+          sama seperti str.extractall(...)[0].unstack())
+      'BK_ID_FIRST' -> Series ID BKK/BKM pertama (sama seperti str.extract(REGEX_BKK_BKM_ID))
+      'JURNAL'      -> Series kode jurnal di awal teks (sama seperti str.extract(REGEX_JURNAL))
+    """
+    row_codes, uniques = pd.factorize(keperluan)
+    tokens = {kind: [] for kind in REFERENCE_KINDS}
+    first_id = []
+    jurnal = []
+    for text in uniques:
+        found = {kind: [] for kind in REFERENCE_KINDS}
+        first = np.nan
+        if isinstance(text, str):
+            for m in _TOKEN_RE.finditer(text):
+                if m.group('id') is not None:
+                    found['BK' + m.group('id_kind') + '_ID'].append(m.group('id'))
+                    if first is np.nan: first = m.group('id')
+                else:
+                    found['BK' + m.group('no_kind') + '_NO'].append(m.group('no'))
+            jm = _JURNAL_RE.match(text)
+            jurnal.append(jm.group(1) if jm else np.nan)
+        else:
+            jurnal.append(np.nan)
+        for kind in REFERENCE_KINDS:
+            tokens[kind].append(found[kind])
+        first_id.append(first)
+
+    codes = {kind: _layer_frame(tokens[kind], row_codes, keperluan.index) for kind in REFERENCE_KINDS}
+    codes['BK_ID_FIRST'] = _row_series(first_id, row_codes, keperluan.index)
+    codes['JURNAL'] = _row_series(jurnal, row_codes, keperluan.index)
+    return codes
+
+
+def classify_keperluan(keperluan):
+    """
+    Satu kali scan per nilai unik Keperluan -> Series bitmask KW_* (0 untuk non-teks).
+    Pengganti belasan str.contains terpisah di tiap tahap.
+    """
+    row_codes, uniques = pd.factorize(keperluan)
+    flags = np.zeros(len(uniques) + 1, dtype=np.uint16)
+    for u, text in enumerate(uniques):
+        if not isinstance(text, str): continue
+        bits = 0
+        for m in _KEYWORD_RE.finditer(text):
+            bits |= _KEYWORD_FLAGS[m.group(1)]
+        if _SA_PREFIX_RE.match(text):
+            bits |= KW_SA_PREFIX
+        flags[u] = bits
+    return pd.Series(flags[row_codes], index=keperluan.index)
+
+
+def has_flag(flags, bits, index):
+    # True jika baris punya salah satu flag di bits (Series boolean sejajar index)
+    return pd.Series((flags.reindex(index).values & bits) != 0, index=index)
+
+
+def reference_layers(codes, kind, index):
+    """
+    Layer kode untuk baris di index (hanya baris yang punya kode, hanya layer yang terisi).
+    Pengganti df["Keperluan"].str.extractall(REGEX_...)[0].unstack().
+    """
+    frame = codes[kind].reindex(index).dropna(how='all').dropna(axis=1, how='all')
+    return frame.astype(object)
+
+
+def lookup(codes, key, index):
+    # Nilai kode per baris sebagai object (NaN jika kosong)
+    return codes[key].reindex(index).astype(object)
+
+
+def _row_series(values_per_unique, row_codes, index):
+    arr = np.array(values_per_unique + [np.nan], dtype=object)
+    return pd.Series(arr[row_codes], index=index, dtype=object).astype('category')
+
+
+def _layer_frame(lists_per_unique, row_codes, index):
+    n_layers = max((len(x) for x in lists_per_unique), default=0)
+    arr = np.full((len(lists_per_unique) + 1, n_layers), np.nan, dtype=object)
+    for u, values in enumerate(lists_per_unique):
+        arr[u, :len(values)] = values
+    # row_codes -1 (Keperluan kosong) menunjuk ke baris NaN terakhir
+    rows = arr[row_codes]
+    return pd.DataFrame({layer: pd.Categorical(rows[:, layer]) for layer in range(n_layers)}, index=index)
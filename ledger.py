@@ -0,0 +1,224 @@
+# ledger.py
+import json
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+import money
+
+# Kolom internal berisi key identitas baris; ikut dibawa algoritma, dibuang sebelum ditulis
+LEDGER_KEY = "Ledger_Key"
+# Kolom identitas baris (yang ada saja dipakai) + nominal sen
+KEY_COLUMNS = ("ID Dokumen", "Nomor Dokumen", "Jenis Dokumen", "Sumber Dokumen", "Tanggal Kasir", "Tanggal",
+               "Keperluan", "Tempat Pembayaran", "Nama Kode", money.NET_CENTS)
+# Kategori berbasis kata kunci: tiap baris berdiri sendiri (bukan grup yang harus seimbang)
+ROW_LEVEL_CATEGORIES = {"NOTA", "PENARIKAN DANA", "MANDIRI SA", "DATA VA"}
+GANTUNG_PREFIX = "DATA GANTUNG"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    branch TEXT NOT NULL,
+    started REAL NOT NULL,
+    rows_total INTEGER NOT NULL,
+    rows_processed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger_rows (
+    branch TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    category TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    extra TEXT,
+    position INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (branch, row_key)
+);
+CREATE TABLE IF NOT EXISTS categories (
+    branch TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (branch, position)
+);
+CREATE TABLE IF NOT EXISTS category_dtypes (
+    branch TEXT NOT NULL,
+    title TEXT NOT NULL,
+    dtypes TEXT NOT NULL,
+    PRIMARY KEY (branch, title)
+);
+"""
+
+
+def row_keys(df):
+    """
+    Key identitas per baris: hash kolom identitas + nomor kemunculan (untuk baris kembar).
+    Stabil antar run selama isi baris tidak berubah; posisi baris di file tidak ikut.
+    """
+    cols = [c for c in KEY_COLUMNS if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[cols].astype(str), index=False).to_numpy()
+    occurrence = pd.Series(hashed).groupby(hashed).cumcount().to_numpy()
+    return [f"{h:016x}-{n}" for h, n in zip(hashed.tolist(), occurrence.tolist())]
+
+
+class BranchPlan:
+    # Hasil Ledger.plan untuk satu cabang
+    def __init__(self, branch_name, frame, pending_mask, carried):
+        self.branch_name = branch_name
+        self.frame = frame                    # semua baris input saat ini (+ LEDGER_KEY)
+        self.pending = frame[pending_mask]    # baris yang perlu diproses ulang
+        self.carried = carried                # {row_key: (status, category, group_id, extra, position)} yang dipakai apa adanya
+
+class Ledger:
+    """
+    State rekonsiliasi persisten (SQLite) per cabang: baris yang sudah cocok (kategori + grup)
+    dan baris GANTUNG, dengan key identitas baris (row_keys).
+    Run berikutnya hanya memproses baris baru + GANTUNG terbuka (+ grup yang anggotanya
+    hilang/berubah); baris cocok lama dipakai ulang. Jika tidak ada perubahan, cabang dilewati.
+    Semua akses DB di proses utama; worker hanya menerima frame pending.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def plan(self, branch_name, df_all):
+        frame = df_all.copy()
+        frame[LEDGER_KEY] = row_keys(frame)
+        prior = {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT row_key, status, category, group_id, extra, position FROM ledger_rows WHERE branch = ?", (branch_name,))}
+
+        keys = frame[LEDGER_KEY]
+        current = set(keys)
+        is_new = ~keys.isin(prior.keys())
+        # Grup cocok yang anggotanya hilang / berubah dibuka lagi
+        reopened = {prior[k][2] for k in prior.keys() - current if prior[k][0] == "matched"}
+        if not is_new.any() and not reopened and len(current) == len(prior):
+            return BranchPlan(branch_name, frame, np.zeros(len(frame), dtype=bool), prior)
+
+        status = keys.map(lambda k: prior[k][0] if k in prior else None)
+        group = keys.map(lambda k: prior[k][2] if k in prior else None)
+        pending = (is_new | (status == "gantung") | group.isin(reopened)).to_numpy()
+        carried = {k: prior[k] for k in keys[~pending]}
+        return BranchPlan(branch_name, frame, pending, carried)
+
+    def commit(self, plan, results_list):
+        """
+        Gabungkan hasil run (baris pending) dengan baris lama yang dipakai ulang, simpan ke
+        ledger, dan return results_list lengkap tanpa kolom LEDGER_KEY.
+        results_list kosong berarti cabang tidak diproses (tidak ada perubahan).
+        """
+        branch = plan.branch_name
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO runs (branch, started, rows_total, rows_processed) VALUES (?, ?, ?, ?)",
+                    (branch, time.time(), len(plan.frame), len(plan.pending)))
+        run_id = cur.lastrowid
+
+        if results_list:
+            titles = [title for title, _ in results_list]
+        else:
+            titles = [t for (t,) in cur.execute("SELECT title FROM categories WHERE branch = ? ORDER BY position", (branch,))]
+        # Tipe kolom hasil tahap per kategori (mis. tanggal jadi datetime di OFFSET PAIRS), untuk baris lama
+        dtypes = {t: json.loads(d) for t, d in cur.execute("SELECT title, dtypes FROM category_dtypes WHERE branch = ?", (branch,))}
+
+        # Baris lama dikelompokkan per kategori tersimpan
+        carried_rows = plan.frame[plan.frame[LEDGER_KEY].isin(plan.carried.keys())]
+        carried_cat = carried_rows[LEDGER_KEY].map(lambda k: plan.carried[k][1])
+        for cat in carried_cat.unique():
+            if cat not in titles: titles.append(cat)
+
+        new_results = dict(results_list)
+        entries = []
+        merged = []
+        for title in titles:
+            df_new = new_results.get(title)
+            # Baris lama sesuai urutan tersimpan, jadi run tanpa perubahan menghasilkan blok yang sama
+            old = carried_rows[(carried_cat == title).to_numpy()]
+            old = old.iloc[np.argsort([plan.carried[k][4] for k in old[LEDGER_KEY]], kind="stable")]
+            if df_new is not None and len(df_new):
+                status = "gantung" if title.startswith(GANTUNG_PREFIX) else "matched"
+                # Kolom turunan hasil tahap (mis. KODE di JURNAL MATCH) disimpan agar baris lama tetap sama
+                extra_cols = [c for c in df_new.columns if c not in plan.frame.columns and c != money.GROUP_KEY]
+                extras = df_new[extra_cols].astype(object).where(df_new[extra_cols].notna(), None).to_dict("records") \
+                    if extra_cols else [None] * len(df_new)
+                group_keys = df_new[money.GROUP_KEY] if money.GROUP_KEY in df_new.columns else [None] * len(df_new)
+                for key, extra, group_key in zip(df_new[LEDGER_KEY], extras, group_keys):
+                    group_id = _group_id(run_id, title, status, key, group_key)
+                    entries.append((branch, key, status, title, group_id, run_id,
+                                    json.dumps(extra, default=str) if extra else None, len(entries)))
+                dtypes[title] = _dtypes(df_new)
+                df = pd.concat([df_new, _restore_dtypes(_with_extra(old, plan.carried), dtypes[title])], ignore_index=True) \
+                    if len(old) else df_new
+            elif len(old):
+                df = _restore_dtypes(_with_extra(old, plan.carried), dtypes.get(title, {}))
+            else:
+                df = df_new if df_new is not None else plan.frame.iloc[0:0]
+            for key in old[LEDGER_KEY]:
+                entries.append((branch, key) + plan.carried[key][:3] + (run_id, plan.carried[key][3], len(entries)))
+            merged.append((title, df.drop(columns=[LEDGER_KEY, money.GROUP_KEY], errors="ignore")))
+
+        with self.conn:
+            cur.execute("DELETE FROM ledger_rows WHERE branch = ?", (branch,))
+            cur.executemany("INSERT INTO ledger_rows (branch, row_key, status, category, group_id, run_id, extra, position) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entries)
+            cur.execute("DELETE FROM categories WHERE branch = ?", (branch,))
+            cur.executemany("INSERT INTO categories (branch, position, title) VALUES (?, ?, ?)",
+                            [(branch, i, t) for i, t in enumerate(titles)])
+            cur.execute("DELETE FROM category_dtypes WHERE branch = ?", (branch,))
+            cur.executemany("INSERT INTO category_dtypes (branch, title, dtypes) VALUES (?, ?, ?)",
+                            [(branch, t, json.dumps(dtypes[t])) for t in titles if t in dtypes])
+        return merged
+
+    def reset(self, branch_name=None):
+        # Hapus state (satu cabang / semua); run berikutnya memproses ulang dari awal
+        where, args = ("WHERE branch = ?", (branch_name,)) if branch_name else ("", ())
+        with self.conn:
+            for table in ("ledger_rows", "categories", "category_dtypes", "runs"):
+                self.conn.execute(f"DELETE FROM {table} {where}", args)
+
+    def close(self):
+        self.conn.close()
+
+
+def _group_id(run_id, title, status, row_key, group_key):
+    """
+    Identitas grup satu baris: baris GANTUNG / kategori per baris = barisnya sendiri; kategori
+    grup = key grup dari tahap (Keperluan, KODE, Match_ID, kode referensi) per run & kategori.
+    Tahap tanpa key grup jatuh ke satu grup per kategori.
+    """
+    if title in ROW_LEVEL_CATEGORIES or status == "gantung":
+        return row_key
+    if group_key is None or group_key != group_key:
+        return f"{run_id}:{title}"
+    return f"{run_id}:{title}:{group_key}"
+
+
+def _with_extra(df, carried):
+    # Kembalikan kolom turunan yang tersimpan (kolom baru di kanan, seperti hasil tahap)
+    extras = [json.loads(carried[k][3]) if carried[k][3] else {} for k in df[LEDGER_KEY]]
+    if not any(extras):
+        return df
+    return pd.concat([df, pd.DataFrame(extras, index=df.index)], axis=1)
+
+
+def _dtypes(df):
+    # Tipe kolom hasil tahap, disimpan per kategori (kolom internal tidak ikut)
+    return {col: str(dtype) for col, dtype in df.dtypes.items() if col not in (LEDGER_KEY, money.GROUP_KEY)}
+
+
+def _restore_dtypes(df, dtypes):
+    """
+    Samakan tipe kolom baris lama dengan hasil tahap kategorinya, jadi run tanpa perubahan menulis
+    blok yang sama dengan run penuh (mis. tahap mengubah tanggal jadi datetime, kolom turunan dari JSON).
+    """
+    df = df.copy()
+    for col, dtype in dtypes.items():
+        if col not in df.columns or str(df[col].dtype) == dtype: continue
+        try:
+            if dtype.startswith("datetime64"):
+                df[col] = pd.to_datetime(df[col], dayfirst=True, errors='coerce').astype(dtype)
+            else:
+                df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return df
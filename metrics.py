@@ -0,0 +1,211 @@
+# metrics.py
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS tidak tersedia
+    resource = None
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+# Jumlah baris alokasi teratas di laporan tracemalloc
+TRACEMALLOC_TOP = 30
+# "Peak RSS Proses s/d Tahap": high-water mark RSS sejak proses mulai (bukan pemakaian tahap itu sendiri);
+# "Peak Tracemalloc Tahap": puncak alokasi Python selama tahap, hanya terisi dengan --profile tracemalloc
+COLUMNS = ("Cabang", "Segmen", "Tahap", "Detik", "Baris Masuk", "Baris Keluar", "Baris Sisa",
+           "Peak RSS Proses s/d Tahap (MB)", "Peak Tracemalloc Tahap (MB)", "Solver")
+
+# Penghitung kejadian solver di proses ini (jalur, status SCIP, iterasi); selalu aktif, murah
+SOLVER = Counter()
+_CURRENT = None   # BranchRecorder aktif di proses ini
+
+
+def peak_rss_mb():
+    # Peak resident set size proses ini sejak mulai (MB, tidak pernah turun); None jika platform tidak mendukung
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stage_peak_mb():
+    """
+    Puncak alokasi tracemalloc (MB) sejak panggilan sebelumnya, lalu puncak di-reset
+    agar tahap berikutnya diukur sendiri. None jika tracemalloc tidak aktif.
+    """
+    if not tracemalloc.is_tracing(): return None
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    return round(peak / 1e6, 1)
+
+
+def count(event, n=1):
+    SOLVER[event] += n
+
+
+class BranchRecorder:
+    """
+    Catatan per tahap satu cabang: tiap stage() menutup tahap sejak start()/stage() sebelumnya
+    dengan waktu, baris masuk/keluar/sisa, peak RSS proses, peak tracemalloc tahap dan
+    selisih penghitung SOLVER.
+    """
+
+    def __init__(self, branch_name):
+        self.branch_name = branch_name
+        self.segment = ""
+        self.stages = []
+        self._mark = None
+        self._created = (time.perf_counter(), Counter(SOLVER))
+        self.traced_peak = 0.0   # puncak tracemalloc terbesar semua tahap (stage_peak_mb me-reset puncak)
+
+    def start(self, rows):
+        self._peak()
+        self._mark = (time.perf_counter(), int(rows), Counter(SOLVER))
+
+    def _peak(self):
+        peak = stage_peak_mb()
+        if peak is not None: self.traced_peak = max(self.traced_peak, peak)
+        return peak
+
+    def stage(self, name, rows_left):
+        if self._mark is None: return
+        started, rows_in, solver_before = self._mark
+        now = time.perf_counter()
+        rows_left = int(rows_left)
+        self.stages.append(_row(self.branch_name, self.segment, name, now - started, rows_in, rows_in - rows_left,
+                                rows_left, SOLVER - solver_before, self._peak()))
+        self._mark = (now, rows_left, Counter(SOLVER))
+
+    def total(self, rows_in, rows_left):
+        # Baris TOTAL cabang: sejak recorder dibuat sampai sekarang
+        started, solver_before = self._created
+        traced = self.traced_peak if tracemalloc.is_tracing() else None
+        self.stages.append(_row(self.branch_name, "", "TOTAL", time.perf_counter() - started, rows_in,
+                                rows_in - rows_left, rows_left, SOLVER - solver_before, traced))
+
+
+@contextmanager
+def recording(branch_name, options=None):
+    """
+    Pasang BranchRecorder selama blok berjalan. options None = tidak mencatat (yield None);
+    selain itu (profile, profile_dir) seperti RunMetrics.options: profile "cprofile" menulis
+    <profile_dir>/<cabang>.prof, "tracemalloc" menulis <profile_dir>/<cabang>_tracemalloc.txt.
+    """
+    global _CURRENT
+    if options is None:
+        yield None
+        return
+    profile, profile_dir = options
+    previous, _CURRENT = _CURRENT, BranchRecorder(branch_name)
+    profiler = cProfile.Profile() if profile == "cprofile" else None
+    if profiler: profiler.enable()
+    if profile == "tracemalloc": tracemalloc.start()
+    try:
+        yield _CURRENT
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(_profile_path(profile_dir, branch_name, ".prof"))
+        if profile == "tracemalloc":
+            _write_tracemalloc(_profile_path(profile_dir, branch_name, "_tracemalloc.txt"), _CURRENT.traced_peak)
+            tracemalloc.stop()
+        _CURRENT = previous
+
+
+def start(rows):
+    if _CURRENT is not None: _CURRENT.start(rows)
+
+
+def stage(name, rows_left):
+    if _CURRENT is not None: _CURRENT.stage(name, rows_left)
+
+
+def set_segment(label):
+    if _CURRENT is not None: _CURRENT.segment = label
+
+
+def active():
+    return _CURRENT is not None
+
+
+def extend(stages):
+    # Tambahkan catatan dari proses lain (mis. worker jendela Depo) ke cabang aktif
+    if _CURRENT is not None: _CURRENT.stages.extend(stages)
+
+
+class RunMetrics:
+    """
+    Kumpulan metrik satu run di proses utama: tahap per cabang (dari worker) + fase
+    baca/tulis. frame() untuk sheet METRICS, to_json() untuk analisis di luar.
+    profile: None / "cprofile" / "tracemalloc" (per cabang, ditulis ke profile_dir).
+    """
+
+    def __init__(self, profile=None, profile_dir="."):
+        if profile is not None and profile not in PROFILE_MODES:
+            raise ValueError(f"Mode profil tidak dikenal: {profile}")
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.rows = []
+
+    @property
+    def options(self):
+        # Dikirim ke run_branch / worker (lihat recording)
+        return self.profile, self.profile_dir
+
+    def add(self, stages):
+        if stages: self.rows.extend(stages)
+
+    @contextmanager
+    def phase(self, name, rows=None, branch_name=""):
+        # Fase di proses utama (mis. baca / tulis workbook)
+        started = time.perf_counter()
+        solver_before = Counter(SOLVER)
+        yield
+        self.rows.append(_row(branch_name, "", name, time.perf_counter() - started, rows, None, None,
+                              SOLVER - solver_before))
+
+    def frame(self):
+        df = pd.DataFrame(self.rows, columns=list(COLUMNS))
+        df["Solver"] = df["Solver"].map(lambda s: " ".join(f"{k}={v}" for k, v in sorted(s.items())) if s else "")
+        return df
+
+    def to_json(self, path=None):
+        text = json.dumps({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": self.rows}, indent=2, default=str)
+        if path:
+            with open(path, "w", encoding="utf-8") as f: f.write(text)
+        return text
+
+
+def phase(run_metrics, name, rows=None, branch_name=""):
+    # RunMetrics.phase, atau tanpa pencatatan jika run_metrics None
+    return nullcontext() if run_metrics is None else run_metrics.phase(name, rows, branch_name)
+
+
+def _row(branch_name, segment, name, seconds, rows_in, rows_out, rows_left, solver, traced_peak=None):
+    return {"Cabang": branch_name, "Segmen": segment, "Tahap": name, "Detik": round(seconds, 4),
+            "Baris Masuk": rows_in, "Baris Keluar": rows_out, "Baris Sisa": rows_left,
+            "Peak RSS Proses s/d Tahap (MB)": peak_rss_mb(), "Peak Tracemalloc Tahap (MB)": traced_peak,
+            "Solver": dict(solver)}
+
+
+def _profile_path(profile_dir, branch_name, suffix):
+    os.makedirs(profile_dir, exist_ok=True)
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in branch_name)
+    return os.path.join(profile_dir, f"{safe}{suffix}")
+
+
+def _write_tracemalloc(path, stages_peak=0.0):
+    # Puncak per tahap sudah di-reset oleh stage_peak_mb; puncak cabang = terbesar dari semuanya
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    peak = max(peak, stages_peak * 1e6)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"current={current / 1e6:.1f} MB peak={peak / 1e6:.1f} MB\n")
+        for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+            f.write(f"{stat}\n")
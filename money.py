@@ -0,0 +1,52 @@
+# money.py
+import numpy as np
+
+# Kolom internal: Net dalam int64 sen. Semua penjumlahan/pencocokan nominal memakai
+# kolom ini (eksak, bisa di-hash); float Rupiah hanya dibuat lagi saat menulis Excel.
+NET_CENTS = "Net_Cents"
+# Kolom internal: identitas grup cocok per baris (Keperluan / KODE / Match_ID / komponen referensi),
+# dipakai ledger untuk membuka ulang satu grup saja; dibuang saat menulis
+GROUP_KEY = "Group_Key"
+
+
+def to_cents(values):
+    """
+    Konversi nilai Rupiah (float) ke int64 sen. NaN dianggap 0.
+    """
+    arr = np.nan_to_num(np.asarray(values, dtype=float), nan=0.0)
+    return np.rint(arr * 100).astype(np.int64)
+
+
+def add_net_cents(df):
+    # Dihitung sekali saat Debet/Kredit diparse (sen Debet - sen Kredit, tanpa selisih float)
+    if "Debet" in df.columns and "Kredit" in df.columns:
+        df[NET_CENTS] = to_cents(df["Debet"]) - to_cents(df["Kredit"])
+    elif "Net" in df.columns:
+        df[NET_CENTS] = to_cents(df["Net"])
+    return df
+
+
+def net_cents(df, net_col="Net"):
+    # Nominal sen per baris; pakai kolom internal jika ada, selain itu konversi dari net_col
+    if net_col == "Net" and NET_CENTS in df.columns:
+        return df[NET_CENTS].to_numpy(dtype=np.int64)
+    return to_cents(df[net_col])
+
+
+def tolerance_cents(tolerance):
+    return int(round(tolerance * 100))
+
+
+def for_output(df):
+    """
+    Frame siap tulis: Net dibentuk ulang dari sen (tepat 2 desimal), kolom internal dibuang.
+    """
+    if GROUP_KEY in df.columns:
+        df = df.drop(columns=[GROUP_KEY])
+    if NET_CENTS not in df.columns:
+        return df
+    cents = df[NET_CENTS].to_numpy(dtype=np.int64)
+    df = df.drop(columns=[NET_CENTS])
+    if "Net" in df.columns:
+        df["Net"] = cents / 100
+    return df
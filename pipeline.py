@@ -0,0 +1,80 @@
+# pipeline.py
+import numpy as np
+import pandas as pd
+import money
+
+
+class StagePipeline:
+    """
+    Satu frame dasar + penanda baris yang belum cocok (remaining).
+    Tiap tahap hanya mencatat posisi baris yang cocok; frame output dibuat sekali per tahap
+    lewat take(), tanpa menyalin ulang sisa data setiap kali ada baris yang dikeluarkan.
+    Index dasar RangeIndex, jadi label baris == posisi baris.
+    """
+
+    def __init__(self, df):
+        self.base = df.reset_index(drop=True)
+        if money.NET_CENTS not in self.base.columns or self.base[money.NET_CENTS].isna().any():
+            money.add_net_cents(self.base)
+        self.remaining = np.ones(len(self.base), dtype=bool)
+        self.extra = {}   # kolom tambahan (mis. KODE) yang ikut ke output, urut sesuai penambahan
+
+    @property
+    def index(self):
+        # Label baris yang belum cocok
+        return pd.RangeIndex(len(self.base))[self.remaining]
+
+    @property
+    def empty(self):
+        return not self.remaining.any()
+
+    @property
+    def columns(self):
+        return self.base.columns.append(pd.Index(list(self.extra)))
+
+    def column(self, name):
+        # Kolom untuk baris tersisa (Series, index = label baris)
+        idx = self.index
+        if name in self.extra:
+            return self.extra[name].loc[idx]
+        return self.base[name].take(idx)
+
+    def select(self, columns):
+        # Beberapa kolom saja untuk baris tersisa (DataFrame sempit untuk groupby)
+        return pd.DataFrame({col: self.column(col) for col in columns}, index=self.index)
+
+    def set_column(self, name, values):
+        """
+        Set kolom tambahan untuk baris tersisa (values sejajar self.index), sama seperti
+        df_subset[name] = values. Kolom ini ikut ke setiap output berikutnya sampai drop_column().
+        """
+        self.extra[name] = pd.DataFrame({name: values}, index=self.index)[name]
+
+    def drop_column(self, name):
+        self.extra.pop(name, None)
+
+    def frame(self, positions=None):
+        # Materialisasi baris (default: semua baris tersisa) + kolom tambahan aktif
+        if positions is None: positions = self.index
+        out = self.base.take(positions)
+        for name, col in self.extra.items():
+            out[name] = col.loc[positions]
+        return out
+
+    def peek(self, mask):
+        # Frame baris tersisa yang mask-nya True, tanpa mengeluarkannya
+        return self.frame(self.index[np.asarray(mask, dtype=bool)])
+
+    def take(self, mask):
+        """
+        Keluarkan baris tersisa yang mask-nya True (mask sejajar self.index).
+        Return frame baris tersebut.
+        """
+        positions = self.index[np.asarray(mask, dtype=bool)]
+        out = self.frame(positions)
+        self.remaining[positions] = False
+        return out
+
+    def discard(self, labels):
+        # Tandai baris sudah cocok tanpa membuat frame (output dibuat di tempat lain)
+        self.remaining[np.asarray(labels, dtype=np.int64)] = False
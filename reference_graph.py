@@ -0,0 +1,92 @@
+# reference_graph.py
+import numpy as np
+import pandas as pd
+import keperluan
+import money
+
+# Kolom dokumen tujuan per jenis kode referensi
+_DOC_COLUMNS = (("ID", "ID Dokumen"), ("NO", "Nomor Dokumen"))
+
+
+def match_voucher_references(pipe, codes, voucher, jenis=None, tolerance=1):
+    """
+    Pencocokan BKK/BKM (ID & NO) sebagai graf: baris dan dokumen adalah node,
+    referensi di Keperluan (semua layer) dan ID/Nomor Dokumen baris adalah edge.
+    Komponen terhubung (union-find) diterima jika total Net-nya dalam toleransi,
+    jadi rantai multi-referensi ikut tercocokkan dalam satu kali jalan.
+    Komponen yang tidak seimbang dicek ulang per dokumen (bintang: dokumen + perujuknya).
+    voucher: "BKK" / "BKM"; jenis: filter Jenis Dokumen untuk baris dokumen (None = semua).
+    Return frame baris yang cocok (sudah dikeluarkan dari pipe), dengan kolom money.GROUP_KEY
+    = kode referensi yang mewakili komponen / dokumen tempat baris itu cocok.
+    """
+    index = pipe.index
+    edge_rows, edge_keys = [], []
+    for suffix, doc_col in _DOC_COLUMNS:
+        layers = keperluan.reference_layers(codes, f"{voucher}_{suffix}", index)
+        if layers.empty: continue
+        refs = layers.stack()
+        edge_rows.append(refs.index.get_level_values(0).to_numpy(dtype=np.int64))
+        edge_keys.append((suffix + ":" + refs.astype(str)).to_numpy(dtype=object))
+
+        docs = pipe.column(doc_col)
+        if jenis is not None: docs = docs[pipe.column("Jenis Dokumen") == jenis]
+        docs = docs.dropna().astype(str)
+        docs = docs[docs.isin(set(refs.astype(str)))]
+        edge_rows.append(docs.index.to_numpy(dtype=np.int64))
+        edge_keys.append((suffix + ":" + docs).to_numpy(dtype=object))
+
+    matched = {}
+    if edge_rows:
+        matched = _match_edges(np.concatenate(edge_rows), np.concatenate(edge_keys), pipe.column(money.NET_CENTS),
+                               money.tolerance_cents(tolerance))
+    out = pipe.take(index.isin(list(matched)))
+    out[money.GROUP_KEY] = out.index.map(matched)
+    return out
+
+
+def _match_edges(edge_rows, edge_keys, net, tol_cents):
+    # Return {label baris: kode grup}; kode grup = kode referensi pertama komponen / dokumen bintang
+    rows, row_node = np.unique(edge_rows, return_inverse=True)
+    key_node, keys = pd.factorize(edge_keys)
+    n_rows = len(rows)
+    root = connected_components(n_rows + len(keys), row_node, key_node + n_rows)
+
+    row_root = root[:n_rows]
+    row_net = net.reindex(rows).to_numpy(dtype=np.int64)
+    comp_sum = pd.Series(row_net).groupby(row_root).transform('sum').to_numpy()
+    balanced = np.abs(comp_sum) <= tol_cents
+    comp_key = pd.Series(np.asarray(keys, dtype=object)).groupby(root[n_rows:]).first()
+    matched = dict(zip(rows[balanced].tolist(), comp_key.reindex(row_root[balanced]).tolist()))
+
+    # Komponen tidak seimbang dengan >1 dokumen: cek tiap dokumen sendiri (urut kemunculan)
+    comp_docs = pd.Series(root[n_rows:]).value_counts()
+    multi_doc = set(comp_docs[comp_docs > 1].index) - set(row_root[balanced].tolist())
+    if not multi_doc:
+        return matched
+    net_by_row = dict(zip(rows.tolist(), row_net.tolist()))
+    star_rows = pd.Series(edge_rows).groupby(key_node, sort=True).agg(lambda r: sorted(set(r)))
+    for k, members in star_rows.items():
+        if root[n_rows + k] not in multi_doc: continue
+        members = [r for r in members if r not in matched]
+        if members and abs(sum(net_by_row[r] for r in members)) <= tol_cents:
+            matched.update(dict.fromkeys(members, keys[k]))
+    return matched
+
+
+def connected_components(n, a, b):
+    """
+    Union-find sederhana (path halving). a, b: pasangan node yang terhubung.
+    Return array root komponen per node.
+    """
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v in zip(a.tolist(), b.tolist()):
+        ru, rv = find(u), find(v)
+        if ru != rv: parent[ru] = rv
+    return np.array([find(i) for i in range(n)], dtype=np.int64)
@@ -0,0 +1,63 @@
+# reporting.py
+import logging
+import queue
+
+# Callback progress: progress(level, message), level salah satu LEVELS.
+# Modul proses (utils, algo_depo, runner) hanya memanggil callback ini, jadi bisa jalan
+# tanpa Streamlit (CLI / batch); app.py memakai streamlit_progress.
+LEVELS = ("info", "write", "success", "warning", "error")
+
+logger = logging.getLogger("auto_rk")
+_LOG_LEVELS = {"info": logging.INFO, "write": logging.INFO, "success": logging.INFO,
+               "warning": logging.WARNING, "error": logging.ERROR}
+_FORWARD = None   # antrean pesan ke proses utama (diset initializer worker), None = langsung ke logging
+
+
+def log_progress(level, message):
+    # Default: ke logging (stderr di CLI, log worker di process pool), atau ke proses utama lewat antrean
+    if _FORWARD is not None:
+        _FORWARD.put((level, message))
+        return
+    logger.log(_LOG_LEVELS.get(level, logging.INFO), message)
+
+
+def forward_to(messages):
+    # Di worker: progress default dikirim ke antrean multiprocessing (lihat drain); None = logging
+    global _FORWARD
+    _FORWARD = messages
+
+
+def drain(messages, progress):
+    # Di proses utama: teruskan pesan worker yang sudah masuk antrean ke callback progress
+    while True:
+        try:
+            level, message = messages.get_nowait()
+        except queue.Empty:
+            return
+        progress(level, message)
+
+
+def streamlit_progress(level, message):
+    import streamlit as st
+    getattr(st, level if level in LEVELS else "write")(message)
+
+
+def resolve(progress):
+    return log_progress if progress is None else progress
+
+
+class ProgressLog:
+    """
+    Callback progress yang menyimpan pesan, untuk proses di thread latar (app.py): thread
+    tidak boleh memanggil Streamlit, jadi pesan ditampilkan ulang oleh script lewat replay().
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def __call__(self, level, message):
+        self.messages.append((level, message))
+
+    def replay(self, progress):
+        for level, message in list(self.messages):
+            progress(level, message)
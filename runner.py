@@ -0,0 +1,293 @@
+# runner.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import signal
+import numpy as np
+import pandas as pd
+import budget
+import metrics
+import money
+import solve_cache
+import subset_sum
+import algo_general
+import algo_depo
+import reporting
+
+# Selang cek antrean progress worker (detik)
+PROGRESS_POLL_SECONDS = 0.5
+# ==========================================
+# DEFINISI MAPPING CABANG
+# ==========================================
+BRANCH_MAPPING = {
+    "AMBON": "HUTANG/PIUTANG AFILIASI AMBON",
+    "BALIKPAPAN": "HUTANG/PIUTANG AFILIASI BPP",
+    "BANGKA": "HUTANG/PIUTANG AFILIASI BANGKA",
+    "BANJARMASIN": "HUTANG/PIUTANG AFILIASI BMS",
+    "BATAM": "HUTANG/PIUTANG AFILIASI BATAM",
+    "BATULICIN": "HUTANG/PIUTANG AFILIASI BTL",
+    "BAU - BAU": "HUTANG/PIUTANG AFILIASI BAU-BAU",
+    "BERAU": "HUTANG/PIUTANG AFILIASI BERAU",
+    "BIAK": "HUTANG/PIUTANG AFILIASI BIA",
+    "BINTUNI": "HUTANG/PIUTANG AFILIASI BINTUNI",
+    "BITUNG": "HUTANG/PIUTANG AFILIASI BITUNG",
+    "BUNGKU": "HUTANG/PIUTANG AFILIASI BUNGKU",
+    "DEPO": "HUTANG/PIUTANG AFILIASI DEPO",
+    "FAK - FAK": "HUTANG/PIUTANG AFILIASI FAK-FAK",
+    "GORONTALO": "HUTANG/PIUTANG AFILIASI GORONTALO",
+    "JAYAPURA": "HUTANG/PIUTANG AFILIASI JYP",
+    "KAIMANA": "HUTANG/PIUTANG AFILIASI KAIMANA",
+    "KENDARI": "HUTANG/PIUTANG AFILIASI KENDARI",
+    "KETAPANG": "HUTANG/PIUTANG AFILIASI KTG",
+    "LUWUK": "HUTANG/PIUTANG AFILIASI LUWUK",
+    "MAKASSAR": "HUTANG/PIUTANG AFILIASI MAKASSAR",
+    "MANOKWARI": "HUTANG/PIUTANG AFILIASI MRI",
+    "MEDAN": "HUTANG/PIUTANG AFILIASI MDN",
+    "MERAUKE": "HUTANG/PIUTANG AFILIASI MKE",
+    "NABIRE": "HUTANG/PIUTANG AFILIASI NABIRE",
+    "NUNUKAN": "HUTANG/PIUTANG AFILIASI NUNUKAN",
+    "PADANG": "HUTANG/PIUTANG AFILIASI PADANG",
+    "PALEMBANG": "HUTANG/PIUTANG AFILIASI PALEMBANG",
+    "PALU": "HUTANG/PIUTANG AFILIASI PALU",
+    "PEKANBARU": "HUTANG/PIUTANG AFILIASI PEKAN BARU",
+    "PONTIANAK": "HUTANG/PIUTANG AFILIASI PONTIANAK",
+    "SAMARINDA": "HUTANG/PIUTANG AFILIASI SMD",
+    "SAMPIT": "HUTANG/PIUTANG AFILIASI SAMPIT",
+    "SEMARANG": "HUTANG/PIUTANG AFILIASI SEMARANG",
+    "SERUI": "HUTANG/PIUTANG AFILIASI SERUI",
+    "SORONG": "HUTANG/PIUTANG AFILIASI SRG",
+    "TARAKAN": "HUTANG/PIUTANG AFILIASI TRK",
+    "TERNATE": "HUTANG/PIUTANG AFILIASI TERNATE",
+    "TIMIKA": "HUTANG/PIUTANG AFILIASI TIMIKA",
+    "TUAL": "HUTANG/PIUTANG AFILIASI TUAL"
+}
+
+
+def build_branch_index(df_pusat_global, df_cabang_global):
+    """
+    Normalisasi & grouping sekali untuk semua cabang.
+    Return dict {'pusat': {Nama Kode: posisi}, 'cabang': {TEMPAT UPPER: posisi}};
+    key bernilai None jika kolom filter tidak ada (semua baris dipakai).
+    """
+    index = {}
+    if "Nama Kode" in df_pusat_global.columns:
+        index['pusat'] = _group_positions(df_pusat_global["Nama Kode"])
+    else:
+        index['pusat'] = None
+    if "Tempat Pembayaran" in df_cabang_global.columns:
+        index['cabang'] = _group_positions(df_cabang_global["Tempat Pembayaran"].astype(str).str.upper())
+    else:
+        index['cabang'] = None
+    return index
+
+
+def _group_positions(keys):
+    codes, uniques = pd.factorize(keys)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(uniques)}
+
+
+def _take(df, positions_by_key, key):
+    if positions_by_key is None:
+        return df
+    return df.take(positions_by_key.get(key, np.empty(0, dtype=np.int64)))
+
+
+def prepare_branch_frame(df_pusat_global, df_cabang_global, branch_name, target_kode, branch_index=None):
+    """
+    Gabungkan data Pusat & Cabang untuk satu cabang + kolom Net.
+    branch_index (dari build_branch_index) dipakai agar tidak memfilter ulang data global.
+    Return None jika cabang tidak punya data. Jika Debet/Kredit tidak ada, kolom Net tidak dibuat.
+    """
+    if branch_index is None:
+        branch_index = build_branch_index(df_pusat_global, df_cabang_global)
+    df_pusat_filter = _take(df_pusat_global, branch_index['pusat'], target_kode)
+    df_cabang_filter = _take(df_cabang_global, branch_index['cabang'], branch_name)
+
+    if df_pusat_filter.empty and df_cabang_filter.empty:
+        return None
+
+    df_all = pd.concat([df_pusat_filter, df_cabang_filter])
+    df_all.reset_index(inplace=True, drop=False)
+
+    # --- CLEAN NUMBERS ---
+    for col in ['Debet', 'Kredit']:
+        if col in df_all.columns:
+            df_all[col] = pd.to_numeric(df_all[col], errors='coerce').fillna(0)
+    if "Debet" in df_all.columns and "Kredit" in df_all.columns:
+        df_all["Net"] = df_all["Debet"] - df_all["Kredit"]
+        money.add_net_cents(df_all)
+    return df_all
+
+
+def prepare_jobs(df_pusat_global, df_cabang_global, branch_names, progress=None):
+    """
+    Bangun list job (branch_name, df_all) untuk run_branches. Cabang tanpa data dilewati;
+    cabang tanpa kolom Net dilaporkan lewat progress lalu dilewati.
+    """
+    progress = reporting.resolve(progress)
+    branch_index = build_branch_index(df_pusat_global, df_cabang_global)
+    jobs = []
+    for branch_name in branch_names:
+        target_kode = BRANCH_MAPPING.get(branch_name, "")
+        df_all = prepare_branch_frame(df_pusat_global, df_cabang_global, branch_name, target_kode, branch_index)
+        if df_all is None:
+            continue
+        if "Net" not in df_all.columns:
+            progress("error", f"Kolom Net Error di {branch_name}")
+            continue
+        jobs.append((branch_name, df_all))
+    return jobs
+
+
+def run_branch(branch_name, df_all, offset_window_days=0, progress=None, instrument=None, recon=None, depo_segments=None,
+               budget_label=None):
+    """
+    Jalankan logika Depo / General untuk satu cabang.
+    progress: callback progress(level, message) (default: logging).
+    instrument: RunMetrics.options untuk mencatat metrik per tahap (None = tidak mencatat).
+    recon: opsi tahap RECON (dari recon_options), None = default utils.reconcile_global_no_group.
+    depo_segments: (window_days, mode) segmentasi Depo, None = default algo_depo.
+    budget_label: slot RunBudget job ini (default branch_name; mode batch: (file, cabang)).
+    Return (results_list, sheet_label_suffix, stages); frame kosong (ledger: tidak ada perubahan)
+    menghasilkan results_list kosong. stages = list catatan tahap (kosong jika tidak mencatat).
+    """
+    window_days, mode = depo_segments or (None, None)
+    suffix = algo_depo.segment_label(mode) if branch_name == "DEPO" else ""
+    if df_all.empty:
+        return [], suffix, []
+    # Jatah waktu solver cabang ini (jika run memakai budget.RunBudget)
+    with budget.branch_scope(budget_label or branch_name), metrics.recording(branch_name, instrument) as recorder:
+        if branch_name == "DEPO":
+            results_list = algo_depo.run_segmented_depo_logic(df_all, offset_window_days, progress, window_days=window_days,
+                                                              mode=mode, recon=recon)
+        else:
+            results_list = algo_general.process_branch_reconciliation(df_all, branch_name, offset_window_days, recon)
+        if recorder:
+            # Sisa cabang = semua blok GANTUNG
+            recorder.total(len(df_all), sum(len(df) for title, df in results_list if title.startswith("DATA GANTUNG")))
+    return results_list, suffix, recorder.stages if recorder else []
+
+
+def _init_branch_worker(run_budget=None, solver_cache=None, messages=None):
+    # Paralelisme sudah di level cabang; solver di dalam worker jalan 1 proses.
+    # State solver (cache, jatah waktu) hanya dipasang di worker, tidak di proses utama
+    subset_sum.DEFAULT_WORKERS = 1
+    subset_sum.CACHE = solver_cache
+    reporting.forward_to(messages)
+    if run_budget is not None:
+        # Ctrl+C ditangani proses utama (RunBudget.cancel), worker tidak ikut mati
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        budget.set_run(run_budget)
+
+
+def recon_options(time_limit_ms=None, cluster_days=None, mode=None):
+    # Argumen tambahan utils.reconcile_global_no_group; yang None memakai default di sana
+    options = {}
+    if time_limit_ms is not None: options["time_limit_ms"] = int(time_limit_ms)
+    if cluster_days is not None: options["cluster_days"] = int(cluster_days)
+    if mode is not None:
+        if mode not in subset_sum.RECON_MODES:
+            raise ValueError(f"Mode RECON tidak dikenal: {mode}")
+        options["mode"] = mode
+    return options
+
+
+def make_solver_cache(path=None, enabled=True):
+    """
+    Cache hasil solver untuk run_branches / batch.run_batch: memori saja (path None) atau
+    + file SQLite yang dipakai ulang antar run. enabled False = tanpa cache (return False).
+    """
+    return solve_cache.SolveCache(path) if enabled else False
+
+
+def run_branches(jobs, workers=None, offset_window_days=0, on_complete=None, progress=None, recon=None,
+                 ledger=None, depo_segments=None, run_budget=None, run_metrics=None, solver_cache=None):
+    """
+    Proses banyak cabang di process pool. jobs = list (branch_name, df_all).
+    Yield (branch_name, results_list, sheet_label_suffix) sesuai urutan jobs, segera
+    setelah cabang berikutnya dalam urutan selesai. on_complete(branch_name, selesai, total)
+    dipanggil setiap ada cabang yang selesai (urutan selesai bebas).
+    Cabang selalu diproses di worker pool (juga untuk 1 cabang / workers=1), jadi state solver per run
+    tidak pernah dipasang di proses utama (mis. server Streamlit yang dipakai beberapa sesi sekaligus).
+    progress: pesan worker diteruskan ke callback ini lewat antrean; None = worker menulis ke logging.
+    recon: opsi tahap RECON (dari recon_options).
+    ledger (ledger.Ledger): hanya baris baru / GANTUNG terbuka yang diproses, sisanya dari state run sebelumnya.
+    depo_segments: (window_days, mode) segmentasi Depo, lihat algo_depo.segment_masks.
+    run_budget (budget.RunBudget, dari make_run_budget): jatah waktu solver total & pembatalan.
+    run_metrics (metrics.RunMetrics): kumpulkan metrik per tahap tiap cabang.
+    solver_cache (dari make_solver_cache): None = cache memori per worker, False = tanpa cache.
+    """
+    if solver_cache is None: solver_cache = make_solver_cache()
+    if ledger is None:
+        yield from _run_branches(jobs, workers, offset_window_days, on_complete, progress, recon, depo_segments,
+                                 run_budget, run_metrics, solver_cache)
+        return
+    progress = reporting.resolve(progress)
+    plans = [ledger.plan(branch_name, ledger_frame(branch_name, df_all)) for branch_name, df_all in jobs]
+    for plan in plans:
+        progress("info", f"{plan.branch_name}: {len(plan.pending)} dari {len(plan.frame)} baris diproses ulang")
+        if run_budget is not None and plan.branch_name in run_budget.labels:
+            run_budget.set_rows(plan.branch_name, len(plan.pending))
+    pending_jobs = [(plan.branch_name, plan.pending) for plan in plans]
+    for i, (branch_name, results_list, suffix) in enumerate(_run_branches(
+            pending_jobs, workers, offset_window_days, on_complete, progress, recon, depo_segments, run_budget,
+            run_metrics, solver_cache)):
+        yield branch_name, ledger.commit(plans[i], results_list), suffix
+
+
+def ledger_frame(branch_name, df_all):
+    # Depo mengubah kolom tanggal jadi datetime; dilakukan sebelum key ledger agar baris lama & baru seragam
+    if branch_name == "DEPO":
+        date_col = algo_depo.segment_date_column(df_all)
+        if date_col: df_all[date_col] = pd.to_datetime(df_all[date_col], dayfirst=True, errors='coerce')
+    return df_all
+
+
+def make_run_budget(jobs, total_seconds=None, workers=None):
+    # Satu RunBudget untuk jobs (bobot awal = jumlah baris cabang); total_seconds None = tanpa batas
+    if workers is None: workers = os.cpu_count() or 1
+    return budget.RunBudget(total_seconds, [b for b, _ in jobs], [len(df) for _, df in jobs], min(workers, max(len(jobs), 1)))
+
+
+def make_batch_budget(paths, branch_names, total_seconds=None, workers=None):
+    # RunBudget mode batch: satu slot per (file, cabang), jadi cabang yang selesai di satu file tidak
+    # menutup jatah cabang yang sama di file lain; bobot diisi batch.run_batch saat tiap file selesai dibaca
+    if workers is None: workers = os.cpu_count() or 1
+    labels = [(path, branch_name) for path in paths for branch_name in branch_names]
+    return budget.RunBudget(total_seconds, labels, [0] * len(labels), workers)
+
+
+def _run_branches(jobs, workers, offset_window_days, on_complete, progress, recon, depo_segments, run_budget=None,
+                  run_metrics=None, solver_cache=False):
+    if workers is None: workers = os.cpu_count() or 1
+    total = len(jobs)
+    if not total: return
+    instrument = run_metrics.options if run_metrics is not None else None
+    messages = multiprocessing.get_context().Queue() if progress is not None else None
+
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, total)), initializer=_init_branch_worker,
+                             initargs=(run_budget, solver_cache or None, messages)) as pool:
+        futures = {pool.submit(run_branch, branch_name, df_all, offset_window_days, None, instrument, recon, depo_segments): i
+                   for i, (branch_name, df_all) in enumerate(jobs)}
+        pending = set(futures)
+        finished = {}
+        next_idx = 0
+        done_count = 0
+        while pending:
+            # Dengan antrean progress, tunggu sebentar-sebentar agar pesan worker tampil selama cabang berjalan
+            done, pending = wait(pending, timeout=PROGRESS_POLL_SECONDS if messages else None, return_when=FIRST_COMPLETED)
+            if messages is not None: reporting.drain(messages, progress)
+            for fut in done:
+                i = futures[fut]
+                finished[i] = fut.result()
+                done_count += 1
+                if on_complete: on_complete(jobs[i][0], done_count, total)
+            # Keluarkan hasil sesuai urutan asli begitu tersedia
+            while next_idx in finished:
+                results_list, suffix, stages = finished.pop(next_idx)
+                if run_metrics is not None: run_metrics.add(stages)
+                yield jobs[next_idx][0], results_list, suffix
+                next_idx += 1
+    if messages is not None: reporting.drain(messages, progress)
@@ -0,0 +1,126 @@
+# solve_cache.py
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Naikkan jika algoritma solver berubah, agar hasil lama di disk tidak dipakai lagi
+CACHE_VERSION = 1
+MEMORY_MAX_ENTRIES = 4096
+DISK_MAX_ENTRIES = 200_000
+# Eviction disk dicek setiap sekian kali simpan
+EVICT_EVERY = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solve_cache (
+    key TEXT PRIMARY KEY,
+    ranks BLOB NOT NULL,
+    proven INTEGER NOT NULL,
+    time_limit_ms INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+class SolveCache:
+    """
+    Cache hasil find_max_zero_sum_group per multiset nominal: key = hash vektor sen terurut
+    + toleransi. Grup disimpan sebagai peringkat pada urutan terurut (stable), jadi bisa
+    dipetakan ulang ke posisi baris input mana pun dengan multiset yang sama.
+    - memori: LRU per proses (memory_entries)
+    - disk (opsional, SQLite di path): dipakai bersama antar proses & antar run, LRU lewat last_used
+    Hasil SCIP yang belum terbukti optimal hanya dipakai ulang jika batas waktunya >= batas saat ini.
+    Cache bersifat best-effort: error SQLite (mis. terkunci) dianggap miss.
+    """
+
+    def __init__(self, path=None, max_entries=DISK_MAX_ENTRIES, memory_entries=MEMORY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._puts = 0
+
+    def __getstate__(self):
+        # Dikirim ke worker sebagai konfigurasi saja (tanpa isi memori & koneksi)
+        return {"path": self.path, "max_entries": self.max_entries, "memory_entries": self.memory_entries}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def canonical(self, cents, tol):
+        # Return (key, order): order = posisi input urut nominal (stable)
+        order = np.argsort(cents, kind="stable")
+        digest = hashlib.blake2b(f"v{CACHE_VERSION}:{int(tol)}:".encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(cents[order], dtype=np.int64).tobytes())
+        return digest.hexdigest(), order
+
+    def get(self, key, order, time_limit_ms):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+        elif self.path:
+            entry = self._disk_get(key)
+            if entry is not None: self._remember(key, entry)
+        if entry is None or not (entry[1] or entry[2] >= time_limit_ms):
+            self.misses += 1
+            return None
+        self.hits += 1
+        ranks, proven, _ = entry
+        return np.sort(order[ranks]).tolist(), proven
+
+    def put(self, key, order, group, proven, time_limit_ms):
+        ranks = np.empty(len(order), dtype=np.int32)
+        ranks[order] = np.arange(len(order), dtype=np.int32)
+        entry = (np.sort(ranks[np.asarray(group, dtype=np.int64)]), bool(proven), int(time_limit_ms))
+        self._remember(key, entry)
+        if self.path: self._disk_put(key, entry)
+
+    def clear(self):
+        self.memory.clear()
+        if self.path:
+            conn = self._connection()
+            with conn: conn.execute("DELETE FROM solve_cache")
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _connection(self):
+        # Koneksi per proses (worker hasil fork tidak memakai koneksi induk)
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _disk_get(self, key):
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT ranks, proven, time_limit_ms FROM solve_cache WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            with conn: conn.execute("UPDATE solve_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            return None
+        return np.frombuffer(row[0], dtype=np.int32), bool(row[1]), row[2]
+
+    def _disk_put(self, key, entry):
+        ranks, proven, time_limit_ms = entry
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO solve_cache (key, ranks, proven, time_limit_ms, last_used) "
+                             "VALUES (?, ?, ?, ?, ?)", (key, ranks.astype(np.int32).tobytes(), int(proven), time_limit_ms, time.time()))
+                self._puts += 1
+                if self._puts % EVICT_EVERY == 0:
+                    conn.execute("DELETE FROM solve_cache WHERE key IN "
+                                 "(SELECT key FROM solve_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,558 @@
+# subset_sum.py
+import bisect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ortools.linear_solver import pywraplp
+import metrics
+import money
+import solve_cache
+
+# Batas jalur exact sebelum jatuh ke SCIP
+MITM_MAX_ITEMS = 36          # meet-in-the-middle: 2 x 2^18 subset
+DP_MAX_CELLS = 20_000_000    # DP per-nilai-sum: jumlah_item x lebar_rentang_sum
+# Tahap triple _greedy_seed memeriksa n^2/2 pasangan; di atas batas ini hanya pasangan
+SEED_TRIPLE_MAX_ITEMS = 500
+
+# Dekomposisi tahap RECON
+# Lebar jendela tanggal per cluster; 0 = satu masalah global (default). Jendela tanggal bukan
+# sub-masalah independen: dengan cluster, grup yang melintasi >2 jendela atau butuh SCIP bisa hilang
+CLUSTER_DAYS = 0
+DEFAULT_WORKERS = None       # None = os.cpu_count(); diset 1 di dalam worker cabang
+# Jatah waktu SCIP aktif (budget.BranchBudget) atau None = hanya batas per panggilan
+TIME_BUDGET = None
+# Cache hasil per multiset nominal (solve_cache.SolveCache) atau None = selalu hitung ulang
+CACHE = solve_cache.SolveCache()
+
+# Mode pencarian grup per cluster: "loop" = grup satu per satu, "joint" = loop + satu model
+# semua grup disjoint sekaligus (dengan hasil loop sebagai solusi awal)
+RECON_MODES = ("loop", "joint")
+JOINT_MAX_GROUPS = 12        # jumlah slot grup K dalam satu model (minimal sebanyak grup hasil loop)
+JOINT_MAX_VARS = 4000        # batas jumlah_baris x K; lebih dari ini hanya hasil loop
+
+# Nama status SCIP untuk penghitung metrics.SOLVER
+_STATUS_NAMES = {pywraplp.Solver.OPTIMAL: "optimal", pywraplp.Solver.FEASIBLE: "feasible",
+                 pywraplp.Solver.INFEASIBLE: "infeasible", pywraplp.Solver.NOT_SOLVED: "not_solved"}
+
+
+# Konversi sen ada di money; tetap tersedia sebagai subset_sum.to_cents
+to_cents = money.to_cents
+
+
+def find_max_zero_sum_group(cents, tol_cents=100, time_limit_ms=7000, with_proof=False):
+    """
+    Cari grup dengan jumlah anggota terbanyak (minimal 2) yang |sum| <= tol_cents.
+    Input int64 sen, output list posisi (urut naik). List kosong jika tidak ada.
+    with_proof=True: return (grup, proven); proven False jika hasil dari SCIP yang
+    berhenti karena batas waktu (bukan optimal terbukti).
+    time_limit_ms=0: hanya jalur exact; jika butuh SCIP, return kosong (tidak terbukti).
+
+    Urutan jalur: cache -> cek infeasible (bound/tanda/gcd) -> cek cepat buang 0/1/2 item
+    -> meet-in-the-middle -> DP -> SCIP (last resort).
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    tol = int(tol_cents)
+    if len(cents) < 2:
+        return ([], True) if with_proof else []
+
+    cache = CACHE
+    cached = None
+    if cache is not None:
+        key, order = cache.canonical(cents, tol)
+        cached = cache.get(key, order, time_limit_ms)
+    if cached is not None:
+        group, proven = cached
+        metrics.count("cache_hit")
+    else:
+        group, proven = _find_max_group(cents, tol, time_limit_ms)
+        # Hasil SCIP yang dipotong jatah waktu / dibatalkan tidak disimpan
+        if cache is not None and (proven or TIME_BUDGET is None or TIME_BUDGET.full_limits):
+            cache.put(key, order, group, proven, time_limit_ms)
+    return (group, proven) if with_proof else group
+
+
+def _find_max_group(cents, tol, time_limit_ms):
+    # Nilai nol selalu bisa ikut grup mana pun tanpa mengubah sum
+    zero_pos = np.flatnonzero(cents == 0)
+    rest_pos = _prune_by_bounds(cents, np.flatnonzero(cents != 0), tol)
+
+    selected = []
+    proven = True
+    if len(rest_pos) > 0:
+        vals = cents[rest_pos]
+        # Residu modular: semua sum kelipatan gcd, jadi skala turun tanpa mengubah solusi
+        g = int(np.gcd.reduce(np.abs(vals)))
+        if g > 1:
+            vals = vals // g
+            tol_scaled = tol // g
+        else:
+            tol_scaled = tol
+        local, proven = _solve_reduced(vals, tol_scaled, time_limit_ms)
+        selected = rest_pos[local].tolist()
+
+    group = sorted(selected + zero_pos.tolist()) if len(selected) + len(zero_pos) >= 2 else []
+    return group, proven
+
+
+def solve_group_loop(cents, tol_cents=100, time_limit_ms=5000, settled=None, with_proof=False):
+    """
+    Ambil grup seimbang satu per satu (grup terbesar dulu) sampai tidak ada lagi.
+    Return list array posisi, urut sesuai urutan ditemukan.
+    settled: mask baris yang sudah terbukti (bersama-sama) tidak punya grup seimbang; jika
+    sisa seluruhnya settled, loop berhenti tanpa memanggil solver (hasilnya pasti kosong).
+    with_proof=True: return (groups, proven), proven = sisa akhir terbukti tanpa grup.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    remaining = np.arange(len(cents))
+    groups = []
+    proven = True
+    while len(remaining) >= 2:
+        if settled is not None and settled[remaining].all(): break
+        local, proven = find_max_zero_sum_group(cents[remaining], tol_cents, time_limit_ms, with_proof=True)
+        if not local: break
+        groups.append(remaining[local])
+        remaining = np.delete(remaining, local)
+    return (groups, proven) if with_proof else groups
+
+
+def solve_groups(cents, tol_cents=100, time_limit_ms=5000, mode="loop", settled=None, with_proof=False):
+    """
+    mode="loop": grup satu per satu (solve_group_loop).
+    mode="joint": hasil loop dijadikan solusi awal satu model SCIP yang membagi semua baris ke
+    grup disjoint sekaligus (solve_joint_groups). Hasil joint dipakai hanya jika memasang lebih
+    banyak baris (dengan toleransi > 0, gabungan grup kecil bisa lebih banyak dari grup terbesar
+    dulu); selain itu, atau jika model terlalu besar / tanpa jatah SCIP, hasil loop apa adanya.
+    settled / with_proof: lihat solve_group_loop.
+    """
+    if mode not in RECON_MODES:
+        raise ValueError(f"Mode RECON tidak dikenal: {mode}")
+    cents = np.asarray(cents, dtype=np.int64)
+    groups, proven = solve_group_loop(cents, tol_cents, time_limit_ms, settled, with_proof=True)
+    # Toleransi 0: gabungan grup disjoint juga seimbang, jadi grup terbesar dulu sudah optimal
+    if mode == "joint" and time_limit_ms and tol_cents > 0 and sum(len(g) for g in groups) < len(cents) - 1:
+        joint = solve_joint_groups(cents, tol_cents, time_limit_ms, hint=groups)
+        if joint is not None and sum(len(g) for g in joint) > sum(len(g) for g in groups):
+            metrics.count("joint_better")
+            groups = joint
+            # Sisa setelah model joint diteruskan ke loop (grup tambahan + bukti sisa tanpa grup)
+            used = np.zeros(len(cents), dtype=bool)
+            for g in groups: used[g] = True
+            leftover = np.flatnonzero(~used)
+            rest, proven = solve_group_loop(cents[leftover], tol_cents, time_limit_ms,
+                                            None if settled is None else settled[leftover], with_proof=True)
+            groups += [leftover[local] for local in rest]
+    return (groups, proven) if with_proof else groups
+
+
+def solve_joint_groups(cents, tol_cents=100, time_limit_ms=5000, hint=None, max_groups=JOINT_MAX_GROUPS):
+    """
+    Satu model SCIP yang membagi baris ke K grup disjoint, tiap grup |sum| <= tol_cents
+    dan minimal 2 baris, dengan total baris terpasang maksimum.
+    hint: list array posisi (mis. hasil solve_group_loop) sebagai solusi awal.
+    Return list array posisi (grup terbesar dulu), atau None jika model terlalu besar / gagal.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    hint = sorted(hint or [], key=len, reverse=True)
+    nonzero = np.flatnonzero(cents != 0)
+    candidates = np.sort(np.concatenate([np.flatnonzero(cents == 0), _prune_by_bounds(cents, nonzero, tol_cents)]))
+    n = len(candidates)
+    if n < 2: return []
+    k_slots = min(max(max_groups, len(hint)), n // 2)
+    if n * k_slots > JOINT_MAX_VARS or len(hint) > k_slots: return None
+    if TIME_BUDGET is not None:
+        time_limit_ms = TIME_BUDGET.scip_time_ms(time_limit_ms)
+        if not time_limit_ms:
+            metrics.count("joint_skipped")
+            return None
+
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    if not solver: return None
+    if TIME_BUDGET is not None: solver.SetSolverSpecificParametersAsString("misc/catchctrlc = FALSE\n")
+    vals = cents[candidates].tolist()
+    y = [[solver.IntVar(0, 1, f'y_{i}_{k}') for k in range(k_slots)] for i in range(n)]
+    z = [solver.IntVar(0, 1, f'z_{k}') for k in range(k_slots)]
+    for i in range(n):
+        solver.Add(sum(y[i]) <= 1)
+    sizes = []
+    for k in range(k_slots):
+        col = [y[i][k] for i in range(n)]
+        balance = solver.RowConstraint(-tol_cents, tol_cents, f'sum_{k}')
+        for i in range(n): balance.SetCoefficient(col[i], float(vals[i]))
+        size = sum(col)
+        solver.Add(size >= 2 * z[k])
+        solver.Add(size <= n * z[k])
+        sizes.append(size)
+    # Pecah simetri: slot diurutkan dari grup terbesar
+    for k in range(k_slots - 1):
+        solver.Add(sizes[k] >= sizes[k + 1])
+    solver.Maximize(sum(sizes))
+    if hint:
+        slot_of = {int(p): k for k, g in enumerate(hint) for p in g}
+        hint_vars, hint_vals = [], []
+        for i, p in enumerate(candidates.tolist()):
+            for k in range(k_slots):
+                hint_vars.append(y[i][k])
+                hint_vals.append(1.0 if slot_of.get(p) == k else 0.0)
+        hint_vars += z
+        hint_vals += [1.0 if k < len(hint) else 0.0 for k in range(k_slots)]
+        solver.SetHint(hint_vars, hint_vals)
+    solver.SetTimeLimit(int(time_limit_ms))
+    started = time.perf_counter()
+    status = solver.Solve()
+    metrics.count(f"joint_{_STATUS_NAMES.get(status, 'other')}")
+    metrics.count("scip_iterations", solver.iterations())
+    if TIME_BUDGET is not None:
+        TIME_BUDGET.spent(time.perf_counter() - started, None if status == pywraplp.Solver.OPTIMAL else status == pywraplp.Solver.FEASIBLE)
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        return None
+
+    groups = []
+    for k in range(k_slots):
+        members = [i for i in range(n) if y[i][k].solution_value() > 0.5]
+        if len(members) >= 2:
+            groups.append(candidates[members])
+    groups.sort(key=lambda g: (-len(g), int(g[0])))
+    return groups
+
+
+def solve_clustered(cents, keys, tol_cents=100, time_limit_ms=5000, workers=None, mode="loop", settled=None,
+                    with_proof=False):
+    """
+    Pecah baris per cluster (mis. jendela tanggal), selesaikan tiap cluster secara paralel
+    di process pool, lalu pass lintas-cluster atas sisa semua jendela (dan, jika sisa itu terlalu
+    besar, atas sisa tiap dua jendela bersebelahan), hanya lewat jalur exact tanpa SCIP.
+    Grup lintas jendela yang hanya bisa ditemukan SCIP tidak dicari.
+    Urutan grup deterministik: urut key cluster, lalu urutan ditemukan, lalu pass lintas-cluster.
+    mode: pencarian grup per cluster, lihat solve_groups.
+    settled: mask baris yang sudah terbukti tanpa grup (mis. sisa RECON segmen sebelumnya);
+    cluster / sisa yang seluruhnya settled tidak diselesaikan ulang.
+    with_proof=True: return (groups, proven), proven = semua baris sisa terbukti tanpa grup.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    keys = np.asarray(keys)
+    if settled is not None: settled = np.asarray(settled, dtype=bool)
+    if workers is None: workers = DEFAULT_WORKERS or os.cpu_count() or 1
+
+    clusters = [np.flatnonzero(keys == k) for k in np.unique(keys)]
+    clusters = [c for c in clusters if len(c) >= 2]
+
+    # Cluster kecil / yang habis oleh bound-pruning cukup di proses ini
+    def part(c):
+        return None if settled is None else settled[c]
+
+    heavy = [i for i, c in enumerate(clusters)
+             if len(_prune_by_bounds(cents, c[cents[c] != 0], tol_cents)) > MITM_MAX_ITEMS
+             and (settled is None or not settled[c].all())]
+    results = {}
+    proven = True
+    # Dengan jatah waktu aktif, cluster di pool memakai sisa jatah saat ini sebagai batas per panggilan
+    pool_limit_ms = time_limit_ms
+    if TIME_BUDGET is not None and workers > 1 and len(heavy) > 1:
+        pool_limit_ms = TIME_BUDGET.scip_time_ms(time_limit_ms)
+    if workers > 1 and len(heavy) > 1 and pool_limit_ms:
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=min(workers, len(heavy)), initializer=_init_cluster_worker,
+                                 initargs=(CACHE,)) as pool:
+            futures = {i: pool.submit(solve_groups, cents[clusters[i]], tol_cents, pool_limit_ms, mode, part(clusters[i]), True)
+                       for i in heavy}
+            for i, fut in futures.items():
+                results[i], cluster_proven = fut.result()
+                proven = proven and cluster_proven
+        if TIME_BUDGET is not None:
+            TIME_BUDGET.spent(time.perf_counter() - started, any(len(results[i]) for i in heavy) or None)
+    for i, c in enumerate(clusters):
+        if i not in results:
+            results[i], cluster_proven = solve_groups(cents[c], tol_cents, time_limit_ms, mode, part(c), with_proof=True)
+            proven = proven and cluster_proven
+
+    groups = []
+    matched = np.zeros(len(cents), dtype=bool)
+    for i, c in enumerate(clusters):
+        for local in results[i]:
+            groups.append(c[local])
+            matched[c[local]] = True
+
+    # Grup lintas cluster hanya lewat jalur exact (batas 0, tanpa SCIP): tidak ada lagi panggilan
+    # SCIP besar yang gagal atas sisa semua cluster. Pass atas sisa semua jendela dulu; jika sisanya
+    # terlalu besar untuk exact, dilanjutkan per pasangan jendela bersebelahan.
+    if len(np.unique(keys[~matched])) > 1:
+        leftover = np.flatnonzero(~matched)
+        cross, proven = solve_group_loop(cents[leftover], tol_cents, 0, part(leftover), with_proof=True)
+        for local in cross:
+            groups.append(leftover[local])
+            matched[leftover[local]] = True
+        if not proven:
+            window_keys = np.unique(keys)
+            for a, b in zip(window_keys[:-1], window_keys[1:]):
+                if b - a != 1: continue
+                in_a, in_b = ~matched & (keys == a), ~matched & (keys == b)
+                if not in_a.any() or not in_b.any(): continue
+                leftover = np.flatnonzero(in_a | in_b)
+                cross, _ = solve_group_loop(cents[leftover], tol_cents, 0, part(leftover), with_proof=True)
+                for local in cross:
+                    groups.append(leftover[local])
+                    matched[leftover[local]] = True
+    return (groups, proven) if with_proof else groups
+
+
+def _init_cluster_worker(cache):
+    global CACHE
+    CACHE = cache
+
+
+def _prune_by_bounds(cents, positions, tol):
+    """
+    Buang item yang mustahil masuk grup seimbang: nilai positif yang lebih besar dari
+    total semua nilai negatif (+ toleransi), dan sebaliknya. Diulang sampai stabil.
+    """
+    while len(positions) > 0:
+        vals = cents[positions]
+        pos_sum = int(vals[vals > 0].sum())
+        neg_sum = int(-vals[vals < 0].sum())
+        keep = ((vals > 0) & (vals <= neg_sum + tol)) | ((vals < 0) & (-vals <= pos_sum + tol))
+        if keep.all():
+            break
+        positions = positions[keep]
+    return positions
+
+
+def _solve_reduced(vals, tol, time_limit_ms):
+    """
+    Subset dengan kardinalitas maksimum dan |sum| <= tol (boleh kosong/1 item).
+    Return (array posisi lokal, proven); jalur exact selalu proven.
+    """
+    n = len(vals)
+    removal = _small_removal(vals, tol)
+    if removal is not None:
+        metrics.count("small_removal")
+        return np.setdiff1d(np.arange(n), removal), True
+    if n <= MITM_MAX_ITEMS:
+        metrics.count("mitm")
+        return _solve_mitm(vals, tol), True
+    width = int(vals[vals > 0].sum() - vals[vals < 0].sum()) + 1
+    if n * width <= DP_MAX_CELLS:
+        metrics.count("dp")
+        return _solve_dp(vals, tol), True
+    if not time_limit_ms:
+        return np.array([], dtype=np.int64), False
+    return _solve_scip(vals, tol, time_limit_ms, hint=_greedy_seed(vals, tol))
+
+
+def _small_removal(vals, tol):
+    """
+    Jalur cepat untuk data yang hampir seimbang: cari himpunan 0, 1 atau 2 item yang
+    jika dibuang membuat sisa data seimbang. Karena dicek berurutan, hasilnya optimal.
+    """
+    total = int(vals.sum())
+    if abs(total) <= tol:
+        return np.array([], dtype=np.int64)
+    lo_t, hi_t = total - tol, total + tol
+
+    single = np.flatnonzero((vals >= lo_t) & (vals <= hi_t))
+    if len(single) > 0:
+        return single[:1]
+
+    order = np.argsort(vals, kind="stable")
+    s = vals[order]
+    lo = np.searchsorted(s, lo_t - s, side="left")
+    hi = np.searchsorted(s, hi_t - s, side="right")
+    own = np.arange(len(s))
+    count = hi - lo - ((own >= lo) & (own < hi))
+    hits = np.flatnonzero(count > 0)
+    if len(hits) == 0:
+        return None
+    i = int(hits[0])
+    for j in range(lo[i], hi[i]):
+        if j != i:
+            return np.sort(order[[i, j]])
+    return None
+
+
+def _half_sums(vals):
+    # Index ke-k pada hasil = bitmask item yang dipilih
+    sums = np.zeros(1, dtype=np.int64)
+    counts = np.zeros(1, dtype=np.int16)
+    for v in vals:
+        sums = np.concatenate([sums, sums + v])
+        counts = np.concatenate([counts, counts + 1])
+    return sums, counts
+
+
+def _mask_to_positions(mask, offset):
+    return [offset + b for b in range(mask.bit_length()) if (mask >> b) & 1]
+
+
+def _solve_mitm(vals, tol):
+    n = len(vals)
+    half = n // 2
+    left_sums, left_counts = _half_sums(vals[:half])
+    right_sums, right_counts = _half_sums(vals[half:])
+
+    # Per nilai sum kanan cukup simpan kardinalitas terbesar
+    order = np.lexsort((-right_counts, right_sums))
+    sorted_sums = right_sums[order]
+    first = np.concatenate([[True], sorted_sums[1:] != sorted_sums[:-1]])
+    u_sums = sorted_sums[first]
+    u_counts = right_counts[order][first]
+    u_masks = order[first]
+
+    # Sparse table untuk range-max kardinalitas
+    table = [np.arange(len(u_sums))]
+    k = 1
+    while (1 << k) <= len(u_sums):
+        prev = table[-1]
+        span = 1 << (k - 1)
+        a = prev[:-span]
+        b = prev[span:]
+        table.append(np.where(u_counts[b] > u_counts[a], b, a))
+        k += 1
+
+    lo = np.searchsorted(u_sums, -left_sums - tol, side="left")
+    hi = np.searchsorted(u_sums, -left_sums + tol, side="right")
+    valid = hi > lo
+    if not valid.any():
+        return np.array([], dtype=np.int64)
+    lo, hi = lo[valid], hi[valid]
+    left_idx = np.flatnonzero(valid)
+    level = np.floor(np.log2(hi - lo)).astype(np.int64)
+
+    best_right = np.empty(len(lo), dtype=np.int64)
+    for lv in np.unique(level):
+        sel = level == lv
+        t = table[lv]
+        a = t[lo[sel]]
+        b = t[hi[sel] - (1 << lv)]
+        best_right[sel] = np.where(u_counts[b] > u_counts[a], b, a)
+
+    totals = left_counts[left_idx].astype(np.int64) + u_counts[best_right]
+    pick = int(np.argmax(totals))
+    left_mask = int(left_idx[pick])
+    right_mask = int(u_masks[best_right[pick]])
+    chosen = _mask_to_positions(left_mask, 0) + _mask_to_positions(right_mask, half)
+    return np.array(sorted(chosen), dtype=np.int64)
+
+
+def _solve_dp(vals, tol):
+    n = len(vals)
+    low = int(vals[vals < 0].sum())
+    width = int(vals[vals > 0].sum()) - low + 1
+    # dp[s - low] = kardinalitas maksimum untuk mencapai sum s (-1 = tidak tercapai)
+    dp = np.full(width, -1, dtype=np.int32)
+    dp[-low] = 0
+    took = np.zeros((n, width), dtype=bool)
+    for i, v in enumerate(vals.tolist()):
+        shifted = np.full(width, -1, dtype=np.int32)
+        if v > 0:
+            shifted[v:] = dp[:-v]
+        elif v < 0:
+            shifted[:v] = dp[-v:]
+        else:
+            shifted = dp.copy()
+        cand = np.where(shifted >= 0, shifted + 1, -1)
+        take = cand > dp
+        dp = np.where(take, cand, dp)
+        took[i] = take
+
+    lo = max(-tol - low, 0)
+    hi = min(tol - low, width - 1)
+    window = dp[lo:hi + 1]
+    if len(window) == 0 or window.max() <= 0:
+        return np.array([], dtype=np.int64)
+    s = lo + int(np.argmax(window))
+    chosen = []
+    for i in range(n - 1, -1, -1):
+        if took[i, s]:
+            chosen.append(i)
+            s -= int(vals[i])
+    return np.array(sorted(chosen), dtype=np.int64)
+
+
+def _greedy_seed(vals, tol, triple_max_items=SEED_TRIPLE_MAX_ITEMS):
+    """
+    Solusi awal cepat untuk SCIP: gabungan pasangan lalu triple seimbang yang disjoint,
+    selama total gabungan tetap dalam toleransi. Return array posisi.
+    """
+    n = len(vals)
+    used = np.zeros(n, dtype=bool)
+    chosen = []
+    running = 0
+
+    # Pasangan: positif vs negatif terdekat dalam toleransi
+    neg = [int(i) for i in np.argsort(vals, kind="stable") if vals[i] < 0]
+    neg_vals = [int(vals[i]) for i in neg]
+    for p in np.flatnonzero(vals > 0).tolist():
+        target = -int(vals[p])
+        j = bisect.bisect_left(neg_vals, target - tol)
+        if j < len(neg_vals) and neg_vals[j] <= target + tol:
+            gs = int(vals[p]) + neg_vals[j]
+            if abs(running + gs) <= tol:
+                chosen += [p, neg[j]]
+                used[p] = used[neg[j]] = True
+                running += gs
+                del neg[j]
+                del neg_vals[j]
+
+    # Triple: a + b + c dalam toleransi (hanya untuk sisa yang tidak terlalu besar)
+    rest = np.flatnonzero(~used)
+    if 3 <= len(rest) <= triple_max_items:
+        order = rest[np.argsort(vals[rest], kind="stable")]
+        s = vals[order]
+        ii, jj = np.triu_indices(len(order), k=1)
+        target = -(s[ii] + s[jj])
+        lo = np.searchsorted(s, target - tol, side="left")
+        hi = np.searchsorted(s, target + tol, side="right")
+        for c in np.flatnonzero(hi > lo).tolist():
+            a, b = order[ii[c]], order[jj[c]]
+            if used[a] or used[b]: continue
+            for k in range(lo[c], hi[c]):
+                z = order[k]
+                if used[z] or z == a or z == b: continue
+                gs = int(vals[a] + vals[b] + vals[z])
+                if abs(running + gs) <= tol:
+                    chosen += [int(a), int(b), int(z)]
+                    used[[a, b, z]] = True
+                    running += gs
+                break
+    return np.array(sorted(chosen), dtype=np.int64)
+
+
+def _solve_scip(vals, tol, time_limit_ms, hint=None):
+    # Return (posisi, proven); proven hanya jika SCIP selesai OPTIMAL dalam batas waktu
+    fallback = np.array([], dtype=np.int64) if hint is None else hint
+    if TIME_BUDGET is not None:
+        time_limit_ms = TIME_BUDGET.scip_time_ms(time_limit_ms)
+        if not time_limit_ms:
+            metrics.count("scip_skipped")
+            return fallback, False
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    if not solver: return fallback, False
+    # Ctrl+C ditangani RunBudget (pembatalan), jangan ditelan SCIP
+    if TIME_BUDGET is not None: solver.SetSolverSpecificParametersAsString("misc/catchctrlc = FALSE\n")
+    n = len(vals)
+    x = [solver.IntVar(0, 1, f'x_{i}') for i in range(n)]
+    constraint = solver.RowConstraint(-tol, tol, 'sum_constraint')
+    for i in range(n): constraint.SetCoefficient(x[i], float(vals[i]))
+    objective = solver.Objective()
+    for i in range(n): objective.SetCoefficient(x[i], 1)
+    objective.SetMaximization()
+    if hint is not None and len(hint):
+        hinted = np.zeros(n)
+        hinted[hint] = 1.0
+        solver.SetHint(x, hinted.tolist())
+    solver.SetTimeLimit(int(time_limit_ms))
+    started = time.perf_counter()
+    status = solver.Solve()
+    metrics.count(f"scip_{_STATUS_NAMES.get(status, 'other')}")
+    metrics.count("scip_iterations", solver.iterations())
+    found = np.array([], dtype=np.int64)
+    if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        found = np.array([i for i in range(n) if x[i].solution_value() > 0.5], dtype=np.int64)
+    # Solusi awal tetap dipakai jika SCIP tidak menemukan yang lebih baik dalam batas waktu
+    if hint is not None and len(hint) > len(found):
+        found, proven = hint, False
+    else:
+        proven = status == pywraplp.Solver.OPTIMAL
+    if TIME_BUDGET is not None:
+        TIME_BUDGET.spent(time.perf_counter() - started, True if len(found) >= 2 else (None if proven else False))
+    return found, proven
@@ -0,0 +1,98 @@
+# tests/conftest.py
+import random
+import pandas as pd
+import pytest
+import runner
+
+
+def make_sheets(branches=("MEDAN",), n_per=40, seed=0):
+    """
+    Data sintetis 2 sheet (Pusat, Cabang) seperti hasil upload: tiap cabang berisi campuran pola
+    yang ditangkap tahap-tahap algoritma (BS, Keperluan, NOTA, ATM, JMU, BKK/BKM, jurnal, ATK,
+    offset, grup RECON) + baris tanpa pasangan.
+    """
+    rng = random.Random(seed)
+    pusat, cabang = [], []
+    counter = [1000]
+
+    def nid():
+        counter[0] += 1
+        return counter[0]
+
+    def row(branch, side, tgl, kep, deb, kre, jenis="VO", idd=None, nomor=None, sumber="-", dib="SPIL KARET"):
+        r = {"Tanggal Kasir": tgl, "ID Dokumen": idd or f"{nid()}/2024", "Nomor Dokumen": nomor or f"XX.{nid()}/01/2024",
+             "Jenis Dokumen": jenis, "Sumber Dokumen": sumber, "Keperluan": kep, "Dibayarkan (ke/dari)": dib,
+             "Debet": deb, "Kredit": kre}
+        if side == "p":
+            r.update({"Tempat Pembayaran": "KARET", "Nama Kode": runner.BRANCH_MAPPING[branch]})
+            pusat.append(r)
+        else:
+            r.update({"Tempat Pembayaran": branch, "Nama Kode": "X"})
+            cabang.append(r)
+
+    for b in branches:
+        for _ in range(n_per):
+            d = pd.Timestamp(2024, 1, rng.randint(1, 28))
+            amt = rng.choice([rng.randint(1, 500) * 1000, round(rng.uniform(1, 9e6), 2)])
+            k = rng.randint(0, 12)
+            if k == 0:
+                kep = f"BS TRANSFER {nid()}"
+                row(b, "p", d, kep, amt, 0, jenis="BS"); row(b, "c", d, kep, 0, amt, jenis="BS")
+            elif k == 1:
+                kep = f"BIAYA OPERASIONAL {nid()}"
+                row(b, "p", d, kep, amt, 0); row(b, "c", d, kep, 0, amt)
+            elif k == 2:
+                row(b, "c", d, f"PEMBAYARAN ATAS NOTA {nid()}", amt, 0)
+            elif k == 3:
+                row(b, "p", d, "PENARIKAN DANA VIA ATM MANDIRI SMART ACCOUNT", 0, amt)
+            elif k == 4:
+                idb = f"{nid()}/2024"
+                row(b, "p", d, f"JMU ASD IDBKK:{idb} X", amt, 0); row(b, "c", d, f"JMU ASK IDBKK:{idb} Y", 0, amt)
+            elif k == 5:
+                idb = f"{nid()}/2024"
+                row(b, "p", d, "BAYAR SESUATU", amt, 0, idd=idb); row(b, "c", d, f"REF IDBKK: {idb}", 0, amt)
+            elif k == 6:
+                idb = f"{nid()}/2024"
+                row(b, "p", d, "TERIMA SESUATU", 0, amt, jenis="VI", idd=idb); row(b, "c", d, f"BKM {idb} OK", amt, 0)
+            elif k == 7:
+                code = f"JMU{rng.randint(1, 9)}{nid()}"
+                row(b, "p", d, f"{code} jurnal", amt, 0); row(b, "c", d, f"{code} balik", 0, amt)
+            elif k == 8:
+                row(b, "c", d, f"BELI ATK {nid()}", 0, amt, jenis="TTT", sumber="PO.123")
+            elif k == 9:
+                d2 = d + pd.Timedelta(days=rng.choice([0, 1, 2]))
+                row(b, "p", d, f"OFFSET A {nid()}", amt, 0); row(b, "c", d2, f"OFFSET B {nid()}", 0, amt)
+            elif k == 10:
+                # Grup RECON 1 lawan 2, tanggal berbeda (bisa lintas segmen Depo)
+                a1, a2 = rng.randint(1, 300) * 1000, rng.randint(1, 300) * 1000
+                row(b, "p", d, f"GRP A {nid()}", a1 + a2, 0)
+                row(b, "c", d + pd.Timedelta(days=3), f"GRP B {nid()}", 0, a1)
+                row(b, "c", d + pd.Timedelta(days=9), f"GRP C {nid()}", 0, a2)
+            else:
+                row(b, rng.choice("pc"), d, f"LAIN {nid()}", amt, 0)
+    return pd.DataFrame(pusat), pd.DataFrame(cabang)
+
+
+def write_workbook(path, df_pusat, df_cabang):
+    # Format upload: judul laporan di atas, header tabel di baris ke-4
+    with pd.ExcelWriter(path, engine="openpyxl") as w:
+        for name, df in (("Pusat", df_pusat), ("Cabang", df_cabang)):
+            pd.DataFrame([["LAPORAN"], [None]]).to_excel(w, sheet_name=name, header=False, index=False)
+            df.to_excel(w, sheet_name=name, startrow=3, index=False)
+    return path
+
+
+@pytest.fixture
+def branch_jobs():
+    # jobs(branches, n_per, seed) -> list (branch_name, df_all) seperti runner.prepare_jobs
+    def jobs(branches=("MEDAN",), n_per=40, seed=0):
+        return runner.prepare_jobs(*make_sheets(branches, n_per, seed), list(branches))
+    return jobs
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    # workbook(branches, n_per, seed) -> path .xlsx sintetis
+    def build(branches=("MEDAN",), n_per=40, seed=0, name="input.xlsx"):
+        return str(write_workbook(tmp_path / name, *make_sheets(branches, n_per, seed)))
+    return build
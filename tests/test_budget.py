@@ -0,0 +1,36 @@
+# tests/test_budget.py
+import math
+import budget
+import runner
+
+
+def test_batch_slots_are_per_file_and_branch():
+    run = runner.make_batch_budget(["a/jan.xlsx", "b/feb.xlsx"], ["MEDAN", "DEPO"], 60, workers=2)
+    assert len(run.labels) == 4
+    run.set_rows(("a/jan.xlsx", "MEDAN"), 500)
+    run.set_rows(("b/feb.xlsx", "MEDAN"), 500)
+    # MEDAN file pertama selesai: MEDAN file kedua tetap punya bobot & jatah
+    run.branch(("a/jan.xlsx", "MEDAN")).finish()
+    later = run.branch(("b/feb.xlsx", "MEDAN"))
+    assert later.open_stage(50) > 0
+    report = run.report()
+    assert list(report["File"]) == ["jan.xlsx", "jan.xlsx", "feb.xlsx", "feb.xlsx"]
+    assert list(report["Cabang"]) == ["MEDAN", "DEPO", "MEDAN", "DEPO"]
+
+
+def test_share_follows_weights():
+    run = budget.RunBudget(100, ["A", "B"], [0, 0], workers=1)
+    run.set_rows("A", 300)
+    run.set_rows("B", 100)
+    share = run.branch("A").open_stage(30)
+    assert 0 < share < 100
+    assert "File" not in run.report().columns
+
+
+def test_cancel_skips_scip():
+    run = budget.RunBudget(None, ["A"], [10])
+    branch = run.branch("A")
+    assert branch.open_stage(5) == math.inf
+    assert branch.scip_time_ms(1000) == 1000
+    run.cancel()
+    assert branch.scip_time_ms(1000) == 0
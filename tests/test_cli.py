@@ -0,0 +1,37 @@
+# tests/test_cli.py
+import os
+import zipfile
+import openpyxl
+import pandas as pd
+import pytest
+import cli
+import upload_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path / "cache"))
+
+
+def test_single_workbook_smoke(tmp_path, workbook):
+    path = workbook(("MEDAN", "DEPO"), n_per=30)
+    out = str(tmp_path / "Output_RK.xlsx")
+    code = cli.main([path, "-o", out, "-b", "MEDAN,DEPO", "-w", "1", "-q", "--metrics-sheet", "--export", "csv"])
+    assert code == 0
+    book = openpyxl.load_workbook(out, read_only=True)
+    assert book.sheetnames == ["MEDAN", "DEPO", "METRICS"]
+    assert next(book["MEDAN"].iter_rows(values_only=True))[0] == "Cabang: MEDAN"
+    with zipfile.ZipFile(str(tmp_path / "Output_RK_csv.zip")) as z:
+        assert sorted(z.namelist()) == ["DEPO.csv", "MEDAN.csv"]
+
+
+def test_batch_smoke(tmp_path, workbook):
+    paths = [workbook(("MEDAN",), n_per=20, seed=s, name=f"bulan{s}.xlsx") for s in (1, 2)]
+    out_dir = str(tmp_path / "hasil")
+    assert cli.main(paths + ["--output-dir", out_dir, "-b", "MEDAN", "-w", "1", "-q"]) == 0
+    assert sorted(os.listdir(out_dir)) == ["RINGKASAN_BATCH.csv", "bulan1_Output_RK.xlsx", "bulan2_Output_RK.xlsx"]
+    assert len(pd.read_csv(os.path.join(out_dir, "RINGKASAN_BATCH.csv"))) == 2
+
+
+def test_invalid_arguments_exit_code(workbook):
+    assert cli.main([workbook(), "--time-budget", "0", "-q"]) == 2
@@ -0,0 +1,40 @@
+# tests/test_group_balance.py
+import numpy as np
+import pandas as pd
+import group_balance
+
+
+def test_sums_match_groupby_and_skip_missing_keys():
+    keys = pd.Series(["A", "B", "A", None, "C", "B"])
+    net = np.array([500, -200, -500, 999, 7, 200], dtype=np.int64)
+    gb = group_balance.GroupBalance(keys, {"Net": net})
+    expected = pd.Series(net).groupby(keys).sum()
+    assert dict(zip(gb.uniques, gb.sums["Net"].tolist())) == expected.to_dict()
+    assert gb.rows_in(gb.sums["Net"] == 0).tolist() == [True, True, True, False, False, True]
+
+
+def test_int64_sums_are_exact_beyond_float_precision():
+    big = 2 ** 62
+    gb = group_balance.GroupBalance(pd.Series(["A", "A", "A"]), {"Net": np.array([big, 1, -big], dtype=np.int64)})
+    assert gb.sums["Net"].dtype == np.int64
+    assert gb.sums["Net"].tolist() == [1]
+
+
+def test_remove_updates_sums_like_recompute():
+    keys = pd.Series(["A", "A", "B", "B", "B"])
+    net = np.array([10, -10, 3, 4, -7], dtype=np.int64)
+    gb = group_balance.GroupBalance(keys, {"Net": net})
+    gb.remove([1, 3, 3])
+    fresh = group_balance.GroupBalance(keys, {"Net": net}, active=[True, False, True, False, True])
+    assert gb.sums["Net"].tolist() == fresh.sums["Net"].tolist() == [10, -4]
+    assert gb.active.tolist() == [True, False, True, False, True]
+
+
+def test_subset_sums_and_within():
+    keys = pd.Series(["A", "A", "A", "B"])
+    net = np.array([5, -5, 100, 0], dtype=np.int64)
+    is_bs = np.array([True, True, False, True])
+    gb = group_balance.GroupBalance(keys, {"Net": net})
+    sums = gb.subset_sums(is_bs)
+    assert sums["Net"].tolist() == [0, 0]
+    assert gb.rows_in(sums["Net"] == 0, within=is_bs).tolist() == [True, True, False, True]
@@ -0,0 +1,65 @@
+# tests/test_keperluan.py
+import numpy as np
+import pandas as pd
+import keperluan
+
+SAMPLES = pd.Series([
+    "PEMBAYARAN BKK: 123/2024 DAN IDBKK 45/2024",
+    "NOBKK: AB.12/03/2024 NOBKM: CD.7/11/2023",
+    "IDBKM-88/2023",
+    "JMU81234 JMU ASD BKM 9/2024",
+    "AB.5512 PENYESUAIAN",
+    "MANDIRI SMART ACCOUNT 001",
+    None,
+    "TANPA KODE",
+    "PEMBAYARAN BKK: 123/2024 DAN IDBKK 45/2024",
+], index=[10, 11, 12, 13, 14, 15, 16, 17, 18])
+
+
+def layers_by_extractall(pattern):
+    return SAMPLES.str.extractall(pattern)[0].unstack()
+
+
+def test_reference_codes_match_extractall():
+    codes = keperluan.extract_reference_codes(SAMPLES)
+    for kind, pattern in (("BKK_ID", keperluan.REGEX_BKK_ID), ("BKM_ID", keperluan.REGEX_BKM_ID),
+                          ("BKK_NO", keperluan.REGEX_BKK_NO), ("BKM_NO", keperluan.REGEX_BKM_NO)):
+        expected = layers_by_extractall(pattern)
+        got = keperluan.reference_layers(codes, kind, SAMPLES.index)
+        assert got.index.tolist() == expected.index.tolist(), kind
+        assert got.to_numpy().tolist() == expected.astype(object).to_numpy().tolist(), kind
+
+
+def test_first_id_and_jurnal_match_extract():
+    codes = keperluan.extract_reference_codes(SAMPLES)
+    for key, pattern in (("BK_ID_FIRST", keperluan.REGEX_BKK_BKM_ID), ("JURNAL", keperluan.REGEX_JURNAL)):
+        expected = SAMPLES.str.extract(pattern)[0]
+        got = keperluan.lookup(codes, key, SAMPLES.index)
+        assert got.isna().tolist() == expected.isna().tolist(), key
+        assert got.dropna().tolist() == expected.dropna().tolist(), key
+
+
+def test_lookup_follows_row_labels():
+    codes = keperluan.extract_reference_codes(SAMPLES)
+    got = keperluan.lookup(codes, "BK_ID_FIRST", pd.Index([18, 12]))
+    assert got.tolist() == ["123/2024", "88/2023"]
+    assert np.all(got.index == [18, 12])
+
+
+def test_classifier_matches_str_contains():
+    texts = pd.Series(["PEMBAYARAN ATAS NOTA 12", "PENARIKAN DANA VIA ATM MANDIRI SMART ACCOUNT",
+                       "mandiri smart account x", "JMU ASK JMU ASD", "KODE LAWAN RO CABANG:X",
+                       "PEMBAYARAN DPP GIRO", "PENERIMAAN GIRO DENGAN VA", None, "LAIN"])
+    flags = keperluan.classify_keperluan(texts)
+    # Satu flag bisa mewakili beberapa kata kunci (mis. pengotor): expected = OR semuanya
+    for bit in set(keperluan._KEYWORD_FLAGS.values()):
+        keywords = [k for k, b in keperluan._KEYWORD_FLAGS.items() if b == bit]
+        expected = np.logical_or.reduce([texts.str.contains(k, regex=False, na=False) for k in keywords])
+        assert keperluan.has_flag(flags, bit, texts.index).tolist() == expected.tolist(), keywords
+    expected_sa = texts.str.match(r"(?i)(?:MANDIRI SMART ACCOUNT|PENARIKAN DANA VIA)", na=False)
+    assert keperluan.has_flag(flags, keperluan.KW_SA_PREFIX, texts.index).tolist() == expected_sa.tolist()
+
+
+def test_classifier_exact_bits():
+    flags = keperluan.classify_keperluan(pd.Series(["JMU ASD", "JMU ASK", "NOTA", None]))
+    assert flags.tolist() == [keperluan.KW_JMU_ASD, keperluan.KW_JMU_ASK, 0, 0]
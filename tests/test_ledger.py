@@ -0,0 +1,104 @@
+# tests/test_ledger.py
+import pandas as pd
+import pytest
+import ledger
+import money
+import runner
+import utils
+
+
+def make_frame():
+    return pd.DataFrame({
+        "Nomor Dokumen": ["A1", "A2", "B1", "B2", "N1", "G1"],
+        "Keperluan": ["KEP A", "KEP A", "KEP B", "KEP B", "NOTA X", "SISA"],
+        money.NET_CENTS: [100, -100, 250, -250, 40, 7],
+    })
+
+
+def fake_results(pending):
+    # Pengganti algoritma: grup per Keperluan, NOTA per baris, sisanya GANTUNG
+    kep = pending[pending["Keperluan"].str.startswith("KEP")].copy()
+    kep[money.GROUP_KEY] = kep["Keperluan"]
+    return [
+        ("DATA GANTUNG KARET (PUSAT)", pending[pending["Keperluan"] == "SISA"]),
+        ("MATCH KEPERLUAN", kep),
+        ("NOTA", pending[pending["Keperluan"].str.startswith("NOTA")]),
+    ]
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = ledger.Ledger(str(tmp_path / "ledger.sqlite"))
+    yield state
+    state.close()
+
+
+def run(state, df):
+    plan = state.plan("MEDAN", df)
+    merged = state.commit(plan, fake_results(plan.pending) if len(plan.pending) else [])
+    return plan, dict(merged)
+
+
+def test_first_run_processes_all_and_drops_internal_columns(state):
+    plan, merged = run(state, make_frame())
+    assert len(plan.pending) == 6
+    assert sorted(merged["MATCH KEPERLUAN"]["Nomor Dokumen"]) == ["A1", "A2", "B1", "B2"]
+    for df in merged.values():
+        assert ledger.LEDGER_KEY not in df.columns
+        assert money.GROUP_KEY not in df.columns
+
+
+def test_group_ids_are_per_group(state):
+    run(state, make_frame())
+    ids = dict(state.conn.execute("SELECT category || ':' || row_key, group_id FROM ledger_rows"))
+    kep = {g for k, g in ids.items() if k.startswith("MATCH KEPERLUAN")}
+    assert len(kep) == 2
+    assert all(g.endswith(("KEP A", "KEP B")) for g in kep)
+
+
+def test_unchanged_rerun_has_no_pending_rows(state):
+    run(state, make_frame())
+    plan, merged = run(state, make_frame())
+    assert len(plan.pending) == 0
+    assert sorted(merged["MATCH KEPERLUAN"]["Nomor Dokumen"]) == ["A1", "A2", "B1", "B2"]
+    assert list(merged["NOTA"]["Nomor Dokumen"]) == ["N1"]
+
+
+def test_removed_row_reopens_only_its_group(state):
+    run(state, make_frame())
+    df = make_frame()
+    plan, merged = run(state, df[df["Nomor Dokumen"] != "A1"])
+    # Pasangan A1 + baris GANTUNG saja; grup KEP B & NOTA dipakai ulang
+    assert sorted(plan.pending["Nomor Dokumen"]) == ["A2", "G1"]
+    assert sorted(merged["MATCH KEPERLUAN"]["Nomor Dokumen"]) == ["A2", "B1", "B2"]
+
+
+def test_new_rows_and_gantung_are_pending(state):
+    run(state, make_frame())
+    extra = pd.DataFrame({"Nomor Dokumen": ["C1"], "Keperluan": ["KEP C"], money.NET_CENTS: [5]})
+    plan, _ = run(state, pd.concat([make_frame(), extra], ignore_index=True))
+    assert sorted(plan.pending["Nomor Dokumen"]) == ["C1", "G1"]
+
+
+def test_reset_forgets_branch(state):
+    run(state, make_frame())
+    state.reset("MEDAN")
+    plan, _ = run(state, make_frame())
+    assert len(plan.pending) == 6
+
+
+def test_unchanged_rerun_writes_full_run_output(tmp_path, workbook):
+    # Lewat file xlsx asli: kolom tanggal input bertipe object, tahap (mis. OFFSET PAIRS) mengubahnya
+    df_pusat, df_cabang = utils.load_excel_sheets(workbook(("MEDAN", "DEPO"), n_per=60))
+    branches = ["MEDAN", "DEPO"]
+    jobs = lambda: runner.prepare_jobs(df_pusat, df_cabang, branches)
+    full = {b: [(t, money.for_output(df)) for t, df in r] for b, r, _ in runner.run_branches(jobs(), workers=1)}
+    state = ledger.Ledger(str(tmp_path / "ledger.sqlite"))
+    list(runner.run_branches(jobs(), workers=1, ledger=state))
+    rerun = {b: r for b, r, _ in runner.run_branches(jobs(), workers=1, ledger=state)}
+    state.close()
+    for b in branches:
+        assert [t for t, _ in rerun[b]] == [t for t, _ in full[b]]
+        for (title, expected), (_, got) in zip(full[b], rerun[b]):
+            got = money.for_output(got)
+            pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True), obj=f"{b} {title}")
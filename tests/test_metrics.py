@@ -0,0 +1,35 @@
+# tests/test_metrics.py
+import metrics
+
+RSS = "Peak RSS Proses s/d Tahap (MB)"
+TRACED = "Peak Tracemalloc Tahap (MB)"
+
+
+def run_stages(options):
+    with metrics.recording("MEDAN", options) as recorder:
+        metrics.start(10)
+        big = [bytes(1000) for _ in range(20_000)]   # ~20 MB selama tahap BESAR
+        del big
+        metrics.stage("BESAR", 5)
+        small = [0] * 10
+        metrics.stage("KECIL", 0)
+        recorder.total(10, 0)
+    return {row["Tahap"]: row for row in recorder.stages}
+
+
+def test_tracemalloc_peak_is_measured_per_stage(tmp_path):
+    rows = run_stages(("tracemalloc", str(tmp_path)))
+    assert rows["BESAR"][TRACED] >= 20
+    assert rows["KECIL"][TRACED] < 1
+    assert rows["TOTAL"][TRACED] == rows["BESAR"][TRACED]
+    report = (tmp_path / "MEDAN_tracemalloc.txt").read_text(encoding="utf-8")
+    assert float(report.split("peak=")[1].split()[0]) >= 20
+
+
+def test_rss_column_is_process_high_water_mark():
+    rows = run_stages((None, "."))
+    assert all(row[TRACED] is None for row in rows.values())
+    if metrics.resource is not None:
+        # Tidak turun walau tahap berikutnya hampir tidak mengalokasi
+        assert rows["BESAR"][RSS] <= rows["KECIL"][RSS] <= rows["TOTAL"][RSS]
+    assert list(metrics.RunMetrics().frame().columns) == list(metrics.COLUMNS)
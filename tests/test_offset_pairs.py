@@ -0,0 +1,51 @@
+# tests/test_offset_pairs.py
+import pandas as pd
+import utils
+
+
+def frame(rows):
+    # rows: (tanggal, net, tempat)
+    return pd.DataFrame({"Tanggal Kasir": [r[0] for r in rows], "Net": [r[1] for r in rows],
+                         "Tempat Pembayaran": [r[2] for r in rows]})
+
+
+def pairs_of(df):
+    matched = df[df["Is_Matched"]]
+    return sorted(sorted(group.index.tolist()) for _, group in matched.groupby("Match_ID"))
+
+
+def test_same_date_pairs_need_different_tempat():
+    df = frame([("01/03/2024", 100.0, "KARET"), ("01/03/2024", -100.0, "KARET"),
+                ("01/03/2024", -100.0, "MEDAN"), ("02/03/2024", 50.0, "KARET")])
+    out = utils.find_offset_pairs(df)
+    assert pairs_of(out) == [[0, 2]]
+
+
+def test_same_date_pairs_are_one_to_one():
+    df = frame([("05/03/2024", 75.5, "KARET"), ("05/03/2024", 75.5, "KARET"),
+                ("05/03/2024", -75.5, "MEDAN")])
+    out = utils.find_offset_pairs(df)
+    assert pairs_of(out) == [[0, 2]]
+    assert out["Match_ID"].iloc[0] == "MATCH_0001"
+
+
+def test_window_pairs_only_with_window_days():
+    df = frame([("01/03/2024", 100.0, "KARET"), ("03/03/2024", -100.0, "MEDAN")])
+    assert pairs_of(utils.find_offset_pairs(df.copy())) == []
+    assert pairs_of(utils.find_offset_pairs(df.copy(), window_days=1)) == []
+    assert pairs_of(utils.find_offset_pairs(df.copy(), window_days=2)) == [[0, 1]]
+
+
+def test_window_picks_closest_date():
+    df = frame([("10/03/2024", 20.0, "KARET"), ("07/03/2024", -20.0, "MEDAN"),
+                ("11/03/2024", -20.0, "MEDAN"), ("15/03/2024", -20.0, "MEDAN")])
+    assert pairs_of(utils.find_offset_pairs(df, window_days=5)) == [[0, 2]]
+
+
+def test_same_date_pass_runs_before_window_pass():
+    # Baris 1 cocok di tanggal yang sama dengan baris 2, jadi baris 0 tidak boleh mengambilnya
+    df = frame([("01/03/2024", 30.0, "KARET"), ("02/03/2024", 30.0, "KARET"),
+                ("02/03/2024", -30.0, "MEDAN"), ("04/03/2024", -30.0, "MEDAN")])
+    out = utils.find_offset_pairs(df, window_days=3)
+    assert pairs_of(out) == [[0, 3], [1, 2]]
+    assert out.loc[2, "Match_ID"] == "MATCH_0001"
@@ -0,0 +1,89 @@
+# tests/test_pipeline.py
+import numpy as np
+import pandas as pd
+import algo_general
+import money
+import pipeline
+
+
+def test_take_removes_rows_from_later_stages():
+    pipe = pipeline.StagePipeline(pd.DataFrame({"Net": [1.0, -1.0, 2.5, 3.0]}, index=[10, 11, 12, 13]))
+    first = pipe.take((pipe.column("Net") > 0).to_numpy())
+    assert first.index.tolist() == [0, 2, 3]
+    assert pipe.index.tolist() == [1]
+    # Tahap berikutnya hanya melihat baris tersisa, walau mask-nya "cocok" dengan semua baris
+    second = pipe.take(np.ones(len(pipe.index), dtype=bool))
+    assert second.index.tolist() == [1]
+    assert pipe.empty and pipe.frame().empty
+
+
+def test_peek_keeps_rows_and_discard_removes_them():
+    pipe = pipeline.StagePipeline(pd.DataFrame({"Net": [1.0, 2.0, 3.0]}))
+    peeked = pipe.peek([True, False, True])
+    assert peeked.index.tolist() == [0, 2] and pipe.index.tolist() == [0, 1, 2]
+    pipe.discard(peeked.index[:1])
+    assert pipe.index.tolist() == [1, 2]
+    assert pipe.frame()[money.NET_CENTS].tolist() == [200, 300]
+
+
+def test_extra_column_follows_remaining_rows_until_dropped():
+    pipe = pipeline.StagePipeline(pd.DataFrame({"Net": [1.0, 2.0, 3.0]}))
+    pipe.take([True, False, False])
+    pipe.set_column("KODE", ["B", "C"])
+    assert pipe.take([False, True])["KODE"].tolist() == ["C"]
+    pipe.drop_column("KODE")
+    assert "KODE" not in pipe.frame().columns
+
+
+def ledger_frame(rows):
+    columns = ["ID Dokumen", "Jenis Dokumen", "Keperluan", "Debet", "Kredit", "Tempat Pembayaran"]
+    df = pd.DataFrame(rows, columns=columns)
+    df.insert(0, "Tanggal Kasir", pd.Timestamp("2024-01-02"))
+    df.insert(2, "Nomor Dokumen", [f"A.{i}/01/2024" for i in range(len(df))])
+    df.insert(4, "Sumber Dokumen", "-")
+    df["Net"] = df["Debet"] - df["Kredit"]
+    return df
+
+
+def categories(results_list):
+    return {title: df["ID Dokumen"].tolist() for title, df in results_list if len(df)}
+
+
+def test_branch_stages_partition_rows_and_leave_rest_gantung(branch_jobs):
+    # Pasangan NOTA 77 juga seimbang per Keperluan: diambil MATCH KEPERLUAN, tidak ditawarkan lagi ke NOTA
+    df = ledger_frame([
+        ("1/2024", "VO", "PEMBAYARAN ATAS NOTA 77", 100.0, 0.0, "KARET"),
+        ("2/2024", "VI", "PEMBAYARAN ATAS NOTA 77", 0.0, 100.0, "MEDAN"),
+        ("3/2024", "VO", "PEMBAYARAN ATAS NOTA 88", 55.5, 0.0, "KARET"),
+        ("4/2024", "VO", "LAIN LAIN", 12.34, 0.0, "MEDAN"),
+        ("5/2024", "VO", "LAIN LAIN 2", 7.0, 0.0, "KARET"),
+    ])
+    assert categories(algo_general.process_branch_reconciliation(df, "MEDAN")) == {
+        "MATCH KEPERLUAN": ["1/2024", "2/2024"],
+        "NOTA": ["3/2024"],
+        "DATA GANTUNG MEDAN": ["4/2024"],
+        "DATA GANTUNG KARET (PUSAT)": ["5/2024"],
+    }
+
+    # Fixture lengkap: tiap baris input muncul di tepat satu kategori
+    (_, df_all), = branch_jobs(("MEDAN",), n_per=60)
+    results_list = algo_general.process_branch_reconciliation(df_all.copy(), "MEDAN")
+    ids = [i for ids in categories(results_list).values() for i in ids]
+    assert sorted(ids) == sorted(df_all["ID Dokumen"])
+    assert len(dict(results_list)["DATA GANTUNG KARET (PUSAT)"]) > 0
+
+
+def test_stages_balance_on_integer_cents():
+    # 0.1 + 0.2 - 0.3 != 0 dalam float; dalam sen seimbang tepat
+    df = ledger_frame([
+        ("1/2024", "VO", "TITIPAN 9", 0.1, 0.0, "KARET"),
+        ("2/2024", "VO", "TITIPAN 9", 0.2, 0.0, "KARET"),
+        ("3/2024", "VI", "TITIPAN 9", 0.0, 0.3, "MEDAN"),
+    ])
+    assert df["Net"].sum() != 0
+    results_list = algo_general.process_branch_reconciliation(df, "MEDAN")
+    assert categories(results_list) == {"MATCH KEPERLUAN": ["1/2024", "2/2024", "3/2024"]}
+    matched = dict(results_list)["MATCH KEPERLUAN"]
+    assert matched[money.NET_CENTS].dtype == np.int64
+    assert matched[money.NET_CENTS].tolist() == [10, 20, -30]
+    assert money.for_output(matched)["Net"].tolist() == [0.1, 0.2, -0.3]
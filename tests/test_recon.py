@@ -0,0 +1,32 @@
+# tests/test_recon.py
+import numpy as np
+import pandas as pd
+import subset_sum
+import utils
+
+
+def spanning_groups_frame(groups=8, seed=0):
+    # Tiap grup: 1 baris positif + 2 negatif berjarak 8 hari (melintasi 3 jendela mingguan) + baris tanpa pasangan
+    rng = np.random.default_rng(seed)
+    rows = []
+    for g in range(groups):
+        a, b = (int(v) * 1000 for v in rng.integers(1, 500, size=2))
+        day = pd.Timestamp(2024, 1, 1 + g)
+        rows += [(day, a + b), (day + pd.Timedelta(days=8), -a), (day + pd.Timedelta(days=16), -b)]
+    for k in range(4):
+        rows.append((pd.Timestamp(2024, 1, 3 + k), 7_777_777 + 1000 * k))
+    return pd.DataFrame(rows, columns=["Tanggal Kasir", "Net"])
+
+
+def matched_rows(df):
+    return int(df["Match_ID"].notna().sum())
+
+
+def test_default_recon_is_global_solve():
+    assert subset_sum.CLUSTER_DAYS == 0
+    df = spanning_groups_frame()
+    default = utils.reconcile_global_no_group(df, tolerance=1)
+    global_solve = utils.reconcile_global_no_group(df, tolerance=1, cluster_days=0)
+    assert matched_rows(default) == matched_rows(global_solve) == 24
+    assert default["Match_ID"].isna().to_numpy()[-4:].all()
+
@@ -0,0 +1,57 @@
+# tests/test_reference_graph.py
+import numpy as np
+import pandas as pd
+import keperluan
+import money
+import pipeline
+import reference_graph
+
+
+def test_connected_components():
+    root = reference_graph.connected_components(6, np.array([0, 1, 3]), np.array([1, 2, 4]))
+    assert root[0] == root[1] == root[2]
+    assert root[3] == root[4]
+    assert len({root[0], root[3], root[5]}) == 3
+
+
+def test_chain_component_matches_as_one_group():
+    # Baris 0 merujuk A, baris 1 = dokumen A & merujuk B, baris 2 = dokumen B
+    edge_rows = np.array([0, 1, 1, 2])
+    edge_keys = np.array(["ID:A", "ID:A", "ID:B", "ID:B"], dtype=object)
+    net = pd.Series([10_000, -3_000, -7_000], index=[0, 1, 2])
+    matched = reference_graph._match_edges(edge_rows, edge_keys, net, tol_cents=100)
+    assert matched == {0: "ID:A", 1: "ID:A", 2: "ID:A"}
+
+
+def test_unbalanced_component_falls_back_to_star_per_document():
+    # Komponen {A, B} tidak seimbang; dokumen A + perujuknya seimbang sendiri
+    edge_rows = np.array([0, 1, 1, 2, 3])
+    edge_keys = np.array(["ID:A", "ID:A", "ID:B", "ID:B", "ID:B"], dtype=object)
+    net = pd.Series([5_000, -5_000, 2_000, 1_000], index=[0, 1, 2, 3])
+    matched = reference_graph._match_edges(edge_rows, edge_keys, net, tol_cents=0)
+    assert matched == {0: "ID:A", 1: "ID:A"}
+
+
+def test_tolerance_is_in_cents():
+    edge_rows = np.array([0, 1])
+    edge_keys = np.array(["NO:X", "NO:X"], dtype=object)
+    net = pd.Series([10_000, -9_900], index=[0, 1])
+    assert reference_graph._match_edges(edge_rows, edge_keys, net, tol_cents=99) == {}
+    assert set(reference_graph._match_edges(edge_rows, edge_keys, net, tol_cents=100)) == {0, 1}
+
+
+def test_match_voucher_references_takes_rows_with_group_key():
+    df = pd.DataFrame({
+        "Keperluan": ["BAYAR IDBKK 12/2024", "PELUNASAN", "BAYAR IDBKK 99/2024"],
+        "ID Dokumen": ["X1", "12/2024", "X3"],
+        "Nomor Dokumen": ["N1", "N2", "N3"],
+        "Jenis Dokumen": ["VO", "VO", "VO"],
+        "Debet": [150.0, 0.0, 10.0],
+        "Kredit": [0.0, 150.0, 0.0],
+    })
+    pipe = pipeline.StagePipeline(df)
+    codes = keperluan.extract_reference_codes(pipe.base["Keperluan"])
+    out = reference_graph.match_voucher_references(pipe, codes, "BKK", jenis="VO")
+    assert out.index.tolist() == [0, 1]
+    assert out[money.GROUP_KEY].tolist() == ["ID:12/2024", "ID:12/2024"]
+    assert pipe.remaining.tolist() == [False, False, True]
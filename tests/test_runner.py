@@ -0,0 +1,40 @@
+# tests/test_runner.py
+import algo_depo
+import budget
+import reporting
+import runner
+import subset_sum
+import utils
+
+
+def counts(results_list):
+    return [(title, len(df)) for title, df in results_list]
+
+
+def test_worker_results_match_in_process(branch_jobs):
+    jobs = branch_jobs(("MEDAN", "DEPO"))
+    expected = [counts(runner.run_branch(b, df.copy())[0]) for b, df in jobs]
+    got = [counts(results) for _, results, _ in runner.run_branches(jobs, workers=1)]
+    assert got == expected
+
+
+def test_run_leaves_process_globals_untouched(branch_jobs):
+    # Server Streamlit menjalankan beberapa sesi di satu proses: run tidak boleh memasang state global
+    jobs = branch_jobs(("MEDAN", "DEPO"))
+    before = (subset_sum.CACHE, subset_sum.TIME_BUDGET, budget._RUN, utils.RECON_TIME_LIMIT_MS,
+              algo_depo.SEGMENT_WINDOW_DAYS, algo_depo.SEGMENT_MODE)
+    run_budget = runner.make_run_budget(jobs, 60, 1)
+    list(runner.run_branches(jobs, workers=1, recon=runner.recon_options(1234), depo_segments=(7, "parallel"),
+                             run_budget=run_budget, solver_cache=runner.make_solver_cache(enabled=False)))
+    after = (subset_sum.CACHE, subset_sum.TIME_BUDGET, budget._RUN, utils.RECON_TIME_LIMIT_MS,
+             algo_depo.SEGMENT_WINDOW_DAYS, algo_depo.SEGMENT_MODE)
+    assert after == before
+
+
+def test_worker_progress_is_forwarded(branch_jobs):
+    log = reporting.ProgressLog()
+    done = []
+    list(runner.run_branches(branch_jobs(("DEPO",)), workers=1, progress=log,
+                             on_complete=lambda b, i, n: done.append((b, i, n))))
+    assert done == [("DEPO", 1, 1)]
+    assert any("Segmen 1" in message for _, message in log.messages)
@@ -0,0 +1,69 @@
+# tests/test_solve_cache.py
+import numpy as np
+import pytest
+import solve_cache
+import subset_sum
+
+
+def test_key_depends_on_multiset_and_tolerance_only():
+    cache = solve_cache.SolveCache()
+    key_a, _ = cache.canonical(np.array([5, -3, -2], dtype=np.int64), 0)
+    key_b, _ = cache.canonical(np.array([-2, 5, -3], dtype=np.int64), 0)
+    key_c, _ = cache.canonical(np.array([-2, 5, -3], dtype=np.int64), 1)
+    key_d, _ = cache.canonical(np.array([5, -3, -3], dtype=np.int64), 0)
+    assert key_a == key_b
+    assert len({key_a, key_c, key_d}) == 3
+
+
+def test_group_is_remapped_to_new_row_order():
+    cache = solve_cache.SolveCache()
+    first = np.array([7, 5, -5, 1], dtype=np.int64)
+    key, order = cache.canonical(first, 0)
+    cache.put(key, order, [1, 2], True, 1000)
+    second = np.array([-5, 1, 7, 5], dtype=np.int64)
+    key2, order2 = cache.canonical(second, 0)
+    group, proven = cache.get(key2, order2, 1000)
+    assert proven and group == [0, 3]
+    assert second[group].sum() == 0
+
+
+def test_unproven_entry_only_reused_for_same_or_lower_limit():
+    cache = solve_cache.SolveCache()
+    cents = np.array([4, -4], dtype=np.int64)
+    key, order = cache.canonical(cents, 0)
+    cache.put(key, order, [0, 1], False, 2000)
+    assert cache.get(key, order, 1000) is not None
+    assert cache.get(key, order, 5000) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_lru_evicts_oldest():
+    cache = solve_cache.SolveCache(memory_entries=2)
+    for i in range(3):
+        cents = np.array([i + 1, -(i + 1)], dtype=np.int64)
+        key, order = cache.canonical(cents, 0)
+        cache.put(key, order, [0, 1], True, 0)
+    assert len(cache.memory) == 2
+    key0, order0 = cache.canonical(np.array([1, -1], dtype=np.int64), 0)
+    assert cache.get(key0, order0, 0) is None
+
+
+def test_disk_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "solver.sqlite")
+    cents = np.array([9, -4, -5, 2], dtype=np.int64)
+    writer = solve_cache.SolveCache(path)
+    key, order = writer.canonical(cents, 0)
+    writer.put(key, order, [0, 1, 2], True, 100)
+    reader = solve_cache.SolveCache(path)
+    assert reader.get(key, order, 100) == ([0, 1, 2], True)
+
+
+def test_find_max_uses_cache(monkeypatch):
+    cache = solve_cache.SolveCache()
+    monkeypatch.setattr(subset_sum, "CACHE", cache)
+    monkeypatch.setattr(subset_sum, "TIME_BUDGET", None)
+    cents = np.array([3, -1, -2, 10], dtype=np.int64)
+    first = subset_sum.find_max_zero_sum_group(cents, tol_cents=0)
+    second = subset_sum.find_max_zero_sum_group(cents[::-1].copy(), tol_cents=0)
+    assert first == [0, 1, 2] and second == [1, 2, 3]
+    assert cache.hits == 1
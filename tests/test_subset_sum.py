@@ -0,0 +1,163 @@
+# tests/test_subset_sum.py
+import itertools
+import numpy as np
+import pytest
+import subset_sum
+
+
+def brute_force_size(vals, tol):
+    # Kardinalitas grup terbesar (minimal 2) dengan |sum| <= tol; 0 jika tidak ada
+    for size in range(len(vals), 1, -1):
+        for combo in itertools.combinations(vals, size):
+            if abs(sum(combo)) <= tol: return size
+    return 0
+
+
+def assert_disjoint_balanced(vals, groups, tol):
+    used = np.concatenate(groups) if groups else np.array([], dtype=np.int64)
+    assert len(used) == len(set(used.tolist()))
+    for g in groups:
+        assert len(g) >= 2 and abs(int(vals[g].sum())) <= tol
+
+
+def random_cases(count, n, seed, tol=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield rng.integers(-60, 61, size=n).astype(np.int64), tol
+
+
+def check_group(vals, group, tol):
+    group = list(group)
+    assert len(set(group)) == len(group)
+    if group: assert abs(int(vals[group].sum())) <= tol
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(subset_sum, "CACHE", None)
+    monkeypatch.setattr(subset_sum, "TIME_BUDGET", None)
+
+
+@pytest.mark.parametrize("vals,tol", list(random_cases(30, 10, seed=1)) + list(random_cases(10, 10, seed=2, tol=3)))
+def test_find_max_matches_brute_force(vals, tol):
+    group = subset_sum.find_max_zero_sum_group(vals, tol_cents=tol, time_limit_ms=2000)
+    check_group(vals, group, tol)
+    assert len(group) == brute_force_size(vals.tolist(), tol)
+
+
+@pytest.mark.parametrize("vals,tol", list(random_cases(15, 11, seed=3)))
+def test_mitm_matches_brute_force(vals, tol):
+    # Jalur exact dipanggil langsung: hasil boleh kosong / 1 item, jadi bandingkan dengan >= 2 saja
+    chosen = subset_sum._solve_mitm(vals, tol)
+    check_group(vals, chosen, tol)
+    assert (len(chosen) if len(chosen) >= 2 else 0) == brute_force_size(vals.tolist(), tol)
+
+
+@pytest.mark.parametrize("vals,tol", list(random_cases(15, 11, seed=4)))
+def test_dp_matches_brute_force(vals, tol):
+    chosen = subset_sum._solve_dp(vals, tol)
+    check_group(vals, chosen, tol)
+    assert (len(chosen) if len(chosen) >= 2 else 0) == brute_force_size(vals.tolist(), tol)
+
+
+@pytest.mark.parametrize("vals,tol", list(random_cases(5, 9, seed=5)))
+def test_scip_matches_brute_force(vals, tol):
+    chosen, proven = subset_sum._solve_scip(vals, tol, 5000, hint=subset_sum._greedy_seed(vals, tol))
+    assert proven
+    check_group(vals, chosen, tol)
+    assert (len(chosen) if len(chosen) >= 2 else 0) == brute_force_size(vals.tolist(), tol)
+
+
+def test_zero_values_always_join_group():
+    vals = np.array([0, 5, -5, 0, 7], dtype=np.int64)
+    assert subset_sum.find_max_zero_sum_group(vals, tol_cents=0) == [0, 1, 2, 3]
+
+
+def test_gcd_scaling_keeps_solution():
+    vals = np.array([300, -200, -100, 700, 50_000], dtype=np.int64)
+    group = subset_sum.find_max_zero_sum_group(vals, tol_cents=0)
+    assert group == [0, 1, 2]
+
+
+def test_no_group_returns_empty_with_proof():
+    group, proven = subset_sum.find_max_zero_sum_group(np.array([1, 2, 4, 8], dtype=np.int64), tol_cents=0, with_proof=True)
+    assert group == [] and proven
+
+
+def test_exact_only_mode_does_not_call_scip():
+    # time_limit_ms=0: jika jalur exact tidak muat, hasil kosong & tidak terbukti
+    rng = np.random.default_rng(6)
+    vals = rng.integers(-10**9, 10**9, size=60).astype(np.int64)
+    group, proven = subset_sum.find_max_zero_sum_group(vals, tol_cents=0, time_limit_ms=0, with_proof=True)
+    assert group == [] and not proven
+
+
+def test_solve_group_loop_groups_are_disjoint_and_balanced():
+    rng = np.random.default_rng(7)
+    vals = rng.integers(-50, 51, size=14).astype(np.int64)
+    groups = subset_sum.solve_group_loop(vals, tol_cents=0, time_limit_ms=2000)
+    used = np.concatenate(groups) if groups else np.array([], dtype=np.int64)
+    assert len(used) == len(set(used.tolist()))
+    for g in groups:
+        assert len(g) >= 2 and vals[g].sum() == 0
+    rest = np.setdiff1d(np.arange(len(vals)), used)
+    assert brute_force_size(vals[rest].tolist(), 0) == 0
+
+
+def test_solve_clustered_finds_groups_within_and_across_windows():
+    # Window 0 balanced sendiri; 1 & 2 hanya seimbang bila digabung
+    vals = np.array([10, -10, 7, -4, -7, 4], dtype=np.int64)
+    keys = np.array([0, 0, 1, 1, 2, 2])
+    groups, proven = subset_sum.solve_clustered(vals, keys, tol_cents=0, time_limit_ms=2000, workers=1, with_proof=True)
+    assert proven
+    assert sorted(sorted(g.tolist()) for g in groups) == [[0, 1], [2, 3, 4, 5]]
+
+
+def test_solve_clustered_leftovers_are_proven_empty():
+    rng = np.random.default_rng(8)
+    vals = rng.integers(-40, 41, size=24).astype(np.int64)
+    keys = np.repeat(np.arange(4), 6)
+    groups, proven = subset_sum.solve_clustered(vals, keys, tol_cents=0, time_limit_ms=2000, workers=1, with_proof=True)
+    used = np.concatenate(groups) if groups else np.array([], dtype=np.int64)
+    assert len(used) == len(set(used.tolist()))
+    for g in groups:
+        assert vals[g].sum() == 0
+    assert proven
+    assert brute_force_size(vals[np.setdiff1d(np.arange(len(vals)), used)].tolist(), 0) == 0
+
+
+def test_solve_clustered_skips_settled_rows():
+    vals = np.array([3, -3, 5, -5], dtype=np.int64)
+    keys = np.array([0, 0, 1, 1])
+    groups = subset_sum.solve_clustered(vals, keys, tol_cents=0, workers=1, settled=np.ones(4, dtype=bool))
+    assert groups == []
+
+
+def test_joint_mode_beats_greedy_loop_with_tolerance():
+    # Grup terbesar dulu memasang 5 baris; tiga pasangan (|sum| <= 1) memasang 6
+    vals = np.array([-1, 0, 5, 9, -9, -7, 6], dtype=np.int64)
+    loop = subset_sum.solve_groups(vals, 1, 2000, mode="loop")
+    joint = subset_sum.solve_groups(vals, 1, 2000, mode="joint")
+    assert sum(map(len, loop)) == 5
+    assert sum(map(len, joint)) == 6
+    assert_disjoint_balanced(vals, joint, 1)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_joint_mode_matches_or_beats_loop(seed):
+    rng = np.random.default_rng(seed)
+    vals = rng.integers(-40, 41, size=12).astype(np.int64)
+    loop = subset_sum.solve_groups(vals, 2, 1000, mode="loop")
+    joint, proven = subset_sum.solve_groups(vals, 2, 1000, mode="joint", with_proof=True)
+    assert sum(map(len, joint)) >= sum(map(len, loop))
+    assert_disjoint_balanced(vals, joint, 2)
+
+
+def test_joint_mode_falls_back_to_loop(monkeypatch):
+    vals = np.array([-1, 0, 5, 9, -9, -7, 6], dtype=np.int64)
+    monkeypatch.setattr(subset_sum, "JOINT_MAX_VARS", 1)
+    loop = subset_sum.solve_groups(vals, 1, 2000, mode="loop")
+    joint = subset_sum.solve_groups(vals, 1, 2000, mode="joint")
+    assert [g.tolist() for g in joint] == [g.tolist() for g in loop]
+    with pytest.raises(ValueError):
+        subset_sum.solve_groups(vals, 1, 2000, mode="single")
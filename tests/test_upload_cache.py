@@ -0,0 +1,81 @@
+# tests/test_upload_cache.py
+import datetime
+import io
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import upload_cache
+import utils
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache")
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", path)
+    monkeypatch.setattr(upload_cache, "CACHE_MAX_BYTES", 1024 * 1024)
+    return path
+
+
+def sample_frame():
+    return pd.DataFrame({
+        "Net": [1.5, -2.25, np.nan],
+        "Keperluan": ["A", None, "C"],
+        "Tanggal": [datetime.date(2024, 1, 1), None, datetime.date(2024, 1, 3)],
+        "Campur": [1, "teks", datetime.datetime(2024, 1, 2, 3, 4)],
+        "Campur2": [None, 2.5, pd.Timestamp("2024-01-01")],
+        "Bool": [True, False, True],
+    })
+
+
+def assert_same(got, expected):
+    # Nilai kosong boleh berubah None -> NaN; nilai lain harus sama persis, termasuk tipenya
+    assert list(got.columns) == list(expected.columns)
+    for col in expected.columns:
+        assert got[col].isna().tolist() == expected[col].isna().tolist(), col
+        assert [(type(v), v) for v in got[col].dropna()] == [(type(v), v) for v in expected[col].dropna()], col
+
+
+def test_round_trip_keeps_values_and_types(cache_dir):
+    df = sample_frame()
+    upload_cache._store_entry("k", [df, df.iloc[:0]])
+    frames = upload_cache._load_entry("k")
+    assert frames is not None
+    assert_same(frames[0], df)
+    assert frames[1].shape == (0, len(df.columns))
+
+
+def test_no_pickle_files_and_private_dir(cache_dir):
+    upload_cache._store_entry("k", [sample_frame()])
+    files = os.listdir(os.path.join(cache_dir, "k"))
+    assert not [f for f in files if f.endswith(".pkl")]
+    assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="cek pemilik hanya di POSIX")
+def test_unsafe_dir_is_not_used(cache_dir):
+    upload_cache._store_entry("k", [sample_frame()])
+    os.chmod(cache_dir, 0o777)
+    assert upload_cache._load_entry("k") is None
+    assert os.path.isdir(os.path.join(cache_dir, "k"))   # tidak dihapus dari direktori asing
+
+
+def test_unknown_value_type_is_not_cached(cache_dir):
+    df = pd.DataFrame({"Campur": [1, "a", object()]})
+    upload_cache._store_entry("k", [df])
+    assert upload_cache._load_entry("k") is None
+
+
+def test_cached_loader_parses_once(cache_dir, monkeypatch):
+    calls = []
+
+    def parse(file, sheet_indices, columns=None, progress=None):
+        calls.append(file.read())
+        return sample_frame(), sample_frame()
+
+    monkeypatch.setattr(utils, "load_excel_sheets", parse)
+    first = upload_cache.load_excel_sheets_cached(io.BytesIO(b"isi"), (0, 1))
+    second = upload_cache.load_excel_sheets_cached(io.BytesIO(b"isi"), (0, 1))
+    upload_cache.load_excel_sheets_cached(io.BytesIO(b"isi lain"), (0, 1))
+    assert calls == [b"isi", b"isi lain"]
+    assert_same(second[1], first[1])
@@ -0,0 +1,111 @@
+# tests/test_writer.py
+import io
+import os
+import zipfile
+import openpyxl
+import pandas as pd
+import pytest
+import money
+import writer
+
+
+def block(nomor, net, tempat="KARET", tanggal="2024-01-02"):
+    df = pd.DataFrame({
+        "Tanggal Kasir": pd.to_datetime([tanggal] * len(net)),
+        "Nomor Dokumen": nomor,
+        "Keperluan": [f"KEP {n}" for n in nomor],
+        "Debet": [max(v, 0) for v in net],
+        "Kredit": [max(-v, 0) for v in net],
+        "Tempat Pembayaran": tempat,
+        "Net": [float(v) for v in net],
+    })
+    money.add_net_cents(df)
+    return df
+
+
+@pytest.fixture
+def results_list():
+    return [
+        ("MATCH BS", block(["A1", "A2"], [150.25, -150.25])),
+        ("BKK", block([], [])),
+        ("DATA GANTUNG KARET (PUSAT)", block(["G1"], [75.5])),
+    ]
+
+
+def sheet_rows(path, sheet):
+    ws = openpyxl.load_workbook(path, read_only=True)[sheet]
+    return [list(r) for r in ws.iter_rows(values_only=True)]
+
+
+def test_streaming_workbook_round_trip(tmp_path, results_list):
+    book = writer.StreamingWorkbook(str(tmp_path / "out.xlsx"))
+    book.write_branch("MEDAN", results_list, " (Ledger)")
+    book.write_table("METRICS", pd.DataFrame({"Tahap": ["BS"], "Detik": [0.5]}))
+    path = book.close()
+
+    assert openpyxl.load_workbook(path, read_only=True).sheetnames == ["MEDAN", "METRICS"]
+    rows = sheet_rows(path, "MEDAN")
+    assert rows[0][0] == "Cabang: MEDAN (Ledger)"
+    # Blok: judul, header, baris data, TOTAL, lalu 2 baris kosong; kategori kosong dilewati
+    header = ["Tanggal Kasir", "Nomor Dokumen", "Keperluan", "Debet", "Kredit", "Tempat Pembayaran", "Net"]
+    assert rows[2][0] == "MATCH BS"
+    assert rows[3] == header
+    assert [r[1] for r in rows[4:6]] == ["A1", "A2"]
+    assert rows[6][2] == "TOTAL" and rows[6][3:5] == [150.25, 150.25] and rows[6][6] == 0
+    assert rows[9][0] == "DATA GANTUNG KARET (PUSAT)"
+    assert rows[10] == header
+    assert rows[11][1] == "G1" and rows[11][0] == pd.Timestamp("2024-01-02")
+    assert rows[12][2] == "TOTAL" and rows[12][6] == 75.5
+    assert "BKK" not in [r[0] for r in rows]
+    assert sheet_rows(path, "METRICS") == [["Tahap", "Detik"], ["BS", 0.5]]
+
+
+def test_streaming_workbook_highlights_gantung_only(tmp_path, results_list):
+    book = writer.StreamingWorkbook(str(tmp_path / "out.xlsx"))
+    book.write_branch("MEDAN", results_list)
+    ws = openpyxl.load_workbook(book.close())["MEDAN"]
+    assert ws.cell(row=5, column=2).fill.fgColor.rgb != "FFFFFF00"
+    assert ws.cell(row=12, column=2).fill.fgColor.rgb == "FFFFFF00"
+
+
+def test_read_and_remove_returns_bytes(results_list):
+    book = writer.StreamingWorkbook()
+    book.write_branch("MEDAN", results_list)
+    book.close()
+    data = book.read_and_remove()
+    assert data[:2] == b"PK"
+    assert not os.path.exists(book.path)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_bundle_export_round_trip(tmp_path, results_list, fmt):
+    bundle = writer.BundleExport(fmt, str(tmp_path / "out.zip"))
+    bundle.write_branch("MEDAN", results_list)
+    bundle.write_branch("JKT/PUSAT", results_list[:1])
+    with zipfile.ZipFile(bundle.close()) as z:
+        assert z.namelist() == [f"MEDAN.{fmt}", f"JKT_PUSAT.{fmt}"]
+        read = pd.read_csv if fmt == "csv" else pd.read_parquet
+        df = read(io.BytesIO(z.read(f"MEDAN.{fmt}")))
+    assert list(df.columns[:2]) == ["Cabang", "Kategori"]
+    assert (df["Cabang"] == "MEDAN").all()
+    # Kategori kosong tidak muncul; urutan blok sama dengan results_list
+    assert df["Kategori"].tolist() == ["MATCH BS", "MATCH BS", "DATA GANTUNG KARET (PUSAT)"]
+    assert df["Nomor Dokumen"].tolist() == ["A1", "A2", "G1"]
+    assert df["Net"].tolist() == [150.25, -150.25, 75.5]
+    assert money.NET_CENTS not in df.columns and money.GROUP_KEY not in df.columns
+
+
+def test_bundle_export_xlsx_matches_streaming_workbook(tmp_path, results_list):
+    bundle = writer.BundleExport("xlsx", str(tmp_path / "out.zip"))
+    bundle.write_branch("MEDAN", results_list)
+    book = writer.StreamingWorkbook(str(tmp_path / "single.xlsx"))
+    book.write_branch("MEDAN", results_list)
+    with zipfile.ZipFile(bundle.close()) as z:
+        assert z.namelist() == ["MEDAN.xlsx"]
+        z.extract("MEDAN.xlsx", tmp_path / "unzipped")
+    assert sheet_rows(tmp_path / "unzipped" / "MEDAN.xlsx", "MEDAN") == sheet_rows(book.close(), "MEDAN")
+
+
+def test_bundle_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        writer.BundleExport("json", str(tmp_path / "out.zip"))
@@ -0,0 +1,206 @@
+# upload_cache.py
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import utils
+
+# Cache hasil parsing upload (per isi file), format Arrow IPC agar bisa di-memory-map
+# Default per user; direktori dibuat 0700 dan dicek pemiliknya sebelum dipakai (lihat _cache_dir)
+_USER = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+CACHE_DIR = os.environ.get("AUTO_RK_CACHE_DIR", os.path.join(tempfile.gettempdir(), f"auto_rk_cache_{_USER}"))
+CACHE_MAX_BYTES = int(os.environ.get("AUTO_RK_CACHE_MAX_MB", "1024")) * 1024 * 1024   # 0 = cache mati
+CACHE_VERSION = 2
+
+
+def load_excel_sheets_cached(file, sheet_indices=(0, 1), columns=None, progress=None):
+    """
+    Sama seperti utils.load_excel_sheets, tetapi hasil parsing disimpan di cache disk
+    dengan key hash isi file. Upload file yang sama berikutnya tidak diparse ulang.
+    """
+    data = _read_bytes(file)
+    if CACHE_MAX_BYTES <= 0:
+        return utils.load_excel_sheets(io.BytesIO(data), sheet_indices, columns=columns, progress=progress)
+
+    key = cache_key(data, sheet_indices, columns)
+    frames = _load_entry(key)
+    if frames is not None:
+        return frames
+
+    frames = utils.load_excel_sheets(io.BytesIO(data), sheet_indices, columns=columns, progress=progress)
+    if all(df is not None for df in frames):
+        try:
+            _store_entry(key, frames)
+            _evict(CACHE_MAX_BYTES)
+        except OSError:
+            pass  # cache hanya optimasi; gagal tulis tidak menghentikan proses
+    return frames
+
+
+def cache_key(data, sheet_indices, columns):
+    h = hashlib.sha256(data)
+    h.update(json.dumps([CACHE_VERSION, list(sheet_indices), columns]).encode())
+    return h.hexdigest()
+
+
+def _read_bytes(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+def _entry_dir(key):
+    return os.path.join(CACHE_DIR, key)
+
+
+# Kolom object dengan satu tipe nilai aman disimpan di Arrow tanpa mengubah tipe
+_ARROW_SAFE_KINDS = {"string", "empty", "integer", "floating", "boolean", "datetime", "date"}
+# Kolom bertipe campuran disimpan sebagai struct (tag tipe, nilai teks)
+_TAGGED_TYPE = pa.struct([("tag", pa.string()), ("value", pa.string())])
+
+
+def _cache_dir():
+    """
+    Buat CACHE_DIR (mode 0700) dan pastikan milik user ini & tidak bisa ditulis user lain.
+    OSError jika tidak aman; pemanggil menganggap cache tidak tersedia.
+    """
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    st = os.stat(CACHE_DIR)
+    if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        raise OSError(f"Direktori cache tidak aman: {CACHE_DIR}")
+    return CACHE_DIR
+
+
+def _store_entry(key, frames):
+    cache_dir = _cache_dir()
+    target = _entry_dir(key)
+    if os.path.isdir(target): return
+    tmp = tempfile.mkdtemp(prefix=".tmp_", dir=cache_dir)
+    try:
+        meta = {"sheets": []}
+        for i, df in enumerate(frames):
+            sheet = _store_sheet(tmp, f"sheet_{i}", df)
+            if sheet is None:   # ada nilai yang tidak bisa disimpan: upload ini tidak di-cache
+                shutil.rmtree(tmp, ignore_errors=True)
+                return
+            meta["sheets"].append(sheet)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(target): raise
+
+
+def _store_sheet(path, name, df):
+    object_cols, mixed_cols = [], []
+    for col in df.columns:
+        if df[col].dtype != object: continue
+        if pd.api.types.infer_dtype(df[col], skipna=True) in _ARROW_SAFE_KINDS:
+            object_cols.append(col)
+        else:
+            mixed_cols.append(col)
+
+    try:
+        table = pa.Table.from_pandas(df.drop(columns=mixed_cols), preserve_index=None)
+        for col in mixed_cols:
+            tags, values = zip(*map(_encode_value, df[col])) if len(df) else ((), ())
+            table = table.append_column(pa.field(str(col), _TAGGED_TYPE),
+                                        pa.StructArray.from_arrays([pa.array(tags, pa.string()), pa.array(values, pa.string())],
+                                                                   fields=list(_TAGGED_TYPE)))
+    except (TypeError, pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+    with pa.OSFile(os.path.join(path, name + ".arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return {"name": name, "columns": [str(c) for c in df.columns],
+            "object_columns": [str(c) for c in object_cols], "mixed_columns": [str(c) for c in mixed_cols]}
+
+
+def _encode_value(value):
+    # (tag, teks) untuk satu nilai kolom campuran; TypeError jika tipenya tidak dikenal
+    if value is None: return "none", None
+    if value is pd.NaT: return "nat", None
+    if isinstance(value, (bool, np.bool_)): return "bool", "1" if value else ""
+    if isinstance(value, (int, np.integer)): return "int", str(int(value))
+    if isinstance(value, (float, np.floating)): return "float", repr(float(value))
+    if isinstance(value, str): return "str", value
+    if isinstance(value, pd.Timestamp): return "timestamp", value.isoformat()
+    if isinstance(value, datetime.datetime): return "datetime", value.isoformat()
+    if isinstance(value, datetime.date): return "date", value.isoformat()
+    if isinstance(value, datetime.time): return "time", value.isoformat()
+    raise TypeError(f"Tipe nilai tidak didukung cache: {type(value).__name__}")
+
+
+_DECODERS = {
+    "none": lambda v: None, "nat": lambda v: pd.NaT, "bool": bool, "int": int, "float": float, "str": str,
+    "timestamp": pd.Timestamp, "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat, "time": datetime.time.fromisoformat,
+}
+
+
+def _load_entry(key):
+    path = _entry_dir(key)
+    meta_path = os.path.join(path, "meta.json")
+    try:
+        _cache_dir()
+    except OSError:
+        return None
+    if not os.path.isfile(meta_path):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        frames = [_load_sheet(path, sheet) for sheet in meta["sheets"]]
+        os.utime(path)  # tandai baru dipakai (LRU)
+        return frames
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+
+
+def _load_sheet(path, sheet):
+    with pa.memory_map(os.path.join(path, sheet["name"] + ".arrow"), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    # Kolom non-object langsung dari memory map (tanpa salinan jika tipenya memungkinkan)
+    special = set(sheet["object_columns"]) | set(sheet["mixed_columns"])
+    df = table.select([name for name in table.schema.names if name not in special]).to_pandas(split_blocks=True)
+    # Kolom object dikembalikan sebagai nilai Python asli (kosong = NaN)
+    for col in sheet["object_columns"]:
+        values = table.column(col).to_pandas(integer_object_nulls=True, date_as_object=True,
+                                             timestamp_as_object=True).astype(object)
+        df[col] = values.where(values.notna(), np.nan).set_axis(df.index)
+    for col in sheet["mixed_columns"]:
+        column = table.column(col).combine_chunks()
+        df[col] = pd.Series([_DECODERS[tag](value) for tag, value in
+                             zip(column.field("tag").to_pylist(), column.field("value").to_pylist())],
+                            index=df.index, dtype=object)
+    return df[sheet["columns"]]
+
+
+def _evict(max_bytes):
+    """
+    Hapus entry yang paling lama tidak dipakai sampai total ukuran cache <= max_bytes.
+    """
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.startswith(".") or not os.path.isdir(path): continue
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        entries.append((os.path.getmtime(path), size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes: break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
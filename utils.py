@@ -1,117 +1,275 @@
 # utils.py
 import pandas as pd
-import streamlit as st
-from ortools.linear_solver import pywraplp
+import numpy as np
+import bisect
+import openpyxl
+import budget
+import money
+import reporting
+import subset_sum
 
-def load_excel_with_header_detection(file, sheet_idx):
-    try:
-        df_raw = pd.read_excel(file, sheet_name=sheet_idx, header=None)
-        header_idx = None
-        for idx, row in df_raw.iterrows():
-            if row.count() >= 5: 
-                header_idx = idx
-                break
-        if header_idx is None:
-            st.error(f"Tidak dapat menemukan header valid (>= 5 kolom terisi) di Sheet index {sheet_idx}.")
-            return None
-
-        raw_headers = df_raw.iloc[header_idx].values
-        headers_clean = [str(x).strip() if pd.notna(x) else f"Unnamed_{i}" for i, x in enumerate(raw_headers)]
-        
-        seen_counts = {}
-        final_headers = []
-        for col in headers_clean:
-            if col in seen_counts:
-                seen_counts[col] += 1
-                final_headers.append(f"{col}.{seen_counts[col]}")
-            else:
-                seen_counts[col] = 0
-                final_headers.append(col)
-
-        df_final = df_raw.iloc[header_idx + 1:].copy()
-        df_final.columns = final_headers
-        df_final.reset_index(drop=True, inplace=True)
-        
-        cols_to_check = ["Dibayarkan (ke/dari)", "Keperluan"]
-        existing_cols = [c for c in cols_to_check if c in df_final.columns]
-        if existing_cols:
-            df_final.dropna(subset=existing_cols, inplace=True)
-        
-        return df_final
+# Kolom yang dipakai algoritma (untuk proyeksi kolom saat baca Excel)
+USED_COLUMNS = [
+    "Debet", "Kredit", "Keperluan", "ID Dokumen", "Nomor Dokumen", "Jenis Dokumen", "Sumber Dokumen",
+    "Tanggal Kasir", "Tanggal Delivery", "Tanggal", "Tempat Pembayaran", "Nama Kode", "Dibayarkan (ke/dari)",
+]
+HEADER_SCAN_ROWS = 50
+RECON_TIME_LIMIT_MS = 5000   # batas waktu per panggilan solver di reconcile_global_no_group
+# Sama dengan default na_values pd.read_excel
+_EXCEL_NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+def load_excel_with_header_detection(file, sheet_idx, columns=None, progress=None):
+    return load_excel_sheets(file, (sheet_idx,), columns=columns, progress=progress)[0]
 
+def load_excel_sheets(file, sheet_indices=(0, 1), columns=None, progress=None):
+    """
+    Baca beberapa sheet sekaligus (workbook dibuka sekali, mode read-only/streaming).
+    columns: jika diisi (mis. USED_COLUMNS), hanya kolom tersebut yang diambil.
+    progress: callback progress(level, message) untuk pesan error (default: logging).
+    Return list DataFrame (None untuk sheet yang gagal dibaca).
+    """
+    progress = reporting.resolve(progress)
+    try:
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True, keep_links=False)
     except Exception as e:
-        st.error(f"Error reading sheet {sheet_idx}: {str(e)}")
+        progress("error", f"Error reading file: {str(e)}")
+        return [None for _ in sheet_indices]
+    try:
+        frames = []
+        for sheet_idx in sheet_indices:
+            try:
+                frames.append(_read_sheet_streaming(wb.worksheets[sheet_idx], sheet_idx, columns, progress))
+            except Exception as e:
+                progress("error", f"Error reading sheet {sheet_idx}: {str(e)}")
+                frames.append(None)
+        return frames
+    finally:
+        wb.close()
+
+def _clean_cell(value):
+    # Samakan dengan konversi pd.read_excel: kosong/teks NA -> NaN, float bulat -> int
+    if value is None: return np.nan
+    if isinstance(value, str):
+        return np.nan if value in _EXCEL_NA_STRINGS else value
+    if isinstance(value, float) and value.is_integer(): return int(value)
+    return value
+
+def _read_sheet_streaming(ws, sheet_idx, columns=None, progress=reporting.log_progress):
+    rows = ws.iter_rows(values_only=True)
+
+    # Cari header (>= 5 kolom terisi) hanya di beberapa baris pertama
+    header = None
+    for scanned, raw in enumerate(rows, start=1):
+        values = [_clean_cell(v) for v in raw]
+        if sum(1 for v in values if not (isinstance(v, float) and np.isnan(v))) >= 5:
+            header = values
+            break
+        if scanned >= HEADER_SCAN_ROWS: break
+    if header is None:
+        progress("error", f"Tidak dapat menemukan header valid (>= 5 kolom terisi) di Sheet index {sheet_idx}.")
         return None
 
-def find_offset_pairs(df):
-    df['Net'] = df['Net'].astype(float).round(2)
+    # Baca data; lebar tabel = sel terisi paling kanan (termasuk baris header)
+    data = []
+    width = _last_filled(header)
+    for raw in rows:
+        values = [_clean_cell(v) for v in raw]
+        last = _last_filled(values)
+        data.append(values[:last])
+        width = max(width, last)
+    while data and not data[-1]:
+        data.pop()
+
+    raw_headers = header[:width] + [np.nan] * (width - len(header[:width]))
+    headers_clean = [str(x).strip() if pd.notna(x) else f"Unnamed_{i}" for i, x in enumerate(raw_headers)]
+    
+    seen_counts = {}
+    final_headers = []
+    for col in headers_clean:
+        if col in seen_counts:
+            seen_counts[col] += 1
+            final_headers.append(f"{col}.{seen_counts[col]}")
+        else:
+            seen_counts[col] = 0
+            final_headers.append(col)
+
+    # Proyeksi kolom: hanya materialisasi kolom yang dipakai
+    if columns is not None:
+        keep = [i for i, col in enumerate(final_headers) if col in set(columns)]
+    else:
+        keep = list(range(width))
+    # Baris header ikut saat inferensi dtype agar hasilnya sama dengan pd.read_excel(header=None)
+    col_data = {
+        final_headers[i]: pd.Series([raw_headers[i]] + [row[i] if i < len(row) else np.nan for row in data], dtype=object).infer_objects()
+        for i in keep
+    }
+    df_final = pd.DataFrame(col_data, columns=[final_headers[i] for i in keep])
+    df_final = df_final.iloc[1:].reset_index(drop=True)
+    
+    cols_to_check = ["Dibayarkan (ke/dari)", "Keperluan"]
+    existing_cols = [c for c in cols_to_check if c in df_final.columns]
+    if existing_cols:
+        df_final.dropna(subset=existing_cols, inplace=True)
+    
+    return df_final
+
+def _last_filled(values):
+    for i in range(len(values) - 1, -1, -1):
+        v = values[i]
+        if not (isinstance(v, float) and np.isnan(v)): return i + 1
+    return 0
+
+def find_offset_pairs(df, window_days=0):
     tgl_col = 'Tanggal Delivery' if 'Tanggal Delivery' in df.columns else 'Tanggal Kasir'
     
     if tgl_col in df.columns:
         df[tgl_col] = pd.to_datetime(df[tgl_col], dayfirst=True, errors='coerce')
         df['Match_ID'] = None        
         df['Is_Matched'] = False      
-        match_counter = 1
-        
-        for tanggal, group in df.groupby(tgl_col):
-            if pd.isna(tanggal): continue
-            positives = group[(group['Net'] > 0) & (~group['Is_Matched'])]
-            for idx_pos, row_pos in positives.iterrows():
-                if df.at[idx_pos, 'Is_Matched']: continue
-                target_val = -row_pos['Net']
-                current_loc = row_pos['Tempat Pembayaran']
-                candidates = df[
-                    (df['Net'] == target_val) & 
-                    (df[tgl_col] == tanggal) &
-                    (df['Is_Matched'] == False) &
-                    (df['Tempat Pembayaran'] != current_loc)
-                ]
-                if not candidates.empty:
-                    idx_neg = candidates.index[0]
-                    match_id = f"MATCH_{match_counter:04d}"
-                    df.at[idx_pos, 'Is_Matched'] = True
-                    df.at[idx_pos, 'Match_ID'] = match_id
-                    df.at[idx_neg, 'Is_Matched'] = True
-                    df.at[idx_neg, 'Match_ID'] = match_id
-                    match_counter += 1
+
+        dates = df[tgl_col].values
+        cents = money.net_cents(df)
+        locs = df['Tempat Pembayaran'].values
+        pairs = _pair_same_date(dates, cents, locs)
+        # Pass kedua: pasangan yang tanggalnya selisih maksimal window_days hari
+        if window_days and window_days > 0:
+            available = np.ones(len(df), dtype=bool)
+            available[pairs.ravel()] = False
+            pairs = np.concatenate([pairs, _pair_within_window(dates, cents, locs, available, window_days)])
+        if len(pairs):
+            match_ids = np.array([f"MATCH_{i:04d}" for i in range(1, len(pairs) + 1)], dtype=object)
+            positions = np.concatenate([pairs[:, 0], pairs[:, 1]])
+            df.iloc[positions, df.columns.get_loc('Match_ID')] = np.concatenate([match_ids, match_ids])
+            df.iloc[positions, df.columns.get_loc('Is_Matched')] = True
     return df
 
+def _pair_same_date(dates, cents, locs):
+    """
+    Hash-join baris positif vs negatif pada key (tanggal, nominal sen), satu-lawan-satu,
+    dengan Tempat Pembayaran harus berbeda. Hasil = array [posisi_positif, posisi_negatif]
+    dalam urutan MATCH_#### (urut tanggal, lalu urutan baris positif).
+    """
+    frame = pd.DataFrame({'d': dates, 'a': np.abs(cents), 'p': np.arange(len(cents)), 'loc': locs})
+    valid = frame['d'].notna().values
+    pos = frame[valid & (cents > 0)]
+    neg = frame[valid & (cents < 0)]
+    if pos.empty or neg.empty:
+        return np.empty((0, 2), dtype=np.int64)
+    pos = pos.assign(r=pos.groupby(['d', 'a']).cumcount())
+    neg = neg.assign(r=neg.groupby(['d', 'a']).cumcount())
+
+    # Key yang punya Tempat Pembayaran sama di kedua sisi harus diproses greedy
+    conflict = pos[['d', 'a', 'loc']].dropna().drop_duplicates().merge(
+        neg[['d', 'a', 'loc']].dropna().drop_duplicates(), on=['d', 'a', 'loc'])[['d', 'a']].drop_duplicates()
+    conflict['_slow'] = True
+    pos = pos.merge(conflict, on=['d', 'a'], how='left')
+    neg = neg.merge(conflict, on=['d', 'a'], how='left')
+    slow_pos = pos['_slow'].eq(True)
+    slow_neg = neg['_slow'].eq(True)
+
+    # Tanpa konflik: positif ke-r berpasangan dengan negatif ke-r pada key yang sama
+    fast = pos[~slow_pos].merge(neg[~slow_neg], on=['d', 'a', 'r'], suffixes=('_pos', '_neg'))
+    pairs = [fast[['d', 'p_pos', 'p_neg']].to_numpy(dtype=object)]
+
+    if slow_pos.any():
+        slow = []
+        neg_by_key = {}
+        for d, a, n, n_loc in neg.loc[slow_neg, ['d', 'a', 'p', 'loc']].sort_values('p').values.tolist():
+            neg_by_key.setdefault((d, a), []).append((n, n_loc))
+        for d, a, p, loc in pos.loc[slow_pos, ['d', 'a', 'p', 'loc']].sort_values('p').values.tolist():
+            candidates = neg_by_key.get((d, a), [])
+            for j, (n, n_loc) in enumerate(candidates):
+                if pd.isna(loc) or pd.isna(n_loc) or loc != n_loc:
+                    slow.append((d, p, n))
+                    del candidates[j]
+                    break
+        if slow:
+            pairs.append(np.array(slow, dtype=object))
+
+    result = pd.DataFrame(np.concatenate(pairs), columns=['d', 'p_pos', 'p_neg']).sort_values(['d', 'p_pos'])
+    return result[['p_pos', 'p_neg']].to_numpy(dtype=np.int64)
+
+def _pair_within_window(dates, cents, locs, available, window_days):
+    """
+    Pasangkan positif vs negatif dengan nominal sama dan tanggal paling dekat (maks
+    +/- window_days), satu-lawan-satu, Tempat Pembayaran berbeda. Per nominal, sisi
+    negatif disimpan terurut tanggal dan dicari dengan bisect.
+    Urutan hasil: tanggal baris positif, lalu urutan baris.
+    """
+    days = pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]').astype(np.int64)
+    valid = available & ~pd.isna(dates)
+    neg_index = {}
+    for p in np.flatnonzero(valid & (cents < 0))[np.argsort(days[valid & (cents < 0)], kind='stable')].tolist():
+        entry = neg_index.setdefault(-int(cents[p]), ([], []))
+        entry[0].append(int(days[p]))
+        entry[1].append(p)
+
+    pairs = []
+    pos_rows = np.flatnonzero(valid & (cents > 0))
+    for p in pos_rows[np.argsort(days[pos_rows], kind='stable')].tolist():
+        entry = neg_index.get(int(cents[p]))
+        if not entry or not entry[0]: continue
+        neg_days, neg_rows = entry
+        d = int(days[p])
+        best = None
+        start = bisect.bisect_left(neg_days, d - window_days)
+        for j in range(start, len(neg_days)):
+            if neg_days[j] > d + window_days: break
+            n = neg_rows[j]
+            if not (pd.isna(locs[p]) or pd.isna(locs[n]) or locs[p] != locs[n]): continue
+            if best is None or abs(neg_days[j] - d) < abs(neg_days[best] - d):
+                best = j
+        if best is not None:
+            pairs.append((p, neg_rows[best]))
+            del neg_days[best]
+            del neg_rows[best]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
 def solve_subset_sum(values, tolerance=1.0, time_limit_ms=7000):
-    solver = pywraplp.Solver.CreateSolver('SCIP')
-    if not solver: return []
-    n = len(values)
-    x = [solver.IntVar(0, 1, f'x_{i}') for i in range(n)]
-    constraint = solver.RowConstraint(-tolerance, tolerance, 'sum_constraint')
-    for i in range(n): constraint.SetCoefficient(x[i], values[i])
-    min_items = solver.RowConstraint(2, solver.infinity(), 'min_items')
-    for i in range(n): min_items.SetCoefficient(x[i], 1)
-    objective = solver.Objective()
-    for i in range(n): objective.SetCoefficient(x[i], 1)
-    objective.SetMaximization()
-    solver.SetTimeLimit(time_limit_ms)
-    status = solver.Solve()
-    selected_indices = []
-    if status == pywraplp.Solver.OPTIMAL or status == pywraplp.Solver.FEASIBLE:
-        for i in range(n):
-            if x[i].solution_value() > 0.5: selected_indices.append(i)
-    return selected_indices
-
-def reconcile_global_no_group(df, net_col='Net', tolerance=1.0):
+    # Engine integer sen (subset_sum.py); SCIP hanya dipakai jika jalur exact tidak muat
+    cents = money.to_cents(values)
+    tol_cents = money.tolerance_cents(tolerance)
+    return subset_sum.find_max_zero_sum_group(cents, tol_cents=tol_cents, time_limit_ms=time_limit_ms)
+
+def reconcile_global_no_group(df, net_col='Net', tolerance=1.0, date_col=None, cluster_days=subset_sum.CLUSTER_DAYS, workers=None, mode='loop', time_limit_ms=None, settled=None, with_proof=False):
+    """
+    mode: 'loop' (grup satu per satu) / 'joint' (+ satu model semua grup), lihat subset_sum.solve_groups.
+    settled: mask (sejajar baris df) baris yang sudah terbukti tidak punya grup seimbang,
+    mis. sisa RECON segmen Depo sebelumnya; cluster yang seluruhnya settled tidak di-solve ulang.
+    with_proof=True: return (df, proven), proven = baris yang tidak cocok terbukti tanpa grup.
+    """
     df = df.copy()
     df[net_col] = pd.to_numeric(df[net_col], errors='coerce').fillna(0)
     if 'Match_ID' not in df.columns: df['Match_ID'] = None
-    match_counter = 1
-    while True:
-        unmatched_indices = df[df['Match_ID'].isnull()].index.tolist()
-        current_values = df.loc[unmatched_indices, net_col].tolist()
-        if len(current_values) < 2: break
-        local_indices = solve_subset_sum(current_values, tolerance=tolerance, time_limit_ms=5000)
-        if not local_indices: break 
-        real_indices = [unmatched_indices[i] for i in local_indices]
-        match_id = f"GLOBAL_MATCH_{match_counter:04d}"
-        df.loc[real_indices, 'Match_ID'] = match_id
-        match_counter += 1
-    return df
+    unmatched_pos = np.flatnonzero(df['Match_ID'].isnull().values)
+    if len(unmatched_pos) < 2: return (df, True) if with_proof else df
+
+    cents = money.net_cents(df, net_col)[unmatched_pos]
+    keys = cluster_keys_by_date(df, unmatched_pos, date_col, cluster_days)
+    budget.open_stage(len(unmatched_pos))
+    if settled is not None: settled = np.asarray(settled, dtype=bool)[unmatched_pos]
+    groups, proven = subset_sum.solve_clustered(cents, keys, tol_cents=money.tolerance_cents(tolerance), time_limit_ms=time_limit_ms or RECON_TIME_LIMIT_MS, workers=workers, mode=mode, settled=settled, with_proof=True)
+
+    match_col = df.columns.get_loc('Match_ID')
+    for match_counter, local in enumerate(groups, start=1):
+        df.iloc[unmatched_pos[local], match_col] = f"GLOBAL_MATCH_{match_counter:04d}"
+    return (df, proven) if with_proof else df
+
+def cluster_keys_by_date(df, positions, date_col=None, cluster_days=subset_sum.CLUSTER_DAYS):
+    # Key cluster = nomor jendela tanggal; tanpa kolom tanggal semua baris jadi 1 cluster
+    if date_col is None:
+        date_col = 'Tanggal Delivery' if 'Tanggal Delivery' in df.columns else 'Tanggal Kasir'
+    if date_col not in df.columns or not cluster_days:
+        return np.zeros(len(positions), dtype=np.int64)
+    dates = pd.to_datetime(df[date_col].iloc[positions], dayfirst=True, errors='coerce')
+    days = (dates - pd.Timestamp(0)).dt.days
+    keys = (days // cluster_days).to_numpy(dtype=float)
+    # Baris tanpa tanggal dikumpulkan di cluster terakhir
+    fill = np.nanmax(keys) + 1 if np.isfinite(keys).any() else 0
+    return np.where(np.isnan(keys), fill, keys).astype(np.int64)
 
 def sort_by_tempat(df):
     if 'Net' in df.columns:
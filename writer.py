@@ -0,0 +1,196 @@
+# writer.py
+import datetime
+import io
+import os
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+import xlsxwriter
+import money
+import utils
+
+# Kolom yang dijumlahkan di baris TOTAL
+TOTAL_COLUMNS = ("Debet", "Kredit", "Net")
+GANTUNG_STYLE = {'bg_color': '#FFFF00', 'font_color': 'black'}
+# Format export alternatif (BundleExport)
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+_PARQUET_SAFE_KINDS = {"string", "empty", "integer", "floating", "boolean", "datetime", "date"}
+
+
+class StreamingWorkbook:
+    """
+    Penulis Output_RK.xlsx langsung ke xlsxwriter (mode constant_memory): baris ditulis
+    berurutan dan langsung di-flush ke file sementara di disk, bukan ke BytesIO.
+    Format sama dengan DataFrame.to_excel (header polos, tanggal ISO),
+    blok GANTUNG berlatar kuning, baris TOTAL dihitung sambil menulis.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="auto_rk_", suffix=".xlsx")
+            os.close(fd)
+        self.path = path
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        add = self.workbook.add_format
+        self.formats = {
+            False: {None: None, 'datetime': add({'num_format': 'YYYY-MM-DD HH:MM:SS'}), 'date': add({'num_format': 'YYYY-MM-DD'})},
+            True: {None: add(GANTUNG_STYLE),
+                   'datetime': add(dict(GANTUNG_STYLE, num_format='YYYY-MM-DD HH:MM:SS')),
+                   'date': add(dict(GANTUNG_STYLE, num_format='YYYY-MM-DD'))},
+        }
+
+    def write_branch(self, branch_name, results_list, sheet_label_suffix=""):
+        # Satu sheet per cabang: judul cabang, lalu blok per kategori (kategori kosong dilewati)
+        worksheet = self.workbook.add_worksheet(branch_name[:30])
+        worksheet.write_string(0, 0, f"Cabang: {branch_name}{sheet_label_suffix}")
+        row_pointer = 2
+        for title, df in results_list:
+            if df.empty: continue
+            worksheet.write_string(row_pointer, 0, title)
+            row_pointer = self._write_block(worksheet, row_pointer + 1, df, "GANTUNG" in title.upper())
+        return worksheet
+
+    def write_table(self, sheet_name, df):
+        # Sheet tabel polos (header + baris, tanpa TOTAL), mis. METRICS
+        worksheet = self.workbook.add_worksheet(sheet_name[:30])
+        for c, name in enumerate(df.columns):
+            _write_value(worksheet, 0, c, name, None, None)
+        for r, values in enumerate(df.itertuples(index=False, name=None), start=1):
+            for c, value in enumerate(values):
+                _write_value(worksheet, r, c, value, None, None)
+        return worksheet
+
+    def _write_block(self, worksheet, row, df, highlight):
+        df = utils.sort_by_tempat(money.for_output(df))
+        formats = self.formats[highlight]
+        columns = list(df.columns)
+        for c, name in enumerate(columns):
+            _write_value(worksheet, row, c, name, None, None)
+
+        totals = {name: 0.0 for name in TOTAL_COLUMNS if name in columns}
+        total_pos = [(columns.index(name), name) for name in totals]
+        for values in df.itertuples(index=False, name=None):
+            row += 1
+            for c, value in enumerate(values):
+                _write_value(worksheet, row, c, value, formats[_kind(value)], formats[None])
+            for c, name in total_pos:
+                value = values[c]
+                if value is not None and value == value: totals[name] += value
+
+        # Baris TOTAL (label di kolom Keperluan, atau kolom pertama)
+        row += 1
+        label_col = columns.index('Keperluan') if 'Keperluan' in columns else 0
+        total_values = [None] * len(columns)
+        for c, name in total_pos: total_values[c] = totals[name]
+        total_values[label_col] = 'TOTAL'
+        for c, value in enumerate(total_values):
+            _write_value(worksheet, row, c, value, formats[_kind(value)], formats[None])
+        return row + 3
+
+    def close(self):
+        self.workbook.close()
+        return self.path
+
+    def read_and_remove(self):
+        return _read_and_remove(self.path)
+
+
+class BundleExport:
+    """
+    Export alternatif untuk konsumen massal: zip berisi satu file per cabang
+    (csv / parquet / xlsx). File csv & parquet berisi semua blok kategori dalam satu
+    tabel dengan kolom Cabang & Kategori ("MATCH BS", "BKK", "DATA GANTUNG ...").
+    """
+
+    def __init__(self, fmt, path=None):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Format export tidak dikenal: {fmt}")
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="auto_rk_", suffix=".zip")
+            os.close(fd)
+        self.fmt = fmt
+        self.path = path
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write_branch(self, branch_name, results_list, sheet_label_suffix=""):
+        name = f"{_file_name(branch_name)}.{self.fmt}"
+        if self.fmt == "xlsx":
+            book = StreamingWorkbook()
+            book.write_branch(branch_name, results_list, sheet_label_suffix)
+            self.zip.write(book.close(), name)
+            os.remove(book.path)
+            return
+        df = category_frame(branch_name, results_list)
+        with self.zip.open(name, "w") as f:
+            if self.fmt == "csv":
+                with io.TextIOWrapper(f, encoding="utf-8", newline="") as text:
+                    df.to_csv(text, index=False)
+            else:
+                _parquet_safe(df).to_parquet(f, index=False)
+
+    def close(self):
+        self.zip.close()
+        return self.path
+
+    def read_and_remove(self):
+        return _read_and_remove(self.path)
+
+
+def category_frame(branch_name, results_list):
+    # Semua blok kategori (yang tidak kosong) jadi satu tabel; kolom label di depan
+    frames = []
+    for title, df in results_list:
+        if df.empty: continue
+        df = utils.sort_by_tempat(money.for_output(df))
+        df.insert(0, "Kategori", title)
+        df.insert(0, "Cabang", branch_name)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["Cabang", "Kategori"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _parquet_safe(df):
+    # Kolom object bertipe campuran (mis. angka + teks) disimpan sebagai teks
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in _PARQUET_SAFE_KINDS:
+            df[col] = df[col].map(lambda v: v if v is None or v != v else str(v))
+    return df
+
+
+def _file_name(branch_name):
+    return "".join(ch if ch.isalnum() or ch in " -_" else "_" for ch in branch_name).strip()
+
+
+def _read_and_remove(path):
+    # Isi file untuk tombol download, lalu file sementara dihapus
+    with open(path, "rb") as f:
+        data = f.read()
+    os.remove(path)
+    return data
+
+
+def _kind(value):
+    if isinstance(value, (datetime.datetime, np.datetime64)): return 'datetime'
+    if isinstance(value, datetime.date): return 'date'
+    return None
+
+
+def _write_value(worksheet, row, col, value, fmt, blank_fmt):
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+        if blank_fmt is not None: worksheet.write_blank(row, col, None, blank_fmt)
+        return
+    if isinstance(value, (bool, np.bool_)):
+        worksheet.write_boolean(row, col, bool(value), fmt)
+    elif isinstance(value, (int, float, np.integer, np.floating)):
+        worksheet.write_number(row, col, float(value), fmt)
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        worksheet.write_datetime(row, col, value, fmt)
+    elif isinstance(value, np.datetime64):
+        worksheet.write_datetime(row, col, pd.Timestamp(value).to_pydatetime(), fmt)
+    elif isinstance(value, str):
+        worksheet.write_string(row, col, value, fmt)
+    else:
+        worksheet.write_string(row, col, str(value), fmt)